@@ -0,0 +1,204 @@
+"""
+Times the reporting paths against seeded histories of increasing size.
+
+For every size a fresh SQLite file is seeded with seed_history.py, the
+simulated clock is set to the end of the history, and each operation runs
+through the real handler with a fake message. Results go to a JSON baseline;
+--compare flags operations slower than the given baseline.
+
+    python bench.py --sizes 1000,10000,100000 --out bench_baseline.json
+    python bench.py --compare bench_baseline.json --tolerance 1.5
+"""
+import argparse
+import asyncio
+import datetime as dt
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+
+class _FakeMessage:
+    async def reply_text(self, text, **kwargs):
+        return self
+
+    async def reply_photo(self, photo=None, **kwargs):
+        return self
+
+    async def reply_document(self, document=None, **kwargs):
+        return self
+
+
+def _update():
+    user = types.SimpleNamespace(id=1, username="bench", full_name="Bench")
+    return types.SimpleNamespace(
+        effective_user=user,
+        effective_chat=types.SimpleNamespace(id=1),
+        message=_FakeMessage(),
+    )
+
+
+def operations(bot, app):
+    def context(*args):
+        return types.SimpleNamespace(args=list(args), application=app, bot=app.bot, job=None)
+
+    async def status():
+        await bot.status_cmd(_update(), context())
+
+    async def history():
+        await bot.history_cmd(_update(), context("30"))
+
+    async def rhistory():
+        await bot.refuel_history_cmd(_update(), context("30"))
+
+    async def month():
+        await bot.month_cmd(_update(), context())
+
+    async def daily_report():
+        await bot.daily_report(context())
+
+    async def total_runtime():
+        await bot.aget_total_runtime_seconds(bot.clock.now())
+
+    async def run_intervals_24h():
+        await bot.aget_run_intervals_last24h(bot._get_aligned_window_end(bot.clock.now()))
+
+    return {
+        "status": status,
+        "history": history,
+        "rhistory": rhistory,
+        "month": month,
+        "daily_report": daily_report,
+        "get_total_runtime_seconds": total_runtime,
+        "_get_run_intervals_last24h": run_intervals_24h,
+    }
+
+
+async def _time_ops(ops: dict, repeats: int) -> dict:
+    results = {}
+    for name, op in ops.items():
+        await op()  # warm caches
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            await op()
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        results[name] = {
+            "median_ms": round(statistics.median(samples), 3),
+            "max_ms": round(samples[-1], 3),
+        }
+    return results
+
+
+def run(sizes: list[int], repeats: int, workdir: str, years: float) -> dict:
+    from clock import SimulatedClock
+    from replay import RecordingBot
+    import seed_history
+    import bot
+
+    # Reports must not reach telegra.ph from a benchmark.
+    bot._telegraph_call = lambda *args, **kwargs: None
+    bot.use_inline_db(True)
+
+    end = dt.datetime(2025, 12, 31, 23, 0)
+    results = {}
+    for size in sizes:
+        bot.DB_FILE = os.path.join(workdir, f"bench_{size}.db")
+        if os.path.exists(bot.DB_FILE):
+            os.unlink(bot.DB_FILE)
+        bot.init_db()
+        # Nothing cached for the previous size may answer for this one.
+        bot.reset_caches()
+        seeded = seed_history.seed(
+            bot.DB_FILE,
+            sessions=size,
+            end=end,
+            per_day=seed_history.per_day_for_years(size, years, 0.05),
+            consumption=bot.FUEL_CONSUMPTION,
+            capacity=bot.TANK_CAPACITY,
+        )
+        clock = SimulatedClock(dt.datetime.fromisoformat(seeded["end"]) + dt.timedelta(hours=1))
+        bot.set_clock(clock)
+        app = types.SimpleNamespace(bot=RecordingBot(clock), bot_data={}, job_queue=None)
+
+        started = time.perf_counter()
+        timings = asyncio.run(_time_ops(operations(bot, app), repeats))
+        print(f"size {size}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        for name, timing in timings.items():
+            print(f"  {name:<28} {timing['median_ms']:>10.2f} ms", file=sys.stderr)
+        results[str(size)] = {"rows": seeded, "ops": timings}
+    return results
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for size, data in current["sizes"].items():
+        base = baseline.get("sizes", {}).get(size)
+        if not base:
+            continue
+        for name, timing in data["ops"].items():
+            ref = base["ops"].get(name)
+            if not ref or ref["median_ms"] <= 0:
+                continue
+            ratio = timing["median_ms"] / ref["median_ms"]
+            if ratio > tolerance:
+                regressions.append(
+                    f"{size} {name}: {ref['median_ms']:.2f} -> {timing['median_ms']:.2f} ms "
+                    f"(x{ratio:.2f})"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", default="1000,10000,100000", help="generator_log row counts")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--years", type=float, default=3, help="history span for every size")
+    parser.add_argument("--workdir", help="directory for seeded DBs (default: temp)")
+    parser.add_argument("--out", default="bench_baseline.json", help="where to write results")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON to compare with")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown ratio")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("TOKEN", "0:bench")
+    os.environ.setdefault("GENERATORNAME", "Bench")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="genbot-bench-")
+    os.makedirs(workdir, exist_ok=True)
+
+    current = {
+        "meta": {
+            "created": dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "repeats": args.repeats,
+            "years": args.years,
+        },
+        "sizes": run(sizes, args.repeats, workdir, args.years),
+    }
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions")
+        return
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(current, f, indent=2)
+    print(f"wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,34 @@
 # -*- coding: utf-8 -*-
 import asyncio
+import collections
+import concurrent.futures
+import csv
 import datetime as dt
+import functools
+import hashlib
+import io
+import itertools
 import json
+import logging
+import math
 import os
 import re
+import secrets
 import sqlite3
 import subprocess
 import tempfile
+import threading
+import time
 import urllib.parse
 import urllib.request
+import zipfile
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, InputFile, Update
+from telegram.error import RetryAfter, TelegramError
 from telegram.ext import (
     Application,
+    CallbackQueryHandler,
     CommandHandler,
     ContextTypes,
 )
@@ -27,17 +43,54 @@ from settings import (
     REPORTM,
     TANK_CAPACITY,
     FUEL_CONSUMPTION,
+    FUEL_MODEL,
     INITIAL_FUEL,
     DB_FILE,
     LOW_FUEL_HOURS,
     ADMIN_USER_ID,
     BOTURL,
     TELEGRAPH_TOKEN,
-    TELEGRAPH_AUTHOR
+    TELEGRAPH_AUTHOR,
+    TELEGRAPH_MAX_PAGES,
+    UPDATE_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_LISTEN,
+    WEBHOOK_PORT,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WATCHDOG_LAG_MS,
+    WATCHDOG_TICK_RATIO,
+    METRICS_LISTEN,
+    METRICS_PORT,
+    API_LISTEN,
+    API_PORT,
+    TRACE_EXPORT,
+    TRACE_FILE,
+    TRACE_MAX_BYTES,
+    TRACE_OTLP_ENDPOINT,
+    TELEGRAM_API_URL,
+    PROBE_RING_FILE,
+    PROBE_RING_SIZE,
+    RETENTION_DAYS,
+    MAINTENANCE_HOUR,
 )
 
 import localization as localization_module
 from localization import t
+from clock import SystemClock
+from session_store import SQL_COLUMNS, SessionStore, from_epoch, to_epoch
+import run_bitmap
+import fuel_timeline
+from probe_ring import ProbeRing, summarize as summarize_probes
+from quantile_sketch import TDigest, merge_all
+import consumption_model
+from consumption_model import ConsumptionModel
+from downsample import lttb
+from loop_watchdog import Watchdog
+import local_http
+import metrics
+import profiling
+import tracing
 
 SETTINGS_ORDER = [
     "LANGUAGE",
@@ -48,14 +101,39 @@ SETTINGS_ORDER = [
     "REPORTM",
     "TANK_CAPACITY",
     "FUEL_CONSUMPTION",
+    "FUEL_MODEL",
     "LOW_FUEL_HOURS",
 ]
 
-SETTINGS_STR_KEYS = {"LANGUAGE", "GENERATORNAME", "GENERATORADDR"}
+log = logging.getLogger(__name__)
+
+# Every "now" in the bot comes from here; simulations swap in SimulatedClock.
+clock = SystemClock()
+watchdog = Watchdog(WATCHDOG_LAG_MS, WATCHDOG_TICK_RATIO)
+
+HANDLER_SECONDS = metrics.histogram("genbot_handler_seconds", "Command handler latency.")
+DB_SECONDS = metrics.histogram("genbot_db_seconds", "Time spent in SQLite calls on the DB thread.")
+DB_WAIT_SECONDS = metrics.histogram(
+    "genbot_db_wait_seconds", "Time SQLite calls wait in the DB thread queue."
+)
+PROBE_SECONDS = metrics.histogram("genbot_probe_seconds", "ICMP probe round-trip time.")
+TELEGRAPH_SECONDS = metrics.histogram("genbot_telegraph_seconds", "Telegraph API call latency.")
+RENDER_SECONDS = metrics.histogram("genbot_render_seconds", "Chart rendering time.")
+UPLOAD_SECONDS = metrics.histogram("genbot_upload_seconds", "Telegram photo upload time.")
+
+_http_servers = []
+tick_profiler = profiling.TickProfiler()
+
+SETTINGS_STR_KEYS = {"LANGUAGE", "GENERATORNAME", "GENERATORADDR", "FUEL_MODEL"}
 SETTINGS_INT_KEYS = {"INTERVAL", "REPORTH", "REPORTM", "TANK_CAPACITY"}
 SETTINGS_FLOAT_KEYS = {"FUEL_CONSUMPTION", "LOW_FUEL_HOURS"}
 
 
+def set_clock(new_clock) -> None:
+    global clock
+    clock = new_clock
+
+
 def _format_env_value(key: str, value) -> str:
     if key in SETTINGS_STR_KEYS:
         value_str = str(value)
@@ -118,21 +196,19 @@ def _table_header_row(key: str, widths: list[int], defaults: list[str]) -> list[
     return [f"{_clip(col.strip(), width):<{width}}" for col, width in zip(cols, widths)]
 
 
-def _table_text(rows: list[list[str]]) -> str:
-    return "\n".join(" ".join(row) for row in rows)
-
-
 def _mdv2_link(text: str, url: str) -> str:
     safe_url = url.replace("(", "%28").replace(")", "%29")
     return f"[{_mdv2_escape(text)}]({safe_url})"
 
 
-def _telegraph_call(method: str, params: dict) -> dict | None:
+def _telegraph_call(method: str, params: dict, path: str = "") -> dict | None:
     data = urllib.parse.urlencode(params).encode("utf-8")
-    req = urllib.request.Request(f"https://api.telegra.ph/{method}", data=data)
+    url = f"https://api.telegra.ph/{method}/{path}" if path else f"https://api.telegra.ph/{method}"
+    req = urllib.request.Request(url, data=data)
     try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            payload = json.loads(resp.read().decode("utf-8"))
+        with TELEGRAPH_SECONDS.time(method=method):
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                payload = json.loads(resp.read().decode("utf-8"))
     except Exception:
         return None
     if not payload.get("ok"):
@@ -156,25 +232,145 @@ def _telegraph_get_token() -> str | None:
     return _telegraph_token
 
 
-def _create_telegraph_page(title: str, table_text: str) -> str | None:
-    token = _telegraph_get_token()
-    if not token:
+# Telegraph rejects page content over 64 KB; leave room for the nav links.
+TELEGRAPH_PAGE_BYTES = 60 * 1024
+TELEGRAPH_CONCURRENCY = 4
+
+
+def _telegraph_page(token: str, title: str, content: list, path: str = "") -> dict | None:
+    params = {
+        "access_token": token,
+        "title": title,
+        "author_name": TELEGRAPH_AUTHOR or GENERATORNAME or "Generator Bot",
+        "author_url": BOTURL or "",
+        "content": json.dumps(content, ensure_ascii=True),
+        "return_content": "false",
+    }
+    if path:
+        return _telegraph_call("editPage", params, path)
+    return _telegraph_call("createPage", params)
+
+
+def _telegraph_chunks(header: str, lines, max_bytes: int = TELEGRAPH_PAGE_BYTES):
+    """Packs table lines into page texts, each repeating the header row."""
+    # Sizes are measured as they are sent: ASCII-escaped JSON.
+    header_size = len(json.dumps(header, ensure_ascii=True))
+    page, size = [header], header_size
+    for line in lines:
+        line_size = len(json.dumps(line, ensure_ascii=True))  # + quotes ~ the "\n"
+        if len(page) > 1 and size + line_size > max_bytes:
+            yield "\n".join(page)
+            page, size = [header], header_size
+        page.append(line)
+        size += line_size
+    if len(page) > 1:
+        yield "\n".join(page)
+
+
+def _telegraph_nav(pages: list[dict], index: int) -> dict:
+    children = []
+    if index > 0:
+        children.append(
+            {"tag": "a", "attrs": {"href": pages[index - 1]["url"]},
+             "children": [t("telegraph_nav_prev")]}
+        )
+    children.append(f" {t('telegraph_nav_page', page=index + 1, pages=len(pages))} ")
+    if index < len(pages) - 1:
+        children.append(
+            {"tag": "a", "attrs": {"href": pages[index + 1]["url"]},
+             "children": [t("telegraph_nav_next")]}
+        )
+    return {"tag": "p", "children": children}
+
+
+async def _publish_telegraph_report(title: str, chunks: list[str]) -> str | None:
+    """
+    Publishes the chunks as linked pages and returns the first page URL.
+    Pages are created concurrently, then edited to add prev/next links once
+    every URL is known. Returns None if any page fails, never a partial set.
+    """
+    if not chunks:
         return None
-    content = json.dumps([{"tag": "pre", "children": [table_text]}], ensure_ascii=True)
-    result = _telegraph_call(
-        "createPage",
-        {
-            "access_token": token,
-            "title": title,
-            "author_name": TELEGRAPH_AUTHOR or GENERATORNAME or "Generator Bot",
-            "author_url": BOTURL or "",
-            "content": content,
-            "return_content": "false",
-        },
-    )
-    if not result:
+    token = await asyncio.to_thread(_telegraph_get_token)
+    if not token:
         return None
-    return result.get("url")
+
+    sem = asyncio.Semaphore(TELEGRAPH_CONCURRENCY)
+    count = len(chunks)
+
+    def page_title(i: int) -> str:
+        return f"{title.rstrip(':')} ({i + 1}/{count})" if count > 1 else title
+
+    async def create(i: int, chunk: str):
+        async with sem:
+            content = [{"tag": "pre", "children": [chunk]}]
+            return await asyncio.to_thread(_telegraph_page, token, page_title(i), content)
+
+    async def blank(i: int):
+        # Telegraph cannot delete pages; overwrite what a failed run left behind.
+        async with sem:
+            content = [{"tag": "p", "children": [t("telegraph_failed")]}]
+            await asyncio.to_thread(_telegraph_page, token, page_title(i), content, pages[i]["path"])
+
+    with tracing.span("telegraph.publish", pages=count):
+        pages = await asyncio.gather(*(create(i, c) for i, c in enumerate(chunks)))
+
+        async def link(i: int, chunk: str):
+            async with sem:
+                nav = _telegraph_nav(pages, i)
+                content = [nav, {"tag": "pre", "children": [chunk]}, nav]
+                return await asyncio.to_thread(
+                    _telegraph_page, token, page_title(i), content, pages[i]["path"]
+                )
+
+        ok = all(pages)
+        if ok and count > 1:
+            ok = all(await asyncio.gather(*(link(i, c) for i, c in enumerate(chunks))))
+        if not ok:
+            await asyncio.gather(*(blank(i) for i, page in enumerate(pages) if page))
+            return None
+    return pages[0].get("url")
+
+
+def _ro_connect() -> sqlite3.Connection:
+    # Separate read-only connection for long scans, so the DB thread stays free.
+    return sqlite3.connect(f"file:{DB_FILE}?mode=ro", uri=True)
+
+
+def _iter_query(conn: sqlite3.Connection, sql: str, params: tuple, batch: int = 1000):
+    # SQLite steps the statement lazily; only one batch is held at a time.
+    cur = conn.execute(sql, params)
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            return
+        yield from rows
+
+
+def _report_chunks(sql: str, params: tuple, format_row, header: list[str]) -> tuple[list[str], bool]:
+    """
+    Page texts for the newest TELEGRAPH_MAX_PAGES pages of the report, and
+    whether older rows were left out. The scan stops once the cap is hit.
+    """
+    conn = _ro_connect()
+    try:
+        lines = (" ".join(format_row(row)) for row in _iter_query(conn, sql, params))
+        pages = _telegraph_chunks(" ".join(header), lines)
+        chunks = list(itertools.islice(pages, TELEGRAPH_MAX_PAGES + 1))
+    finally:
+        conn.close()
+    return chunks[:TELEGRAPH_MAX_PAGES], len(chunks) > TELEGRAPH_MAX_PAGES
+
+
+def _report_line(chunks: list[str], truncated: bool, url: str | None) -> str:
+    if not chunks:
+        return ""
+    if not url:
+        return f"\n{_mdv2_escape(t('telegraph_failed'))}"
+    line = f"\n{t('report_link', link=_mdv2_link('Telegraph', url))}"
+    if truncated:
+        line += f"\n{_mdv2_escape(t('report_truncated', pages=len(chunks)))}"
+    return line
 
 
 def _get_setting_value(key: str):
@@ -194,6 +390,8 @@ def _get_setting_value(key: str):
         return TANK_CAPACITY
     if key == "FUEL_CONSUMPTION":
         return FUEL_CONSUMPTION
+    if key == "FUEL_MODEL":
+        return FUEL_MODEL
     if key == "LOW_FUEL_HOURS":
         return LOW_FUEL_HOURS
     return None
@@ -206,6 +404,11 @@ def _parse_setting_value(key: str, raw_value: str):
         if lang not in {"en", "ru"}:
             return None
         return lang
+    if key == "FUEL_MODEL":
+        model = value.lower()
+        if model not in {"fixed", "learned"}:
+            return None
+        return model
     if key in SETTINGS_STR_KEYS:
         return value
     if key in SETTINGS_INT_KEYS:
@@ -237,7 +440,7 @@ def _parse_setting_value(key: str, raw_value: str):
 
 def _apply_setting_value(key: str, value, context: ContextTypes.DEFAULT_TYPE):
     global GENERATORNAME, GENERATORADDR, INTERVAL, REPORTH, REPORTM
-    global TANK_CAPACITY, FUEL_CONSUMPTION, LOW_FUEL_HOURS
+    global TANK_CAPACITY, FUEL_CONSUMPTION, FUEL_MODEL, LOW_FUEL_HOURS
     global HELP_TEXT
 
     if key == "LANGUAGE":
@@ -257,43 +460,102 @@ def _apply_setting_value(key: str, value, context: ContextTypes.DEFAULT_TYPE):
         TANK_CAPACITY = int(value)
     elif key == "FUEL_CONSUMPTION":
         FUEL_CONSUMPTION = float(value)
+    elif key == "FUEL_MODEL":
+        FUEL_MODEL = str(value)
     elif key == "LOW_FUEL_HOURS":
         LOW_FUEL_HOURS = float(value)
 
     os.environ[key] = str(value)
 
     if key == "INTERVAL":
-        job_queue = context.application.job_queue
-        for job in job_queue.get_jobs_by_name("monitor"):
-            job.schedule_removal()
-        job_queue.run_repeating(
-            monitor_job,
-            interval=INTERVAL,
-            first=0,
-            name="monitor"
-        )
+        schedule_monitor(context.application.job_queue)
 
     if key in {"REPORTH", "REPORTM"}:
-        job_queue = context.application.job_queue
-        for job in job_queue.get_jobs_by_name("daily_report"):
-            job.schedule_removal()
-        job_queue.run_daily(
-            daily_report,
-            time=dt.time(hour=REPORTH, minute=REPORTM),
-            name="daily_report"
-        )
-        for job in job_queue.get_jobs_by_name("monthly_report"):
-            job.schedule_removal()
-        job_queue.run_daily(
-            monthly_report,
-            time=dt.time(hour=REPORTH, minute=REPORTM),
-            name="monthly_report"
-        )
+        schedule_reports(context.application.job_queue)
 
 # ================= DATABASE =================
 
+# All SQLite work from handlers and jobs runs on this single thread so a disk
+# stall never blocks the event loop. One thread also means one writer.
+_db_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="genbot-db"
+)
+_db_local = threading.local()
+# Replays and benchmarks run SQL inline on the loop thread to avoid the
+# per-call thread hop; the live bot always uses the executor.
+_db_inline = False
+
+
+def _connect() -> sqlite3.Connection:
+    # One long-lived connection per thread; reopened if DB_FILE changes.
+    conn = getattr(_db_local, "conn", None)
+    if conn is None or getattr(_db_local, "path", None) != DB_FILE:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(DB_FILE)
+        _db_local.conn = conn
+        _db_local.path = DB_FILE
+    return conn
+
+
+def _db_call(func, args, kwargs, submitted=None, tick=None):
+    if submitted is not None:
+        DB_WAIT_SECONDS.observe(time.perf_counter() - submitted)
+    with DB_SECONDS.time(op=func.__name__), tick_profiler.attribute(tick):
+        return func(*args, **kwargs)
+
+
+def use_inline_db(enabled: bool) -> None:
+    global _db_inline
+    _db_inline = enabled
+
+
+async def run_db(func, *args, **kwargs):
+    profiling.count_db_call()
+    if _db_inline:
+        return _db_call(func, args, kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _db_executor, _db_call, func, args, kwargs, time.perf_counter(),
+        profiling.active_tick.get(),
+    )
+
+
+def _awaitable(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_db(func, *args, **kwargs)
+
+    return wrapper
+
+
+_session_store: SessionStore | None = None
+_session_store_path: str | None = None
+
+
+def _sessions() -> SessionStore:
+    """
+    Columnar copy of generator_log for the reporting paths. Loaded on first
+    use, appended at STOP and caught up by id if rows arrive another way.
+    Only touched from the DB thread.
+    """
+    global _session_store, _session_store_path
+    if _session_store is None or _session_store_path != DB_FILE:
+        _session_store, _session_store_path = SessionStore(), DB_FILE
+    with _connect() as conn:
+        (max_id,) = conn.execute("SELECT MAX(id) FROM generator_log").fetchone()
+        if max_id and max_id > _session_store.last_id:
+            _session_store.load(conn, _session_store.last_id)
+    return _session_store
+
+
 def init_db():
-    with sqlite3.connect(DB_FILE) as conn:
+    with _connect() as conn:
+        # The maintenance job frees pages with incremental_vacuum, which needs
+        # auto_vacuum=INCREMENTAL. A new file takes it here; an existing one
+        # needs a full VACUUM, which the maintenance job runs in its window.
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
         conn.execute("""
         CREATE TABLE IF NOT EXISTS generator_log (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -329,9 +591,95 @@ def init_db():
             added_at TEXT
         )
         """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_generator_log_start ON generator_log (start_time)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_refuel_log_timestamp ON refuel_log (timestamp)"
+        )
+        # Per-day aggregates for /report; filled incrementally by sync_daily_stats().
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            day TEXT PRIMARY KEY,
+            runtime_seconds REAL NOT NULL DEFAULT 0,
+            fuel_used REAL NOT NULL DEFAULT 0,
+            starts INTEGER NOT NULL DEFAULT 0,
+            started_seconds INTEGER NOT NULL DEFAULT 0,
+            longest_seconds INTEGER NOT NULL DEFAULT 0,
+            fuel_added REAL NOT NULL DEFAULT 0
+        )
+        """)
+        # Minute-resolution running state, one 180-byte blob per day (run_bitmap.py).
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS run_bitmap (
+            day TEXT PRIMARY KEY,
+            bits BLOB NOT NULL
+        )
+        """)
+        # Sessions and refuels past RETENTION_DAYS, rolled up per month.
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS archive_monthly (
+            month TEXT PRIMARY KEY,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            runtime_seconds INTEGER NOT NULL DEFAULT 0,
+            fuel_used REAL NOT NULL DEFAULT 0,
+            longest_seconds INTEGER NOT NULL DEFAULT 0,
+            refuels INTEGER NOT NULL DEFAULT 0,
+            fuel_added REAL NOT NULL DEFAULT 0
+        )
+        """)
+        # Fitted litres per hour per generator (consumption_model.py).
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS consumption_model (
+            source TEXT PRIMARY KEY,
+            refuel_id INTEGER NOT NULL,
+            known_ts TEXT,
+            known_fuel REAL NOT NULL,
+            added REAL NOT NULL,
+            dry INTEGER NOT NULL,
+            n INTEGER NOT NULL,
+            sum_hh REAL NOT NULL,
+            sum_hy REAL NOT NULL,
+            sum_yy REAL NOT NULL
+        )
+        """)
+        # Tank level at local midnights (fuel_timeline.py), the replay starting points.
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS fuel_checkpoints (
+            ts TEXT PRIMARY KEY,
+            fuel REAL NOT NULL
+        )
+        """)
+        # Hourly t-digests (quantile_sketch.py) per metric and generator.
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS quantile_sketches (
+            metric TEXT NOT NULL,
+            source TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            digest BLOB NOT NULL,
+            PRIMARY KEY (metric, source, bucket)
+        )
+        """)
+
+
+def reset_caches() -> None:
+    """
+    Forgets the in-memory state built from the current database, for
+    benchmarks and tests that switch DB_FILE between runs.
+    """
+    global _session_store, _session_store_path, _probe_ring
+    _session_store = _session_store_path = None
+    _consumption_models.clear()
+    _open_sketches.clear()
+    _page_cursors.clear()
+    _undelivered.clear()
+    if _probe_ring is not None:
+        _probe_ring.close()
+        _probe_ring = None
+
 
 def is_user_allowed(user_id: int) -> bool:
-    with sqlite3.connect(DB_FILE) as conn:
+    with _connect() as conn:
         cur = conn.execute(
             "SELECT 1 FROM users WHERE user_id = ?",
             (user_id,)
@@ -340,19 +688,19 @@ def is_user_allowed(user_id: int) -> bool:
 
 
 def add_user_to_whitelist(user_id: int, username: str | None):
-    with sqlite3.connect(DB_FILE) as conn:
+    with _connect() as conn:
         conn.execute("""
             INSERT OR IGNORE INTO users (user_id, username, added_at)
             VALUES (?, ?, ?)
         """, (
             user_id,
             username,
-            dt.datetime.now().isoformat()
+            clock.now().isoformat()
         ))
 
 
 def remove_user_from_whitelist(user_id: int):
-    with sqlite3.connect(DB_FILE) as conn:
+    with _connect() as conn:
         conn.execute(
             "DELETE FROM users WHERE user_id = ?",
             (user_id,)
@@ -365,7 +713,7 @@ def whitelist_required(handler):
         if not user:
             return
 
-        if not is_user_allowed(user.id):
+        if not await ais_user_allowed(user.id):
             await update.message.reply_text(t("access_denied"))
             return
 
@@ -373,8 +721,14 @@ def whitelist_required(handler):
 
     return wrapper
 
+# Updates are processed concurrently, so read-modify-write sequences on the
+# generator state (running/fuel/service keys, settings) are serialized here.
+# Writers hold it only around the mutation, never across Telegram calls;
+# read-only handlers such as /status and /month do not take it.
+_state_lock = asyncio.Lock()
+
 def get_whitelist_users():
-    with sqlite3.connect(DB_FILE) as conn:
+    with _connect() as conn:
         cur = conn.execute("""
             SELECT user_id, username, added_at
             FROM users
@@ -401,7 +755,7 @@ async def allow_cmd(update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(t("invalid_user_id"))
         return
 
-    add_user_to_whitelist(uid, None)
+    await aadd_user_to_whitelist(uid, None)
     await update.message.reply_text(t("allow_added", user_id=uid))
 
 #===deny id ====
@@ -422,7 +776,7 @@ async def deny_cmd(update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(t("invalid_user_id"))
         return
 
-    remove_user_from_whitelist(uid)
+    await aremove_user_from_whitelist(uid)
     await update.message.reply_text(t("deny_removed", user_id=uid))
 
 #===my id ====
@@ -438,7 +792,7 @@ async def whoami_cmd(update, context: ContextTypes.DEFAULT_TYPE):
 
 
 def get_state(key, default=None):
-    with sqlite3.connect(DB_FILE) as conn:
+    with _connect() as conn:
         cur = conn.execute(
             "SELECT value FROM state WHERE key = ?",
             (key,)
@@ -447,7 +801,7 @@ def get_state(key, default=None):
         return row[0] if row else default
 
 def set_state(key, value):
-    with sqlite3.connect(DB_FILE) as conn:
+    with _connect() as conn:
         conn.execute(
             "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
             (key, str(value))
@@ -455,36 +809,122 @@ def set_state(key, value):
 
 # ================= ICMP =================
 
-def ping(host: str) -> bool:
+_PING_RTT = re.compile(rb"time[=<]([0-9.]+) ?ms")
+
+
+@PROBE_SECONDS.timed()
+def ping(host: str) -> float | None:
+    """Round-trip time in seconds, or None when the host does not answer."""
     result = subprocess.run(
         ["ping", "-c", "1", "-W", "1", host],
-        stdout=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
         stderr=subprocess.DEVNULL,
     )
-    return result.returncode == 0
+    if result.returncode != 0:
+        return None
+    match = _PING_RTT.search(result.stdout)
+    return float(match.group(1)) / 1000 if match else float("nan")
+
+def _profiled_ping(host: str) -> float | None:
+    with tick_profiler.attribute():
+        return ping(host)
+
+
+async def _ping_probe() -> float | None:
+    return await asyncio.to_thread(_profiled_ping, GENERATORADDR)
+
+
+# Async callable telling whether the generator answers: either a bool or,
+# like _ping_probe, the RTT in seconds / None. See set_probe().
+_probe = _ping_probe
+
+
+def set_probe(probe) -> None:
+    global _probe
+    _probe = probe
+
+def _probe_outcome(result) -> tuple[bool, float | None]:
+    if isinstance(result, bool):
+        return result, None
+    return result is not None, result
+
+# ================= PROBE SAMPLES =================
+# Every probe result lands in a fixed-size memory-mapped ring (probe_ring.py)
+# so a flaky link can be told apart from a real stop after the fact.
+
+PROBE_WINDOWS = (("1h", 1), ("24h", 24), ("7d", 7 * 24))
+_probe_ring: ProbeRing | None = None
+
+
+def _probe_ring_path() -> str:
+    return PROBE_RING_FILE or os.path.join(os.path.dirname(os.path.abspath(DB_FILE)), "probes.ring")
+
+
+def _probe_samples() -> ProbeRing:
+    global _probe_ring
+    path = _probe_ring_path()
+    if _probe_ring is None or _probe_ring.path != path:
+        if _probe_ring is not None:
+            _probe_ring.close()
+        _probe_ring = ProbeRing(path, PROBE_RING_SIZE)
+    return _probe_ring
+
+
+def record_probe(now: dt.datetime, alive: bool, rtt: float | None) -> None:
+    _probe_samples().append(to_epoch(now), alive, rtt)
+
+
+def get_probe_window_samples(now: dt.datetime):
+    """
+    Copy of the samples in the widest window. record_probe writes the ring
+    on the event loop, so call this there too; a copy taken from another
+    thread could see a half-written record or a stale head.
+    """
+    return _probe_samples().samples(to_epoch(now - dt.timedelta(hours=PROBE_WINDOWS[-1][1])))
+
+
+def get_probe_summaries(now: dt.datetime, samples) -> list[tuple[str, dict]]:
+    return [
+        (label, summarize_probes(samples[samples["ts"] >= to_epoch(now - dt.timedelta(hours=hours))]))
+        for label, hours in PROBE_WINDOWS
+    ]
 
 # ================= FUEL =================
 
+def fuel_rate() -> float:
+    """
+    Litres per running hour for estimates: with FUEL_MODEL=learned the rate
+    fitted from refuel history once there is one, else FUEL_CONSUMPTION.
+    """
+    if FUEL_MODEL == "learned":
+        model = _consumption_models.get(GENERATORNAME or "")
+        if model is not None and model.rate is not None:
+            return model.rate
+    return FUEL_CONSUMPTION
+
+
 def fuel_used(seconds: int) -> float:
-    return (seconds / 3600.0) * FUEL_CONSUMPTION
+    return (seconds / 3600.0) * fuel_rate()
 
 
 # ================= Runtime remaining =================
 
 def format_remaining_time(fuel_left: float) -> str:
-    if FUEL_CONSUMPTION <= 0:
+    rate = fuel_rate()
+    if rate <= 0:
         return "N/A"
 
-    total_minutes = int((fuel_left / FUEL_CONSUMPTION) * 60)
+    total_minutes = int((fuel_left / rate) * 60)
     hours = total_minutes // 60
     minutes = total_minutes % 60
 
     return f"{hours}h {minutes}m"
 
 def remaining_hours_from_fuel(fuel_left: float) -> float:
-    if FUEL_CONSUMPTION <= 0:
+    rate = fuel_rate()
+    if rate <= 0:
         return 1e9
-    return max(0.0, fuel_left / FUEL_CONSUMPTION)
+    return max(0.0, fuel_left / rate)
 
 def _hours_minutes_from_seconds(seconds: int) -> tuple[int, int]:
     total_minutes = max(0, seconds) // 60
@@ -501,17 +941,32 @@ def get_motohours_offset_seconds() -> int:
 
 def get_total_runtime_seconds(now: dt.datetime | None = None, *, include_offset: bool = True) -> int:
     if now is None:
-        now = dt.datetime.now()
-    with sqlite3.connect(DB_FILE) as conn:
-        cur = conn.execute("SELECT SUM(runtime_seconds) FROM generator_log")
-        row = cur.fetchone()
-        total = int(row[0] or 0)
+        now = clock.now()
+    total = _sessions().total_runtime + get_archived_runtime_seconds()
     if get_state("running", "0") == "1":
         total += get_used_since_start_seconds(now)
     if include_offset:
         total += get_motohours_offset_seconds()
     return total
 
+def get_archived_runtime_seconds() -> int:
+    """Runtime of sessions the maintenance job rolled into archive_monthly."""
+    with _connect() as conn:
+        (total,) = conn.execute(
+            "SELECT COALESCE(SUM(runtime_seconds), 0) FROM archive_monthly"
+        ).fetchone()
+    return int(total)
+
+def get_archived_until() -> dt.datetime | None:
+    """Moment before which sessions and refuels may be archived, None if nothing is."""
+    return _parse_iso(get_state("archived_until"))
+
+def _check_not_archived(start: dt.datetime) -> None:
+    # Per-session paths cannot see archived rows; answering would undercount.
+    archived = get_archived_until()
+    if archived is not None and start < archived:
+        raise ValueError(f"{start.isoformat()} is before archived_until {archived.isoformat()}")
+
 def get_service_due_seconds() -> float | None:
     raw = get_state("service_due_seconds")
     if raw is None or raw == "":
@@ -538,56 +993,27 @@ def _build_service_line(total_runtime: int) -> str:
 def _get_aligned_window_end(now: dt.datetime) -> dt.datetime:
     return now.replace(minute=0, second=0, microsecond=0)
 
+def _get_run_minutes_last24h(window_end: dt.datetime) -> np.ndarray:
+    return _run_minutes(window_end - dt.timedelta(hours=24), window_end)
+
 def _get_run_intervals_last24h(window_end: dt.datetime) -> list[tuple[dt.datetime, dt.datetime]]:
     window_start = window_end - dt.timedelta(hours=24)
-    rows: list[tuple[str, str]] = []
-    with sqlite3.connect(DB_FILE) as conn:
-        cur = conn.execute("""
-            SELECT start_time, stop_time
-            FROM generator_log
-            WHERE start_time <= ? AND stop_time >= ?
-        """, (window_end.isoformat(), window_start.isoformat()))
-        rows = cur.fetchall()
-
-    intervals: list[tuple[dt.datetime, dt.datetime]] = []
-    for start_s, stop_s in rows:
-        start_dt = _parse_iso(start_s)
-        stop_dt = _parse_iso(stop_s)
-        if not start_dt or not stop_dt:
-            continue
-        # Clamp to window
-        start_dt = max(start_dt, window_start)
-        stop_dt = min(stop_dt, window_end)
-        if stop_dt > start_dt:
-            intervals.append((start_dt, stop_dt))
+    return run_bitmap.intervals(_get_run_minutes_last24h(window_end), window_start)
 
-    # Add current running interval if needed
-    if get_state("running", "0") == "1":
-        start_dt = _parse_iso(get_state("start_time"))
-        if start_dt:
-            start_dt = max(start_dt, window_start)
-            if window_end > start_dt:
-                intervals.append((start_dt, window_end))
+def _bins_running(minutes: np.ndarray, bin_minutes: int) -> list[bool]:
+    return minutes.reshape(-1, bin_minutes).any(axis=1).tolist()
 
-    return intervals
+def _chart_font(font_size: int):
+    try:
+        return ImageFont.truetype("arial.ttf", font_size)
+    except Exception:
+        try:
+            return ImageFont.truetype("DejaVuSans.ttf", font_size)
+        except Exception:
+            return ImageFont.load_default()
 
-def _bins_running(
-    intervals: list[tuple[dt.datetime, dt.datetime]],
-    window_end: dt.datetime,
-    bin_minutes: int,
-) -> list[bool]:
-    window_start = window_end - dt.timedelta(hours=24)
-    total_bins = int((24 * 60) / bin_minutes)
-    bins = [False] * total_bins
-    for i in range(total_bins):
-        bin_start = window_start + dt.timedelta(minutes=i * bin_minutes)
-        bin_end = bin_start + dt.timedelta(minutes=bin_minutes)
-        for s, e in intervals:
-            if e > bin_start and s < bin_end:
-                bins[i] = True
-                break
-    return bins
 
+@RENDER_SECONDS.timed(chart="daily_grid")
 def _generate_daily_grid_image(
     minute_bins: list[bool],
     bin_minutes: int,
@@ -605,14 +1031,7 @@ def _generate_daily_grid_image(
     cell_w = grid_w / cols
     cell_h = grid_h / rows
 
-    font_size = int(size * 0.05)
-    try:
-        font = ImageFont.truetype("arial.ttf", font_size)
-    except Exception:
-        try:
-            font = ImageFont.truetype("DejaVuSans.ttf", font_size)
-        except Exception:
-            font = ImageFont.load_default()
+    font = _chart_font(int(size * 0.05))
 
     window_start = window_end - dt.timedelta(hours=24)
 
@@ -658,6 +1077,103 @@ def _generate_daily_grid_image(
     img.save(tmp_path, format="PNG")
     return tmp_path
 
+
+# Multi-day heatmaps: (days, bins) running fractions -> palette indices ->
+# one Image.fromarray, scaled up with NEAREST. Only labels are drawn.
+HEATMAP_PERIODS = {"week": (7, 5), "month": (30, 15)}  # days, bin minutes
+HEATMAP_WIDTH = 720
+_HEATMAP_PALETTE = (
+    np.linspace((255, 255, 255), (220, 40, 40), 256).round().astype(np.uint8).ravel().tolist()
+)
+
+
+def _heatmap_matrix(first_day: dt.date, days: int, bin_minutes: int) -> np.ndarray:
+    """Share of each bin the generator ran, shape (days, bins per day)."""
+    start = dt.datetime.combine(first_day, dt.time())
+    minutes = _run_minutes(start, start + dt.timedelta(days=days))
+    return minutes.reshape(days, -1, bin_minutes).mean(axis=2)
+
+
+@RENDER_SECONDS.timed(chart="heatmap")
+def _generate_heatmap_image(matrix: np.ndarray, first_day: dt.date, title: str) -> str:
+    days, bins = matrix.shape
+    cell_h = max(10, min(40, 480 // days))
+    font = _chart_font(14)
+    left, top, right, bottom = 64, 56, 16, 16
+
+    heat = Image.fromarray(np.rint(matrix * 255).astype(np.uint8), mode="P")
+    heat.putpalette(_HEATMAP_PALETTE)
+    heat = heat.resize((HEATMAP_WIDTH, days * cell_h), Image.NEAREST).convert("RGB")
+
+    img = Image.new("RGB", (left + HEATMAP_WIDTH + right, top + days * cell_h + bottom), "white")
+    img.paste(heat, (left, top))
+    draw = ImageDraw.Draw(img)
+    draw.text((left, 8), title, fill=(30, 30, 30), font=font)
+
+    for hour in range(0, 25, 3):
+        x = left + HEATMAP_WIDTH * hour / 24
+        draw.line([x, top, x, top + days * cell_h], fill=(200, 200, 200))
+        if hour < 24:
+            draw.text((x + 2, top - 20), f"{hour:02d}", fill=(90, 90, 90), font=font)
+
+    label_every = max(1, 16 // cell_h + (1 if 16 % cell_h else 0))
+    for row in range(0, days, label_every):
+        day = first_day + dt.timedelta(days=row)
+        draw.text(
+            (8, top + row * cell_h + max(0, (cell_h - 14) // 2)),
+            day.strftime("%d.%m"),
+            fill=(90, 90, 90),
+            font=font,
+        )
+    draw.rectangle([left, top, left + HEATMAP_WIDTH, top + days * cell_h], outline=(180, 180, 180))
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
+    tmp_path = tmp.name
+    tmp.close()
+    img.save(tmp_path, format="PNG")
+    return tmp_path
+
+
+FUEL_CHART_SIZE = (720, 300)
+
+
+@RENDER_SECONDS.timed(chart="fuel")
+def _generate_fuel_chart(times: np.ndarray, levels: np.ndarray, capacity: float, title: str) -> str:
+    width, height = FUEL_CHART_SIZE
+    font = _chart_font(14)
+    left, top, right, bottom = 48, 36, 16, 28
+    plot_w, plot_h = width - left - right, height - top - bottom
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    draw.text((left, 8), title, fill=(30, 30, 30), font=font)
+
+    top_level = max(capacity, float(levels.max()) if len(levels) else 0.0, 1.0)
+    for frac in (0, 0.25, 0.5, 0.75, 1):
+        y = top + plot_h * (1 - frac)
+        draw.line([left, y, left + plot_w, y], fill=(225, 225, 225))
+        draw.text((4, y - 8), f"{top_level * frac:.0f}", fill=(90, 90, 90), font=font)
+
+    span = max(float(times[-1] - times[0]), 1.0)
+    fmt = "%H:%M" if span <= 2 * 86400 else "%d.%m"
+    for frac in np.linspace(0, 1, 5):
+        x = left + plot_w * frac
+        label = from_epoch(times[0] + span * frac).strftime(fmt)
+        bbox = draw.textbbox((0, 0), label, font=font)
+        draw.text((x - (bbox[2] - bbox[0]) * frac, top + plot_h + 6), label, fill=(90, 90, 90), font=font)
+
+    keep = lttb(times, levels, plot_w * 2)
+    xs = left + (times[keep] - times[0]) / span * plot_w
+    ys = top + plot_h * (1 - levels[keep] / top_level)
+    draw.line(list(zip(xs.tolist(), ys.tolist())), fill=(40, 90, 200), width=2)
+    draw.rectangle([left, top, left + plot_w, top + plot_h], outline=(180, 180, 180))
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
+    tmp_path = tmp.name
+    tmp.close()
+    img.save(tmp_path, format="PNG")
+    return tmp_path
+
+
 def _parse_iso(dt_str: str | None) -> dt.datetime | None:
     if not dt_str:
         return None
@@ -667,6 +1183,13 @@ def _parse_iso(dt_str: str | None) -> dt.datetime | None:
         return None
 
 
+def _local_naive(when: dt.datetime) -> dt.datetime:
+    # Stored times are naive local time; bring an explicit offset or Z to it.
+    if when.tzinfo is None:
+        return when
+    return when.astimezone().replace(tzinfo=None)
+
+
 def get_used_since_start_seconds(now: dt.datetime) -> int:
     start_dt = _parse_iso(get_state("start_time"))
     if not start_dt:
@@ -698,7 +1221,7 @@ def get_effective_fuel_left_now(now: dt.datetime | None = None) -> float:
     - If RUNNING: returns max(0, fuel_start - used_since_start)
     """
     if now is None:
-        now = dt.datetime.now()
+        now = clock.now()
 
     running = get_state("running", "0") == "1"
     fuel_left_db = float(get_state("fuel_left", INITIAL_FUEL))
@@ -724,14 +1247,164 @@ def apply_fuel_setpoint_while_running(new_effective_fuel: float, now: dt.datetim
       => fuel_start_new = new_effective + used_since_start
     """
     if now is None:
-        now = dt.datetime.now()
+        now = clock.now()
 
     used = fuel_used(get_used_since_start_seconds(now))
     fuel_start_new = new_effective_fuel + used
     set_fuel_start(fuel_start_new)
 
 
+# ================= PAGINATION =================
+# /history and /rhistory pages are turned in place with inline buttons. Each
+# turn is one keyset seek on the time index, bounded by the cutoff captured
+# when the command ran; the cursor lives in a short-lived in-memory cache.
+
+PAGE_SIZE = 10
+PAGE_CURSOR_TTL = 15 * 60
+PAGE_CURSOR_MAX = 500
+
+PAGED_TABLES = {
+    "history": ("generator_log", "start_time", "start_time, stop_time, runtime_seconds, fuel_used"),
+    "refuel": ("refuel_log", "timestamp", "timestamp, amount, fuel_before, fuel_after, username"),
+}
+
+_page_cursors: collections.OrderedDict[str, dict] = collections.OrderedDict()
+
+
+def _fetch_page(kind: str, cutoff: str, before=None, after=None) -> tuple[list[tuple], bool]:
+    """
+    Returns up to PAGE_SIZE rows (id first, newest first) older than before,
+    newer than after, or the newest page, plus whether more rows lie beyond.
+    """
+    table, time_col, columns = PAGED_TABLES[kind]
+    # Plain range terms on time_col next to the row-value comparison let
+    # SQLite seek the index instead of scanning from the cutoff.
+    sql = f"SELECT id, {columns} FROM {table} WHERE {time_col} >= ?"
+    params = [max(cutoff, after[0]) if after else cutoff]
+    if before:
+        sql += f" AND {time_col} <= ? AND ({time_col}, id) < (?, ?)"
+        params += [before[0], *before]
+        order = "DESC"
+    elif after:
+        sql += f" AND ({time_col}, id) > (?, ?)"
+        params += list(after)
+        order = "ASC"
+    else:
+        order = "DESC"
+    sql += f" ORDER BY {time_col} {order}, id {order} LIMIT ?"
+    params.append(PAGE_SIZE + 1)
+    with _connect() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    more = len(rows) > PAGE_SIZE
+    rows = rows[:PAGE_SIZE]
+    if order == "ASC":
+        rows.reverse()
+    return rows, more
+
+
+def _page_key(row: tuple) -> tuple[str, int]:
+    return row[1], row[0]
+
+
+def _store_page_cursor(entry: dict) -> str:
+    now = time.monotonic()
+    while _page_cursors:
+        token, oldest = next(iter(_page_cursors.items()))
+        if oldest["expires"] > now and len(_page_cursors) < PAGE_CURSOR_MAX:
+            break
+        del _page_cursors[token]
+    token = secrets.token_urlsafe(6)
+    entry["expires"] = now + PAGE_CURSOR_TTL
+    _page_cursors[token] = entry
+    return token
+
+
+def _page_keyboard(token: str, has_older: bool, has_newer: bool) -> InlineKeyboardMarkup | None:
+    buttons = []
+    if has_newer:
+        buttons.append(InlineKeyboardButton(t("page_newer"), callback_data=f"page:{token}:n"))
+    if has_older:
+        buttons.append(InlineKeyboardButton(t("page_older"), callback_data=f"page:{token}:o"))
+    return InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+def _page_text(entry: dict, rows: list[tuple]) -> str:
+    table_rows = [entry["table_header"]]
+    table_rows.extend(entry["format_row"](row[1:], entry["widths"]) for row in rows)
+    return f"{entry['header']}\n{_mdv2_codeblock_table(table_rows)}{entry['report_line']}"
+
+
+async def _reply_first_page(update, entry: dict, rows: list[tuple], has_older: bool):
+    entry["first"], entry["last"] = _page_key(rows[0]), _page_key(rows[-1])
+    markup = _page_keyboard(_store_page_cursor(entry), has_older, False) if has_older else None
+    await update.message.reply_text(
+        _page_text(entry, rows),
+        parse_mode="MarkdownV2",
+        reply_markup=markup,
+    )
+
+
+async def page_callback(update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    _, token, direction = query.data.split(":", 2)
+    entry = _page_cursors.get(token)
+    if entry is None or entry["expires"] < time.monotonic():
+        await query.answer(t("page_expired"), show_alert=True)
+        return
+
+    older = direction == "o"
+    rows, more = await run_db(
+        _fetch_page,
+        entry["kind"],
+        entry["cutoff"],
+        before=entry["last"] if older else None,
+        after=None if older else entry["first"],
+    )
+    if not rows:
+        await query.answer(t("page_no_more"))
+        return
+
+    entry["first"], entry["last"] = _page_key(rows[0]), _page_key(rows[-1])
+    entry["expires"] = time.monotonic() + PAGE_CURSOR_TTL
+    _page_cursors.move_to_end(token)
+    await query.edit_message_text(
+        _page_text(entry, rows),
+        parse_mode="MarkdownV2",
+        reply_markup=_page_keyboard(token, more if older else True, True if older else more),
+    )
+    await query.answer()
+
+
 # ================ Ref history ============
+REFUEL_REPORT_SQL = """
+    SELECT timestamp, amount, fuel_before, fuel_after, username
+    FROM refuel_log
+    WHERE timestamp >= ?
+    ORDER BY timestamp DESC
+"""
+
+
+def _refuel_table_row(row: tuple, widths: list[int]) -> list[str]:
+    ts, amount, before, after, user = row
+    time_str = _clip(ts.replace("T", " ")[5:16], widths[0])
+    action = (
+        t("refuel_history_action_add", amount=amount)
+        if amount > 0
+        else t("refuel_history_action_reset")
+    )
+    action_s = _clip(action, widths[1])
+    before_s = f"{before:>{widths[2]}.1f}"
+    after_s = f"{after:>{widths[3]}.1f}"
+    user_s = _clip(user or t("unknown_user"), widths[4])
+    return [
+        f"{time_str:<{widths[0]}}",
+        f"{action_s:<{widths[1]}}",
+        f"{before_s:>{widths[2]}}",
+        f"{after_s:>{widths[3]}}",
+        f"{user_s:<{widths[4]}}",
+    ]
+
+
 async def refuel_history_cmd(update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
         await update.message.reply_text(t("refuel_history_usage"))
@@ -745,21 +1418,8 @@ async def refuel_history_cmd(update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(t("refuel_history_invalid_days"))
         return
 
-    with sqlite3.connect(DB_FILE) as conn:
-        cur = conn.execute("""
-            SELECT
-                timestamp,
-                amount,
-                fuel_before,
-                fuel_after,
-                username
-            FROM refuel_log
-            WHERE timestamp >= datetime('now', ?)
-            ORDER BY timestamp DESC
-            LIMIT 10
-        """, (f"-{days} days",))
-
-        rows = cur.fetchall()
+    cutoff = (clock.now() - dt.timedelta(days=days)).isoformat()
+    rows, has_older = await run_db(_fetch_page, "refuel", cutoff)
 
     if not rows:
         await update.message.reply_text(
@@ -778,42 +1438,56 @@ async def refuel_history_cmd(update, context: ContextTypes.DEFAULT_TYPE):
         )
     ]
 
-    for ts, amount, before, after, user in rows:
-        time_str = _clip(ts.replace("T", " ")[5:16], widths[0])
-        action = (
-            t("refuel_history_action_add", amount=amount)
-            if amount > 0
-            else t("refuel_history_action_reset")
-        )
-        action_s = _clip(action, widths[1])
-        before_s = f"{before:>{widths[2]}.1f}"
-        after_s = f"{after:>{widths[3]}.1f}"
-        user_s = _clip(user or t("unknown_user"), widths[4])
-
-        table_rows.append(
-            [
-                f"{time_str:<{widths[0]}}",
-                f"{action_s:<{widths[1]}}",
-                f"{before_s:>{widths[2]}}",
-                f"{after_s:>{widths[3]}}",
-                f"{user_s:<{widths[4]}}",
-            ]
-        )
+    chunks, truncated = await asyncio.to_thread(
+        _report_chunks,
+        REFUEL_REPORT_SQL,
+        (cutoff,),
+        functools.partial(_refuel_table_row, widths=widths),
+        table_rows[0],
+    )
+    report_url = await _publish_telegraph_report(header_raw, chunks)
+    report_line = _report_line(chunks, truncated, report_url)
+    entry = {
+        "kind": "refuel",
+        "cutoff": cutoff,
+        "header": header,
+        "table_header": table_rows[0],
+        "widths": widths,
+        "format_row": _refuel_table_row,
+        "report_line": report_line,
+    }
+    await _reply_first_page(update, entry, rows, has_older)
+
+# ================= History =====================
+
+HISTORY_REPORT_SQL = """
+    SELECT start_time, stop_time, runtime_seconds, fuel_used
+    FROM generator_log
+    WHERE start_time >= ?
+    ORDER BY start_time DESC
+"""
 
-    table_text = _table_text(table_rows)
-    table = _mdv2_codeblock_table(table_rows)
-    report_url = await asyncio.to_thread(_create_telegraph_page, header_raw, table_text)
-    report_line = (
-        f"\n{t('report_link', link=_mdv2_link('Telegraph', report_url))}"
-        if report_url
-        else ""
+
+def _history_table_row(row: tuple, widths: list[int]) -> list[str]:
+    start, stop, runtime, fuel = row
+    start_s = _clip(start.replace("T", " ")[:16], widths[0])
+    stop_s = _clip(stop.replace("T", " ")[:16], widths[1]) if stop else _clip(
+        t("not_available"), widths[1]
     )
-    await update.message.reply_text(
-        f"{header}\n{table}{report_line}",
-        parse_mode="MarkdownV2",
+    hours = runtime // 3600
+    minutes = (runtime % 3600) // 60
+    run_s = _clip(
+        t("history_table_run_format", hours=hours, minutes=minutes),
+        widths[2],
     )
+    fuel_s = f"{fuel:>{widths[3]}.1f}"
+    return [
+        f"{start_s:<{widths[0]}}",
+        f"{stop_s:<{widths[1]}}",
+        f"{run_s:<{widths[2]}}",
+        f"{fuel_s:>{widths[3]}}",
+    ]
 
-# ================= History =====================
 
 async def history_cmd(update, context: ContextTypes.DEFAULT_TYPE):
     # default: 1 day
@@ -828,20 +1502,8 @@ async def history_cmd(update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text(t("history_usage"))
             return
 
-    with sqlite3.connect(DB_FILE) as conn:
-        cur = conn.execute("""
-            SELECT
-                start_time,
-                stop_time,
-                runtime_seconds,
-                fuel_used
-            FROM generator_log
-            WHERE start_time >= datetime('now', ?)
-            ORDER BY start_time DESC
-            LIMIT 10
-        """, (f"-{days} days",))
-
-        rows = cur.fetchall()
+    cutoff = (clock.now() - dt.timedelta(days=days)).isoformat()
+    rows, has_older = await run_db(_fetch_page, "history", cutoff)
 
     if not rows:
         await update.message.reply_text(
@@ -859,69 +1521,200 @@ async def history_cmd(update, context: ContextTypes.DEFAULT_TYPE):
         )
     ]
 
-    for start, stop, runtime, fuel in rows:
-        start_s = _clip(start.replace("T", " ")[:16], widths[0])
-        stop_s = _clip(stop.replace("T", " ")[:16], widths[1]) if stop else _clip(
-            t("not_available"), widths[1]
-        )
-
-        hours = runtime // 3600
-        minutes = (runtime % 3600) // 60
-        run_s = _clip(
-            t("history_table_run_format", hours=hours, minutes=minutes),
-            widths[2],
-        )
-        fuel_s = f"{fuel:>{widths[3]}.1f}"
-
-        table_rows.append(
-            [
-                f"{start_s:<{widths[0]}}",
-                f"{stop_s:<{widths[1]}}",
-                f"{run_s:<{widths[2]}}",
-                f"{fuel_s:>{widths[3]}}",
-            ]
-        )
-
-    table_text = _table_text(table_rows)
-    table = _mdv2_codeblock_table(table_rows)
-    report_url = await asyncio.to_thread(_create_telegraph_page, header_raw, table_text)
-    report_line = (
-        f"\n{t('report_link', link=_mdv2_link('Telegraph', report_url))}"
-        if report_url
-        else ""
+    chunks, truncated = await asyncio.to_thread(
+        _report_chunks,
+        HISTORY_REPORT_SQL,
+        (cutoff,),
+        functools.partial(_history_table_row, widths=widths),
+        table_rows[0],
     )
-    await update.message.reply_text(
-        f"{header}\n{table}{report_line}",
-        parse_mode="MarkdownV2",
+    report_url = await _publish_telegraph_report(header_raw, chunks)
+    report_line = _report_line(chunks, truncated, report_url)
+    entry = {
+        "kind": "history",
+        "cutoff": cutoff,
+        "header": header,
+        "table_header": table_rows[0],
+        "widths": widths,
+        "format_row": _history_table_row,
+        "report_line": report_line,
+    }
+    await _reply_first_page(update, entry, rows, has_older)
+
+
+# ================= EXPORT =================
+
+EXPORT_BATCH = 1000
+EXPORT_MAX_BYTES = 49 * 1024 * 1024  # Bot API upload limit is 50 MB
+EXPORT_TABLES = {
+    "generator_log": (
+        "start_time",
+        ("id", "start_time", "stop_time", "runtime_seconds", "fuel_used"),
+    ),
+    "refuel_log": (
+        "timestamp",
+        ("id", "timestamp", "amount", "fuel_before", "fuel_after", "user_id", "username"),
+    ),
+}
+
+
+def _export_rows(conn, table: str, since: str, until: str):
+    time_col, columns = EXPORT_TABLES[table]
+    return _iter_query(
+        conn,
+        f"SELECT {', '.join(columns)} FROM {table} "
+        f"WHERE {time_col} >= ? AND {time_col} < ? ORDER BY {time_col}",
+        (since, until),
+        EXPORT_BATCH,
     )
 
 
-# ================= TELEGRAM =================
-
-async def send(app: Application, text: str):
-    await app.bot.send_message(
-        chat_id=CHANNELID,
-        text=text,
-        reply_markup=bot_link_keyboard()
-    )
+def _csv_lines(columns, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in itertools.chain([columns], rows):
+        writer.writerow(row)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
 
-def bot_link_keyboard():
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton(t("open_bot_button"), url=BOTURL)]
-    ])
 
-async def users_cmd(update, context: ContextTypes.DEFAULT_TYPE):
-    user = update.effective_user
+def _jsonl_lines(columns, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
 
-    if user.id != ADMIN_USER_ID:
-        await update.message.reply_text(t("admin_only"))
-        return
 
-    rows = get_whitelist_users()
+def _write_export(out, fmt: str, since: str, until: str) -> int:
+    """Streams both tables into a zip in out; returns the number of rows written."""
+    lines_for = _csv_lines if fmt == "csv" else _jsonl_lines
+    total = 0
 
-    if not rows:
-        await update.message.reply_text(t("whitelist_empty"))
-        return
+    def counted(rows):
+        nonlocal total
+        for row in rows:
+            total += 1
+            yield row
+
+    conn = _ro_connect()
+    try:
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for table, (_, columns) in EXPORT_TABLES.items():
+                with zf.open(f"{table}.{fmt}", "w") as member:
+                    rows = counted(_export_rows(conn, table, since, until))
+                    for line in lines_for(columns, rows):
+                        member.write(line.encode("utf-8"))
+    finally:
+        conn.close()
+    return total
+
+
+def _parse_export_args(args: list[str]):
+    fmt = "csv"
+    if args and args[0].lower() in {"csv", "jsonl"}:
+        fmt = args[0].lower()
+        args = args[1:]
+    if len(args) > 2:
+        raise ValueError
+    since = dt.date.fromisoformat(args[0]) if args else dt.date.min
+    until = dt.date.fromisoformat(args[1]) if len(args) > 1 else dt.date.max
+    if until < since:
+        raise ValueError
+    return fmt, since, until
+
+
+@whitelist_required
+async def export_cmd(update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        fmt, since, until = _parse_export_args(context.args or [])
+    except ValueError:
+        await update.message.reply_text(t("export_usage"))
+        return
+
+    since_s = since.isoformat() if since != dt.date.min else ""
+    until_s = (until + dt.timedelta(days=1)).isoformat() if until != dt.date.max else "~"
+
+    with tempfile.TemporaryFile() as out:
+        with tracing.span("export.write", format=fmt):
+            rows = await asyncio.to_thread(_write_export, out, fmt, since_s, until_s)
+        if not rows:
+            await update.message.reply_text(t("export_empty"))
+            return
+        size = out.tell()
+        if size > EXPORT_MAX_BYTES:
+            await update.message.reply_text(t("export_too_large", size_mb=size / 1024 / 1024))
+            return
+        out.seek(0)
+        # InputFile reads the whole file into memory for the multipart body;
+        # the size check above caps that at EXPORT_MAX_BYTES.
+        label = "all" if since == dt.date.min and until == dt.date.max else (
+            f"{since_s or 'start'}_{until.isoformat() if until != dt.date.max else 'now'}"
+        )
+        with tracing.span("export.upload"):
+            await update.message.reply_document(
+                document=InputFile(out, filename=f"genbot_export_{label}_{fmt}.zip"),
+                caption=t("export_caption", rows=rows, format=fmt.upper()),
+            )
+
+
+# ================= TELEGRAM =================
+
+SEND_RETRIES = 3
+# Monitor alerts send() gave up on; retried before the next tick's alerts.
+ALERT_BACKLOG = 50
+_undelivered: collections.deque[str] = collections.deque(maxlen=ALERT_BACKLOG)
+
+
+async def send(app: Application, text: str):
+    # Alerts must not be lost to flood control: honour retry_after a few times.
+    with tracing.span("notify"):
+        for attempt in range(SEND_RETRIES + 1):
+            try:
+                await app.bot.send_message(
+                    chat_id=CHANNELID,
+                    text=text,
+                    reply_markup=bot_link_keyboard()
+                )
+                return
+            except RetryAfter as exc:
+                if attempt == SEND_RETRIES:
+                    raise
+                delay = exc.retry_after
+                if isinstance(delay, dt.timedelta):
+                    delay = delay.total_seconds()
+                await asyncio.sleep(delay)
+
+async def send_alerts(app: Application, texts: list[str]):
+    """
+    Sends every alert on its own, oldest first. One that still fails after
+    send()'s retries is logged and kept for the next call, so it never takes
+    the alerts queued behind it down with it.
+    """
+    queued = [*_undelivered, *texts]
+    _undelivered.clear()
+    for text in queued:
+        try:
+            await send(app, text)
+        except TelegramError as exc:
+            log.warning("Alert not delivered, retrying on the next tick: %s", exc)
+            _undelivered.append(text)
+
+def bot_link_keyboard():
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(t("open_bot_button"), url=BOTURL)]
+    ])
+
+async def users_cmd(update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+
+    if user.id != ADMIN_USER_ID:
+        await update.message.reply_text(t("admin_only"))
+        return
+
+    rows = await aget_whitelist_users()
+
+    if not rows:
+        await update.message.reply_text(t("whitelist_empty"))
+        return
 
     lines = [t("whitelist_header")]
 
@@ -946,11 +1739,11 @@ async def settings_cmd(update, context: ContextTypes.DEFAULT_TYPE):
         value = _get_setting_value(key)
         lines.append(t("settings_line", setting_key=key, value=value))
 
-    total_runtime = get_total_runtime_seconds()
+    total_runtime = await aget_total_runtime_seconds()
     total_h, total_m = _hours_minutes_from_seconds(total_runtime)
     lines.append(t("motohours_line", total_hours=total_h, total_minutes=total_m))
 
-    due_seconds = get_service_due_seconds()
+    due_seconds = await aget_service_due_seconds()
     if due_seconds is None:
         lines.append(t("service_not_set_line"))
     else:
@@ -958,7 +1751,7 @@ async def settings_cmd(update, context: ContextTypes.DEFAULT_TYPE):
         lines.append(
             t("settings_line", setting_key="SERVICE_DUE_AT", value=f"{due_h}h {due_m}m")
         )
-        lines.append(_build_service_line(total_runtime))
+        lines.append(await abuild_service_line(total_runtime))
 
     await update.message.reply_text("\n".join(lines))
 
@@ -991,13 +1784,14 @@ async def set_setting_cmd(update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    _apply_setting_value(key, parsed, context)
+    async with _state_lock:
+        _apply_setting_value(key, parsed, context)
 
-    try:
-        env_value = _format_env_value(key, parsed)
-        updated = _update_env_file(key, env_value)
-    except Exception:
-        updated = False
+        try:
+            env_value = _format_env_value(key, parsed)
+            updated = _update_env_file(key, env_value)
+        except Exception:
+            updated = False
 
     message = t("settings_updated", setting_key=key, value=parsed)
     if not updated:
@@ -1008,16 +1802,10 @@ async def set_setting_cmd(update, context: ContextTypes.DEFAULT_TYPE):
 # ================= STATS =================
 
 def get_stats(hours: int):
-    with sqlite3.connect(DB_FILE) as conn:
-        cur = conn.execute("""
-            SELECT
-                SUM(runtime_seconds),
-                SUM(fuel_used)
-            FROM generator_log
-            WHERE start_time >= datetime('now', ?)
-        """, (f"-{hours} hours",))
-        row = cur.fetchone()
-        return row[0] or 0, row[1] or 0
+    # Completed sessions clipped to the window.
+    now = clock.now()
+    stats = _sessions().window(to_epoch(now - dt.timedelta(hours=hours)), to_epoch(now))
+    return int(round(stats["runtime_seconds"])), stats["fuel_used"]
 
 
 def get_month_range(now: dt.datetime) -> tuple[dt.datetime, dt.datetime]:
@@ -1033,18 +1821,11 @@ def get_monthly_stats(start: dt.datetime, end: dt.datetime) -> tuple[int, float,
     start_iso = start.isoformat()
     end_iso = end.isoformat()
 
-    with sqlite3.connect(DB_FILE) as conn:
-        cur = conn.execute("""
-            SELECT
-                SUM(runtime_seconds),
-                SUM(fuel_used)
-            FROM generator_log
-            WHERE start_time >= ? AND start_time < ?
-        """, (start_iso, end_iso))
-        row = cur.fetchone()
-        runtime = row[0] or 0
-        fuel_used = row[1] or 0.0
+    stats = _sessions().window(to_epoch(start), to_epoch(end))
+    runtime = int(round(stats["runtime_seconds"]))
+    fuel_used = stats["fuel_used"]
 
+    with _connect() as conn:
         cur = conn.execute("""
             SELECT
                 SUM(amount)
@@ -1056,9 +1837,700 @@ def get_monthly_stats(start: dt.datetime, end: dt.datetime) -> tuple[int, float,
 
     return runtime, fuel_used, refuel_added
 
+
+# ================= PERIOD REPORT =================
+# daily_stats holds one row per calendar day. Runtime and fuel of a session
+# are split across the days it spans (pro rata), while starts, started and
+# longest session lengths go to the day the session started. Rows are folded
+# in by id watermark, so catching up after new sessions is incremental.
+
+def _day_start(when: dt.datetime) -> dt.datetime:
+    return when.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _split_by_day(start: dt.datetime, stop: dt.datetime):
+    """Yields (day, seconds) for each calendar day the interval covers."""
+    cursor = start
+    while cursor < stop:
+        next_day = _day_start(cursor) + dt.timedelta(days=1)
+        end = min(stop, next_day)
+        yield cursor.date().isoformat(), (end - cursor).total_seconds()
+        cursor = end
+
+
+def _session_shares(start: dt.datetime, stop: dt.datetime | None, runtime: int, fuel: float):
+    """Yields (day, runtime share, fuel share) for one logged session."""
+    span = (stop - start).total_seconds() if stop else 0
+    if span <= 0:
+        yield start.date().isoformat(), runtime, fuel
+        return
+    for day, seconds in _split_by_day(start, stop):
+        yield day, runtime * seconds / span, fuel * seconds / span
+
+
+_DAILY_UPSERT = """
+    INSERT INTO daily_stats
+        (day, runtime_seconds, fuel_used, starts, started_seconds, longest_seconds, fuel_added)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(day) DO UPDATE SET
+        runtime_seconds = runtime_seconds + excluded.runtime_seconds,
+        fuel_used = fuel_used + excluded.fuel_used,
+        starts = starts + excluded.starts,
+        started_seconds = started_seconds + excluded.started_seconds,
+        longest_seconds = MAX(longest_seconds, excluded.longest_seconds),
+        fuel_added = fuel_added + excluded.fuel_added
+"""
+
+
+def sync_daily_stats() -> None:
+    gen_mark = int(get_state("daily_stats_gen_id", 0))
+    refuel_mark = int(get_state("daily_stats_refuel_id", 0))
+    days: dict[str, list] = {}
+
+    def bucket(day: str) -> list:
+        return days.setdefault(day, [0.0, 0.0, 0, 0, 0, 0.0])
+
+    with _connect() as conn:
+        for row_id, start_s, stop_s, runtime, fuel in _iter_query(
+            conn,
+            "SELECT id, start_time, stop_time, runtime_seconds, fuel_used "
+            "FROM generator_log WHERE id > ? ORDER BY id",
+            (gen_mark,),
+        ):
+            gen_mark = row_id
+            start = _parse_iso(start_s)
+            if start is None:
+                continue
+            runtime = runtime or 0
+            for day, run_share, fuel_share in _session_shares(
+                start, _parse_iso(stop_s), runtime, fuel or 0.0
+            ):
+                b = bucket(day)
+                b[0] += run_share
+                b[1] += fuel_share
+            b = bucket(start.date().isoformat())
+            b[2] += 1
+            b[3] += runtime
+            b[4] = max(b[4], runtime)
+
+        for row_id, ts, amount in _iter_query(
+            conn,
+            "SELECT id, timestamp, amount FROM refuel_log WHERE id > ? ORDER BY id",
+            (refuel_mark,),
+        ):
+            refuel_mark = row_id
+            if amount and amount > 0 and ts:
+                bucket(ts[:10])[5] += amount
+
+        if days:
+            conn.executemany(_DAILY_UPSERT, [(day, *values) for day, values in days.items()])
+        conn.executemany(
+            "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+            [("daily_stats_gen_id", str(gen_mark)), ("daily_stats_refuel_id", str(refuel_mark))],
+        )
+
+
+def _segment_stats(conn, start: dt.datetime, end: dt.datetime) -> list:
+    """Same aggregates as a daily_stats row, for a partial day."""
+    stats = _sessions().window(to_epoch(start), to_epoch(end))
+    row = conn.execute("""
+        SELECT SUM(amount) FROM refuel_log
+        WHERE timestamp >= ? AND timestamp < ? AND amount > 0
+    """, (start.isoformat(), end.isoformat())).fetchone()
+    return [
+        stats["runtime_seconds"],
+        stats["fuel_used"],
+        stats["starts"],
+        stats["started_seconds"],
+        stats["longest_seconds"],
+        row[0] or 0.0,
+    ]
+
+
+def get_period_stats(start: dt.datetime, end: dt.datetime) -> dict:
+    """Completed sessions in [start, end), clipped at both ends."""
+    _check_not_archived(start)
+    sync_daily_stats()
+    first_full = start if start == _day_start(start) else _day_start(start) + dt.timedelta(days=1)
+    last_full = _day_start(end)
+
+    parts = []
+    with _connect() as conn:
+        if first_full < last_full:
+            row = conn.execute("""
+                SELECT SUM(runtime_seconds), SUM(fuel_used), SUM(starts),
+                       SUM(started_seconds), MAX(longest_seconds), SUM(fuel_added)
+                FROM daily_stats WHERE day >= ? AND day < ?
+            """, (first_full.date().isoformat(), last_full.date().isoformat())).fetchone()
+            parts.append([value or 0 for value in row])
+            if start < first_full:
+                parts.append(_segment_stats(conn, start, first_full))
+            if last_full < end:
+                parts.append(_segment_stats(conn, last_full, end))
+        else:
+            parts.append(_segment_stats(conn, start, end))
+
+    runtime = sum(p[0] for p in parts)
+    starts = sum(p[2] for p in parts)
+    elapsed = (min(end, clock.now()) - start).total_seconds()
+    return {
+        "runtime_seconds": int(round(runtime)),
+        "fuel_used": sum(p[1] for p in parts),
+        "fuel_added": sum(p[5] for p in parts),
+        "starts": starts,
+        "longest_seconds": max(p[4] for p in parts),
+        "average_seconds": int(sum(p[3] for p in parts) / starts) if starts else 0,
+        "utilization": runtime / elapsed * 100 if elapsed > 0 else 0.0,
+    }
+
+# ================= RUN BITMAPS =================
+# One 1440-bit blob per day. Completed sessions are folded in by
+# sync_run_bitmaps(), the open run by monitor_job on every tick, so charts
+# slice a few hundred bytes instead of re-deriving bins from session rows.
+
+RUN_BITMAP_BATCH = 10000
+
+
+def _merge_run_bitmaps(conn, days: dict[str, np.ndarray]) -> None:
+    if not days:
+        return
+    for day, blob in conn.execute(
+        "SELECT day, bits FROM run_bitmap WHERE day >= ? AND day <= ?",
+        (min(days), max(days)),
+    ):
+        if day in days:
+            days[day] |= run_bitmap.unpack(blob)
+    conn.executemany(
+        "INSERT OR REPLACE INTO run_bitmap (day, bits) VALUES (?, ?)",
+        [(day, run_bitmap.pack(bits)) for day, bits in days.items()],
+    )
+
+
+def sync_run_bitmaps() -> None:
+    mark = int(get_state("run_bitmap_gen_id", 0))
+    with _connect() as conn:
+        cur = conn.execute(
+            f"SELECT {SQL_COLUMNS} FROM generator_log "
+            "WHERE id > ? AND start_time IS NOT NULL ORDER BY id",
+            (mark,),
+        )
+        while True:
+            batch = cur.fetchmany(RUN_BITMAP_BATCH)
+            if not batch:
+                break
+            rows = np.array(batch, dtype=float)
+            days: dict[str, np.ndarray] = {}
+            run_bitmap.mark_many(days, rows[:, 1], rows[:, 2])
+            _merge_run_bitmaps(conn, days)
+            mark = int(rows[-1, 0])
+        conn.execute(
+            "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+            ("run_bitmap_gen_id", str(mark)),
+        )
+
+
+def _mark_open_run(now: dt.datetime) -> None:
+    start = _parse_iso(get_state("start_time"))
+    if start is None:
+        return
+    since = _parse_iso(get_state("run_bitmap_mark"))
+    if since is None or since < start:
+        since = start
+    days: dict[str, np.ndarray] = {}
+    run_bitmap.mark(days, since, now)
+    with _connect() as conn:
+        _merge_run_bitmaps(conn, days)
+    set_state("run_bitmap_mark", now.isoformat())
+
+
+def _run_minutes(start: dt.datetime, end: dt.datetime) -> np.ndarray:
+    """Running flag for every minute in [start, end); start on a whole minute."""
+    sync_run_bitmaps()
+    first_day = start.date()
+    day_count = (end - dt.timedelta(microseconds=1)).date().toordinal() - first_day.toordinal() + 1
+    with _connect() as conn:
+        blobs = dict(conn.execute(
+            "SELECT day, bits FROM run_bitmap WHERE day >= ? AND day < ?",
+            (
+                first_day.isoformat(),
+                (first_day + dt.timedelta(days=day_count)).isoformat(),
+            ),
+        ))
+    origin = dt.datetime.combine(first_day, dt.time())
+    minutes = np.concatenate([
+        run_bitmap.unpack(blobs.get((first_day + dt.timedelta(days=i)).isoformat()))
+        for i in range(day_count)
+    ])
+
+    # The open run is only in the blobs up to the last monitor tick.
+    if get_state("running", "0") == "1":
+        run_start = _parse_iso(get_state("start_time"))
+        if run_start:
+            run_bitmap.set_range(minutes, origin, run_start, min(end, clock.now()))
+
+    offset = int((start - origin).total_seconds() // 60)
+    return minutes[offset:offset + int((end - start).total_seconds() // 60)]
+
+# ================= QUANTILE SKETCHES =================
+# Probe RTT and session lengths go into one t-digest per metric, generator
+# and hour. Windows merge the hourly digests, so percentiles never need the
+# raw samples, and rows from several generators' databases can be pooled.
+
+SKETCH_WINDOWS = {
+    "probe_rtt": (("1h", 1), ("24h", 24), ("7d", 7 * 24)),
+    "session_seconds": (("7d", 7 * 24), ("30d", 30 * 24)),
+}
+SKETCH_QUANTILES = (0.5, 0.95, 0.99)
+SKETCH_METRICS = {
+    "probe_rtt": ("genbot_probe_rtt_window_seconds", "Probe RTT over sliding windows."),
+    "session_seconds": ("genbot_session_window_seconds", "Generator run length over sliding windows."),
+}
+SKETCH_BATCH = 10000
+# The open hour's digest lives in memory and is written when the hour rolls
+# over, before a read, at shutdown, or after this many samples (an hour of
+# ticks at the default INTERVAL), so a tick no longer rewrites the row.
+SKETCH_FLUSH_SAMPLES = 60
+
+# metric -> [DB file, source, bucket, digest, unsaved samples] for the hour
+# the monitor is writing to
+_open_sketches: dict[str, list] = {}
+
+
+def _sketch_source() -> str:
+    # Read on every call, so /set GENERATORNAME moves new samples at once.
+    return GENERATORNAME or ""
+
+
+def _sketch_bucket(when: dt.datetime) -> str:
+    return when.replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+def _load_sketch(conn, metric: str, source: str, bucket: str) -> TDigest:
+    row = conn.execute(
+        "SELECT digest FROM quantile_sketches WHERE metric = ? AND source = ? AND bucket = ?",
+        (metric, source, bucket),
+    ).fetchone()
+    return TDigest.from_bytes(row[0]) if row else TDigest()
+
+
+def _store_sketch(conn, metric: str, source: str, bucket: str, digest: TDigest) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO quantile_sketches (metric, source, bucket, digest) "
+        "VALUES (?, ?, ?, ?)",
+        (metric, source, bucket, digest.to_bytes()),
+    )
+
+
+def _flush_sketch(conn, metric: str) -> None:
+    entry = _open_sketches.get(metric)
+    if entry is None or not entry[4]:
+        return
+    db_file, source, bucket, digest, _ = entry
+    if db_file == DB_FILE:
+        _store_sketch(conn, metric, source, bucket, digest)
+    entry[4] = 0
+
+
+def flush_sketches() -> None:
+    with _connect() as conn:
+        for metric in list(_open_sketches):
+            _flush_sketch(conn, metric)
+
+
+def add_sketch_sample(metric: str, when: dt.datetime, value: float) -> None:
+    key = [DB_FILE, _sketch_source(), _sketch_bucket(when)]
+    entry = _open_sketches.get(metric)
+    if entry is None or entry[:3] != key:
+        with _connect() as conn:
+            _flush_sketch(conn, metric)
+            entry = [*key, _load_sketch(conn, metric, key[1], key[2]), 0]
+        _open_sketches[metric] = entry
+    entry[3].add(value)
+    entry[4] += 1
+    if entry[4] >= SKETCH_FLUSH_SAMPLES:
+        with _connect() as conn:
+            _flush_sketch(conn, metric)
+
+
+def sync_session_sketches() -> None:
+    mark = int(get_state("sketch_gen_id", 0))
+    source = _sketch_source()
+    with _connect() as conn:
+        _flush_sketch(conn, "session_seconds")
+        cur = conn.execute(
+            "SELECT id, (julianday(stop_time) - 2440587.5) * 86400.0, COALESCE(runtime_seconds, 0) "
+            "FROM generator_log WHERE id > ? AND stop_time IS NOT NULL ORDER BY id",
+            (mark,),
+        )
+        while True:
+            batch = cur.fetchmany(SKETCH_BATCH)
+            if not batch:
+                break
+            rows = np.array(batch, dtype=float)
+            hours = np.floor(np.round(rows[:, 1], 3) / 3600)
+            for hour in np.unique(hours):
+                bucket = from_epoch(hour * 3600).isoformat()
+                digest = _load_sketch(conn, "session_seconds", source, bucket)
+                digest.add_many(rows[hours == hour, 2])
+                _store_sketch(conn, "session_seconds", source, bucket, digest)
+            mark = int(rows[-1, 0])
+        conn.execute(
+            "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+            ("sketch_gen_id", str(mark)),
+        )
+    _open_sketches.pop("session_seconds", None)
+
+
+def get_sketch(
+    metric: str, start: dt.datetime, end: dt.datetime, source: str | None = None
+) -> TDigest:
+    """Hourly digests overlapping [start, end) merged; all generators unless source is given."""
+    flush_sketches()
+    sql = "SELECT digest FROM quantile_sketches WHERE metric = ? AND bucket >= ? AND bucket < ?"
+    params: list = [metric, _sketch_bucket(start), end.isoformat()]
+    if source is not None:
+        sql += " AND source = ?"
+        params.append(source)
+    with _connect() as conn:
+        return merge_all(TDigest.from_bytes(blob) for (blob,) in conn.execute(sql, params))
+
+
+def get_sketch_windows(now: dt.datetime) -> dict[str, list[tuple[str, TDigest]]]:
+    return {
+        metric: [
+            (label, get_sketch(metric, now - dt.timedelta(hours=hours), now))
+            for label, hours in windows
+        ]
+        for metric, windows in SKETCH_WINDOWS.items()
+    }
+
+
+def _sketch_metric_lines(now: dt.datetime) -> list[str]:
+    lines = []
+    for metric, windows in get_sketch_windows(now).items():
+        name, help_text = SKETCH_METRICS[metric]
+        lines.extend(metrics.render_summary(name, help_text, [
+            (
+                {"window": label},
+                {q: digest.quantile(q) for q in SKETCH_QUANTILES},
+                int(digest.count),
+                digest.total,
+            )
+            for label, digest in windows
+        ]))
+    return lines
+
+# ================= FUEL TIMELINE =================
+# Tank level at past moments (fuel_timeline.py). A checkpoint is stored at
+# every local midnight up to the last settled moment (now, or the start of the
+# open run, whose session row does not exist yet), so a lookup is one
+# checkpoint plus a replay of at most a day of sessions and refuels.
+
+def _open_run_until(times: np.ndarray, now: float) -> np.ndarray:
+    """Seconds of the open run (if any) up to each time, capped at now."""
+    if get_state("running", "0") != "1":
+        return np.zeros(len(times))
+    run_start = _parse_iso(get_state("start_time"))
+    if run_start is None:
+        return np.zeros(len(times))
+    return np.clip(np.minimum(times, now) - to_epoch(run_start), 0, None)
+
+
+def _fuel_burned(since: float, now: float):
+    """Cumulative burn after since: completed sessions plus the open run."""
+    store = _sessions()
+    rate = fuel_rate() / 3600.0
+
+    def burned_until(times: np.ndarray) -> np.ndarray:
+        times = np.asarray(times, dtype=float)
+        open_run = _open_run_until(times, now) - _open_run_until(np.array([since]), now)[0]
+        return store.accrued(times, "fuel", since) + open_run * rate
+
+    return burned_until
+
+
+def _refuels_between(conn, a: float, b: float) -> np.ndarray:
+    """Refuel/reset rows in (a, b] as (time, fuel_after)."""
+    rows = conn.execute(
+        "SELECT (julianday(timestamp) - 2440587.5) * 86400.0, fuel_after FROM refuel_log "
+        "WHERE timestamp > ? AND timestamp <= ? ORDER BY timestamp",
+        (from_epoch(a).isoformat(), from_epoch(b).isoformat()),
+    ).fetchall()
+    refuels = np.array(rows, dtype=float).reshape(-1, 2)
+    refuels[:, 0] = np.round(refuels[:, 0], 3)
+    return refuels
+
+
+def _replay_fuel(conn, base: tuple[float, float], times: np.ndarray, now: float) -> np.ndarray:
+    """Levels at sorted times from a (time, level) starting point."""
+    base_ts, base_level = base
+    refuels = _refuels_between(conn, base_ts, float(times[-1]))
+    burned = _fuel_burned(base_ts, now)
+    anchor_ts = np.concatenate(([base_ts], refuels[:, 0]))
+    return fuel_timeline.levels(
+        times,
+        burned(times),
+        anchor_ts,
+        np.concatenate(([base_level], refuels[:, 1])),
+        burned(anchor_ts),
+    )
+
+
+def _fuel_origin(conn, now: dt.datetime) -> tuple[dt.datetime, float] | None:
+    """
+    Start of the history and the level then, walked back from the first
+    refuel's fuel_before, or from the current estimate if there is none.
+    """
+    (first_session,) = conn.execute("SELECT MIN(start_time) FROM generator_log").fetchone()
+    first_refuel = conn.execute(
+        "SELECT timestamp, fuel_before, fuel_after FROM refuel_log ORDER BY timestamp, id LIMIT 1"
+    ).fetchone()
+    run_start = _parse_iso(get_state("start_time")) if get_state("running", "0") == "1" else None
+    known = [
+        when
+        for when in (_parse_iso(first_session), _parse_iso(first_refuel and first_refuel[0]), run_start)
+        if when is not None
+    ]
+    if not known:
+        return None
+    origin = min(known)
+    if first_refuel:
+        anchor, level = _parse_iso(first_refuel[0]), float(first_refuel[1] or 0.0)
+        if anchor == origin:
+            # Replays take refuels after their base, so the origin includes this one.
+            level = float(first_refuel[2] or 0.0)
+    else:
+        anchor, level = now, get_effective_fuel_left_now(now)
+    burned = _fuel_burned(to_epoch(origin), to_epoch(now))
+    return origin, level + float(burned(np.array([to_epoch(anchor)]))[0])
+
+
+def sync_fuel_checkpoints(now: dt.datetime | None = None) -> None:
+    if now is None:
+        now = clock.now()
+    settled = now
+    if get_state("running", "0") == "1":
+        run_start = _parse_iso(get_state("start_time"))
+        if run_start is not None:
+            settled = min(now, run_start)
+
+    with _connect() as conn:
+        last = conn.execute(
+            "SELECT ts, fuel FROM fuel_checkpoints ORDER BY ts DESC LIMIT 1"
+        ).fetchone()
+        if last is None:
+            origin = _fuel_origin(conn, now)
+            if origin is None:
+                return
+            base, level = origin
+            conn.execute(
+                "INSERT INTO fuel_checkpoints (ts, fuel) VALUES (?, ?)", (base.isoformat(), level)
+            )
+        else:
+            base, level = dt.datetime.fromisoformat(last[0]), float(last[1])
+
+        first = _day_start(base) + dt.timedelta(days=1)
+        if first > settled:
+            return
+        days = [first + dt.timedelta(days=i) for i in range((settled - first).days + 1)]
+        times = np.array([to_epoch(day) for day in days])
+        levels = _replay_fuel(conn, (to_epoch(base), level), times, to_epoch(now))
+        conn.executemany(
+            "INSERT OR REPLACE INTO fuel_checkpoints (ts, fuel) VALUES (?, ?)",
+            [(day.isoformat(), float(value)) for day, value in zip(days, levels)],
+        )
+
+
+def _fuel_base(conn, when: dt.datetime) -> tuple[float, float] | None:
+    """Last checkpoint at or before when as (time, level); the first one if when predates it."""
+    row = conn.execute(
+        "SELECT ts, fuel FROM fuel_checkpoints WHERE ts <= ? ORDER BY ts DESC LIMIT 1",
+        (when.isoformat(),),
+    ).fetchone() or conn.execute(
+        "SELECT ts, fuel FROM fuel_checkpoints ORDER BY ts LIMIT 1"
+    ).fetchone()
+    if row is None:
+        return None
+    return to_epoch(dt.datetime.fromisoformat(row[0])), float(row[1])
+
+
+def _fuel_at(conn, a: float, now: float) -> float | None:
+    base = _fuel_base(conn, from_epoch(a))
+    if base is None:
+        return None
+    if base[0] >= a:
+        return base[1]
+    return float(_replay_fuel(conn, base, np.array([a]), now)[0])
+
+
+def get_fuel_level_at(when: dt.datetime) -> float:
+    now = clock.now()
+    sync_fuel_checkpoints(now)
+    when = min(when, now)
+    _check_not_archived(when)
+    with _connect() as conn:
+        level = _fuel_at(conn, to_epoch(when), to_epoch(now))
+    return get_effective_fuel_left_now(now) if level is None else level
+
+
+def get_fuel_curve(start: dt.datetime, end: dt.datetime) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (times, levels) vertices of the tank level over [start, end], end capped
+    at now. Linear between vertices; a repeated time is a refuel's jump.
+    """
+    now_dt = clock.now()
+    now = to_epoch(now_dt)
+    _check_not_archived(start)
+    sync_fuel_checkpoints(now_dt)
+    a = to_epoch(start)
+    b = max(a, min(to_epoch(end), now))
+    with _connect() as conn:
+        level = _fuel_at(conn, a, now)
+        if level is None:
+            level = get_effective_fuel_left_now(now_dt)
+            return np.array([a, b]), np.array([level, level])
+        refuels = _refuels_between(conn, a, b)
+
+    starts, stops = _sessions().intervals(a, b)
+    edges = np.concatenate((starts, stops))
+    if get_state("running", "0") == "1":
+        run_start = _parse_iso(get_state("start_time"))
+        if run_start is not None:
+            edges = np.append(edges, to_epoch(run_start))
+    return fuel_timeline.curve(
+        a, b, level, _fuel_burned(a, now), refuels[:, 0], refuels[:, 1], edges
+    )
+
+# ================= CONSUMPTION MODEL =================
+# Litres per running hour fitted from refuel_log (consumption_model.py), one
+# row per generator. update_consumption_model() folds in the refuel rows after
+# the stored refuel_id, so a refuel costs one runtime lookup, never a refit;
+# the fit is cached in _consumption_models for fuel_rate().
+
+_consumption_models: dict[str, ConsumptionModel] = {}
+
+
+def _running_hours(since: str, until: str) -> float:
+    archived = get_archived_until()
+    if archived is not None and dt.datetime.fromisoformat(since) < archived:
+        # Unknown: some of the sessions are archived. NaN fails observe()'s checks.
+        return math.nan
+    a, b = to_epoch(dt.datetime.fromisoformat(since)), to_epoch(dt.datetime.fromisoformat(until))
+    if b <= a:
+        return 0.0
+    open_run = np.diff(_open_run_until(np.array([a, b]), to_epoch(clock.now())))[0]
+    return (_sessions().window(a, b)["runtime_seconds"] + open_run) / 3600.0
+
+
+def update_consumption_model() -> ConsumptionModel:
+    source = GENERATORNAME or ""
+    columns = ", ".join(ConsumptionModel.FIELDS)
+    with _connect() as conn:
+        row = conn.execute(
+            f"SELECT {columns} FROM consumption_model WHERE source = ?", (source,)
+        ).fetchone()
+        model = ConsumptionModel.from_row(row) if row else ConsumptionModel()
+        rows = conn.execute(
+            "SELECT id, timestamp, amount, fuel_before, fuel_after FROM refuel_log "
+            "WHERE id > ? ORDER BY id",
+            (model.refuel_id,),
+        ).fetchall()
+        for refuel_id, ts, amount, fuel_before, fuel_after in rows:
+            model.observe(
+                refuel_id,
+                ts,
+                float(amount or 0.0),
+                float(fuel_before or 0.0),
+                float(fuel_after or 0.0),
+                _running_hours,
+                FUEL_CONSUMPTION,
+            )
+        if rows:
+            conn.execute(
+                f"INSERT OR REPLACE INTO consumption_model (source, {columns}) "
+                f"VALUES (?, {', '.join('?' * len(ConsumptionModel.FIELDS))})",
+                (source, *model.to_row()),
+            )
+    _consumption_models[source] = model
+    return model
+
+
+def get_consumption_model() -> ConsumptionModel:
+    model = _consumption_models.get(GENERATORNAME or "")
+    return model if model is not None else update_consumption_model()
+
+# ================= ASYNC DB =================
+# Awaitable versions of the helpers above; they run on the DB thread.
+
+ais_user_allowed = _awaitable(is_user_allowed)
+aadd_user_to_whitelist = _awaitable(add_user_to_whitelist)
+aremove_user_from_whitelist = _awaitable(remove_user_from_whitelist)
+aget_whitelist_users = _awaitable(get_whitelist_users)
+aget_state = _awaitable(get_state)
+aset_state = _awaitable(set_state)
+aget_stats = _awaitable(get_stats)
+aget_monthly_stats = _awaitable(get_monthly_stats)
+aget_period_stats = _awaitable(get_period_stats)
+aget_archived_until = _awaitable(get_archived_until)
+aget_total_runtime_seconds = _awaitable(get_total_runtime_seconds)
+aget_service_due_seconds = _awaitable(get_service_due_seconds)
+abuild_service_line = _awaitable(_build_service_line)
+aget_effective_fuel_left_now = _awaitable(get_effective_fuel_left_now)
+aget_run_intervals_last24h = _awaitable(_get_run_intervals_last24h)
+aget_run_minutes_last24h = _awaitable(_get_run_minutes_last24h)
+aget_fuel_curve = _awaitable(get_fuel_curve)
+aget_fuel_level_at = _awaitable(get_fuel_level_at)
+
+
+async def _render_last24h_image(now: dt.datetime) -> str:
+    window_end = _get_aligned_window_end(now)
+    with tracing.span("chart.sql"):
+        minutes = await aget_run_minutes_last24h(window_end)
+    with tracing.span("chart.render"):
+        bins = _bins_running(minutes, bin_minutes=5)
+        return await asyncio.to_thread(_generate_daily_grid_image, bins, 5, window_end)
+
+async def _render_heatmap_image(first_day: dt.date, days: int, bin_minutes: int, title: str) -> str:
+    with tracing.span("chart.sql"):
+        matrix = await run_db(_heatmap_matrix, first_day, days, bin_minutes)
+    with tracing.span("chart.render"):
+        return await asyncio.to_thread(_generate_heatmap_image, matrix, first_day, title)
+
+
+async def _render_period_heatmap(period: str, now: dt.datetime) -> str:
+    days, bin_minutes = HEATMAP_PERIODS[period]
+    first_day = now.date() - dt.timedelta(days=days - 1)
+    return await _render_heatmap_image(
+        first_day, days, bin_minutes, t(f"heatmap_title_{period}", generator=GENERATORNAME)
+    )
+
+
+async def _render_fuel_chart(times: np.ndarray, levels: np.ndarray, title: str) -> str:
+    with tracing.span("chart.render"):
+        return await asyncio.to_thread(_generate_fuel_chart, times, levels, TANK_CAPACITY, title)
+
+
+async def _upload_chart(render, upload, target: str):
+    """Awaits render (-> PNG path), passes the open file to upload, removes the file."""
+    img_path = None
+    try:
+        img_path = await render
+        with (
+            open(img_path, "rb") as f,
+            UPLOAD_SECONDS.time(target=target),
+            tracing.span(f"{target}.upload"),
+        ):
+            await upload(f)
+    finally:
+        if img_path:
+            try:
+                os.unlink(img_path)
+            except Exception:
+                pass
+
 # ================= restart msg =================
 async def startup_message(app: Application):
-    now = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    now = clock.now().strftime("%Y-%m-%d %H:%M:%S")
     await app.bot.send_message(
         chat_id=CHANNELID,
         text=t("bot_restarted", time=now)
@@ -1067,17 +2539,50 @@ async def startup_message(app: Application):
 
 # ================= COMMANDS =================
 
+def _sketch_detail_text(windows: dict[str, list[tuple[str, TDigest]]]) -> str:
+    def fmt(digest: TDigest, scale: float, spec: str) -> dict:
+        values = {}
+        for q in SKETCH_QUANTILES:
+            value = digest.quantile(q)
+            values[f"p{round(q * 100)}"] = "-" if value is None else format(value * scale, spec)
+        return values
+
+    lines = [t("status_detail_header")]
+    for label, digest in windows["probe_rtt"]:
+        lines.append(t("status_detail_rtt_line", window=label, count=int(digest.count), **fmt(digest, 1000, ".1f")))
+    for label, digest in windows["session_seconds"]:
+        lines.append(
+            t("status_detail_session_line", window=label, count=int(digest.count), **fmt(digest, 1 / 60, ".0f"))
+        )
+    return "\n".join(lines)
+
+
+def _consumption_detail_text(model: ConsumptionModel) -> str:
+    key = f"status_detail_consumption_{FUEL_MODEL}"
+    if model.rate is None:
+        return t("status_detail_consumption_pending", count=model.n, needed=consumption_model.MIN_SAMPLES)
+    return t(key, rate=model.rate, stderr=model.stderr, count=model.n, configured=FUEL_CONSUMPTION)
+
+
 async def status_cmd(update, context: ContextTypes.DEFAULT_TYPE):
-    now = dt.datetime.now()
-    fuel_left = get_effective_fuel_left_now(now)
-    remaining_time = format_remaining_time(fuel_left)
-    running = get_state("running", "0") == "1"
+    arg = context.args[0].lower() if context.args else None
+    if arg is not None and arg not in HEATMAP_PERIODS and arg != "detail":
+        await update.message.reply_text(t("status_usage"))
+        return
+    period = arg if arg in HEATMAP_PERIODS else None
 
-    day_runtime, day_fuel = get_stats(24)
-    week_runtime, week_fuel = get_stats(24 * 7)
-    total_runtime = get_total_runtime_seconds(now)
+    now = clock.now()
+    with tracing.span("status.sql"):
+        fuel_left = await aget_effective_fuel_left_now(now)
+        running = await aget_state("running", "0") == "1"
+
+        day_runtime, day_fuel = await aget_stats(24)
+        week_runtime, week_fuel = await aget_stats(24 * 7)
+        total_runtime = await aget_total_runtime_seconds(now)
+        service_line = await abuild_service_line(total_runtime)
+
+    remaining_time = format_remaining_time(fuel_left)
     total_h, total_m = _hours_minutes_from_seconds(total_runtime)
-    service_line = _build_service_line(total_runtime)
 
     state_label = t("state_running") if running else t("state_stopped")
 
@@ -1100,24 +2605,57 @@ async def status_cmd(update, context: ContextTypes.DEFAULT_TYPE):
         f"{t('motohours_line', total_hours=total_h, total_minutes=total_m)}\n"
         f"{service_line}"
     )
+    if arg == "detail":
+        with tracing.span("status.sketches"):
+            windows = await run_db(get_sketch_windows, now)
+            model = await run_db(get_consumption_model)
+        msg = f"{msg}\n\n{_sketch_detail_text(windows)}\n{_consumption_detail_text(model)}"
+
+    with tracing.span("status.reply"):
+        await update.message.reply_text(msg)
+
+    # Last-24h dial, or the week/month heatmap when asked for
+    render = _render_period_heatmap(period, now) if period else _render_last24h_image(now)
+    await _upload_chart(render, lambda f: update.message.reply_photo(photo=f), "status")
+
+def _record_fuel_change(
+    now: dt.datetime,
+    amount: float,
+    fuel_before: float,
+    fuel_after: float,
+    user_id: int,
+    username: str,
+) -> None:
+    with _connect() as conn:
+        conn.execute("""
+            INSERT INTO refuel_log (
+                timestamp,
+                amount,
+                fuel_before,
+                fuel_after,
+                user_id,
+                username
+            ) VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            now.isoformat(),
+            amount,
+            fuel_before,
+            fuel_after,
+            user_id,
+            username
+        ))
+    # This row may move the fitted rate; fuel_start below is set with the new one.
+    update_consumption_model()
 
-    await update.message.reply_text(msg)
+    if get_state("running", "0") == "1":
+        # Adjust fuel_start so that effective fuel NOW becomes fuel_after
+        apply_fuel_setpoint_while_running(fuel_after, now)
+    else:
+        set_state("fuel_left", fuel_after)
+    sync_daily_stats()
 
-    # Debug: send last-24h dial image in /status
-    img_path = None
-    try:
-        window_end = _get_aligned_window_end(now)
-        intervals = _get_run_intervals_last24h(window_end)
-        bins = _bins_running(intervals, window_end, bin_minutes=5)
-        img_path = _generate_daily_grid_image(bins, 5, window_end)
-        with open(img_path, "rb") as f:
-            await update.message.reply_photo(photo=f)
-    finally:
-        if img_path:
-            try:
-                os.unlink(img_path)
-            except Exception:
-                pass
+    # allow alert to trigger again after refuel
+    set_state("low_fuel_alerted", 0)
 
 @whitelist_required
 async def refuel_cmd(update, context: ContextTypes.DEFAULT_TYPE):
@@ -1137,43 +2675,15 @@ async def refuel_cmd(update, context: ContextTypes.DEFAULT_TYPE):
     user_id = user.id
     username = user.username or user.full_name
 
-    now = dt.datetime.now()
-    running = get_state("running", "0") == "1"
-
-    fuel_before = get_effective_fuel_left_now(now)
-    fuel_after = min(TANK_CAPACITY, fuel_before + amount)
-
-    if running:
-       # Adjust fuel_start so that effective fuel NOW becomes fuel_after
-        apply_fuel_setpoint_while_running(fuel_after, now)
-    else:
-        set_state("fuel_left", fuel_after)
-
-    # allow alert to trigger again after refuel
-    set_state("low_fuel_alerted", 0)
-
-    with sqlite3.connect(DB_FILE) as conn:
-        conn.execute("""
-            INSERT INTO refuel_log (
-              timestamp,
-              amount,
-              fuel_before,
-              fuel_after,
-              user_id,
-              username
-           ) VALUES (?, ?, ?, ?, ?, ?)
-      """, (
-        now.isoformat(),
-        amount,
-        fuel_before,
-        fuel_after,
-        user_id,
-        username
-    ))
+    async with _state_lock:
+        now = clock.now()
 
-    # allow alert to trigger again after refuel
-    set_state("low_fuel_alerted", 0)
+        fuel_before = await aget_effective_fuel_left_now(now)
+        fuel_after = min(TANK_CAPACITY, fuel_before + amount)
 
+        await run_db(
+            _record_fuel_change, now, amount, fuel_before, fuel_after, user_id, username
+        )
 
     await update.message.reply_text(
         t(
@@ -1209,38 +2719,21 @@ async def reset_fuel_cmd(update, context: ContextTypes.DEFAULT_TYPE):
     user_id = user.id
     username = user.username or user.full_name
 
-    now = dt.datetime.now()
-    running = get_state("running", "0") == "1"
-
-    fuel_before = get_effective_fuel_left_now(now)
-    fuel_after = value  # already validated <= TANK_CAPACITY
-
-    if running:
-       apply_fuel_setpoint_while_running(fuel_after, now)
-    else:
-        set_state("fuel_left", fuel_after)
+    async with _state_lock:
+        now = clock.now()
 
-    set_state("low_fuel_alerted", 0)
+        fuel_before = await aget_effective_fuel_left_now(now)
+        fuel_after = value  # already validated <= TANK_CAPACITY
 
-    with sqlite3.connect(DB_FILE) as conn:
-        conn.execute("""
-            INSERT INTO refuel_log (
-                timestamp,
-                amount,
-                fuel_before,
-                fuel_after,
-                user_id,
-                username
-            ) VALUES (?, ?, ?, ?, ?, ?)
-         """, (
-            now.isoformat(),
+        await run_db(
+            _record_fuel_change,
+            now,
             0.0,  # reset marker
             fuel_before,
             fuel_after,
             user_id,
-            f"{username} (reset)"
-    ))
-
+            f"{username} (reset)",
+        )
 
     await update.message.reply_text(
         t(
@@ -1253,118 +2746,174 @@ async def reset_fuel_cmd(update, context: ContextTypes.DEFAULT_TYPE):
 
 
 # ================= MONITOR =================
+@watchdog.timed_job("monitor", lambda: INTERVAL)
+@profiling.scoped("monitor")
 async def monitor_job(context: ContextTypes.DEFAULT_TYPE):
-    running = get_state("running", "0") == "1"
-    alive = ping(GENERATORADDR)
-    now = dt.datetime.now()
+    report = await tick_profiler.run(_monitor_job(context))
+    if report:
+        await send_perf_report(context.application, report)
+
+
+async def _monitor_job(context: ContextTypes.DEFAULT_TYPE):
+    with tracing.span("monitor.tick"):
+        # Probe outside the state lock so a slow ping does not hold up /refuel.
+        with tracing.span("monitor.probe"):
+            alive, rtt = _probe_outcome(await _probe())
+            record_probe(clock.now(), alive, rtt)
+            if rtt is not None and not math.isnan(rtt):
+                await run_db(add_sketch_sample, "probe_rtt", clock.now(), rtt)
+        # Alerts are queued under the lock and sent after it is released, so a
+        # flood-wait on send() never stalls /refuel or /set.
+        outbox: list[str] = []
+        async with _state_lock:
+            await _monitor_tick(outbox, alive)
+        await send_alerts(context.application, outbox)
+
+
+def _record_start(now: dt.datetime) -> float:
+    set_state("running", 1)
+    set_state("start_time", now.isoformat())
 
-    # Low-fuel alert (while running)
-    if running:
-        fuel_now = get_effective_fuel_left_now(now)
-        rem_h = remaining_hours_from_fuel(fuel_now)
+    fuel_left_db = float(get_state("fuel_left", INITIAL_FUEL))
+    set_fuel_start(fuel_left_db)
 
-        alerted = get_state("low_fuel_alerted", "0") == "1"
+    return get_effective_fuel_left_now(now)
 
-        if (rem_h < LOW_FUEL_HOURS) and (not alerted):
-            remaining_time = format_remaining_time(fuel_now)
-            await send(
-                context.application,
-                t(
-                    "low_fuel_alert",
-                    generator=GENERATORNAME,
-                    fuel_left=fuel_now,
-                    remaining_time=remaining_time,
-                    threshold=LOW_FUEL_HOURS,
-                )
-            )
-            set_state("low_fuel_alerted", 1)
 
-        if rem_h >= LOW_FUEL_HOURS:
-            set_state("low_fuel_alerted", 0)
+def _record_stop(now: dt.datetime) -> tuple[int, float, float]:
+    seconds = get_used_since_start_seconds(now)
+    used = fuel_used(seconds)
 
-    # Service reminder
-    due_seconds = get_service_due_seconds()
-    if due_seconds is not None:
-        total_runtime = get_total_runtime_seconds(now)
-        alerted = get_state("service_alerted", "0") == "1"
-        if (total_runtime >= due_seconds) and (not alerted):
-            total_h, total_m = _hours_minutes_from_seconds(total_runtime)
-            await send(
-                context.application,
-                t(
-                    "service_due_alert",
-                    generator=GENERATORNAME,
-                    total_hours=total_h,
-                    total_minutes=total_m,
-                )
-            )
-            set_state("service_alerted", 1)
+    fuel_start = get_fuel_start()
+    if fuel_start is None:
+        fuel_start = float(get_state("fuel_left", INITIAL_FUEL))
 
-    # START
-    if alive and not running:
-        running = True
-        start_time = now.isoformat()
+    fuel_left = max(0.0, fuel_start - used)
 
-        set_state("running", 1)
-        set_state("start_time", start_time)
+    start_s = get_state("start_time")
+    with _connect() as conn:
+        cur = conn.execute("""
+            INSERT INTO generator_log
+            (start_time, stop_time, runtime_seconds, fuel_used)
+            VALUES (?, ?, ?, ?)
+        """, (
+            start_s,
+            now.isoformat(),
+            seconds,
+            used
+        ))
+    store = _session_store
+    start_dt = _parse_iso(start_s)
+    if (
+        store is not None
+        and _session_store_path == DB_FILE
+        and start_dt is not None
+        and store.last_id < cur.lastrowid
+    ):
+        store.append(cur.lastrowid, start_dt, now, seconds, used)
 
-        fuel_left_db = float(get_state("fuel_left", INITIAL_FUEL))
-        set_fuel_start(fuel_left_db)
+    set_state("running", 0)
+    set_state("fuel_left", fuel_left)
+    set_state("fuel_start", None)
+    sync_daily_stats()
+    sync_run_bitmaps()
+    sync_session_sketches()
 
-        fuel_now = get_effective_fuel_left_now(now)
-        remaining_time = format_remaining_time(fuel_now)
+    return seconds, used, fuel_left
 
-        await send(
-            context.application,
+
+async def _check_low_fuel(outbox: list[str], now: dt.datetime):
+    fuel_now = await aget_effective_fuel_left_now(now)
+    rem_h = remaining_hours_from_fuel(fuel_now)
+
+    alerted = await aget_state("low_fuel_alerted", "0") == "1"
+
+    if (rem_h < LOW_FUEL_HOURS) and (not alerted):
+        remaining_time = format_remaining_time(fuel_now)
+        outbox.append(
             t(
-                "generator_started",
+                "low_fuel_alert",
                 generator=GENERATORNAME,
                 fuel_left=fuel_now,
                 remaining_time=remaining_time,
+                threshold=LOW_FUEL_HOURS,
             )
         )
+        await aset_state("low_fuel_alerted", 1)
 
-    # STOP
-    if (not alive) and running:
-        stop_time = now
-
-        seconds = get_used_since_start_seconds(now)
-        used = fuel_used(seconds)
-
-        fuel_start = get_fuel_start()
-        if fuel_start is None:
-            fuel_start = float(get_state("fuel_left", INITIAL_FUEL))
-
-        fuel_left = max(0.0, fuel_start - used)
-        remaining_time = format_remaining_time(fuel_left)
-
-        with sqlite3.connect(DB_FILE) as conn:
-            conn.execute("""
-                INSERT INTO generator_log
-                (start_time, stop_time, runtime_seconds, fuel_used)
-                VALUES (?, ?, ?, ?)
-            """, (
-                get_state("start_time"),
-                stop_time.isoformat(),
-                seconds,
-                used
-            ))
-
-        set_state("running", 0)
-        set_state("fuel_left", fuel_left)
-        set_state("fuel_start", None)
-
-        await send(
-            context.application,
+    if rem_h >= LOW_FUEL_HOURS:
+        await aset_state("low_fuel_alerted", 0)
+
+
+async def _check_service(outbox: list[str], now: dt.datetime):
+    due_seconds = await aget_service_due_seconds()
+    if due_seconds is None:
+        return
+    total_runtime = await aget_total_runtime_seconds(now)
+    alerted = await aget_state("service_alerted", "0") == "1"
+    if (total_runtime >= due_seconds) and (not alerted):
+        total_h, total_m = _hours_minutes_from_seconds(total_runtime)
+        outbox.append(
             t(
-                "generator_stopped",
+                "service_due_alert",
                 generator=GENERATORNAME,
-                runtime_minutes=seconds // 60,
-                fuel_used=used,
-                fuel_left=fuel_left,
-                remaining_time=remaining_time,
+                total_hours=total_h,
+                total_minutes=total_m,
             )
         )
+        await aset_state("service_alerted", 1)
+
+
+async def _monitor_tick(outbox: list[str], alive: bool):
+    running = await aget_state("running", "0") == "1"
+    now = clock.now()
+
+    # Low-fuel alert (while running)
+    if running:
+        with tracing.span("monitor.low_fuel"):
+            await _check_low_fuel(outbox, now)
+
+    # Service reminder
+    with tracing.span("monitor.service"):
+        await _check_service(outbox, now)
+
+    # START
+    if alive and not running:
+        running = True
+        with tracing.span("monitor.start"):
+            fuel_now = await run_db(_record_start, now)
+            remaining_time = format_remaining_time(fuel_now)
+
+            outbox.append(
+                t(
+                    "generator_started",
+                    generator=GENERATORNAME,
+                    fuel_left=fuel_now,
+                    remaining_time=remaining_time,
+                )
+            )
+
+    # STOP
+    if (not alive) and running:
+        with tracing.span("monitor.stop"):
+            seconds, used, fuel_left = await run_db(_record_stop, now)
+            remaining_time = format_remaining_time(fuel_left)
+
+            outbox.append(
+                t(
+                    "generator_stopped",
+                    generator=GENERATORNAME,
+                    runtime_minutes=seconds // 60,
+                    fuel_used=used,
+                    fuel_left=fuel_left,
+                    remaining_time=remaining_time,
+                )
+            )
+
+    # Keep today's runtime bitmap current while the run is open
+    if alive and running:
+        with tracing.span("monitor.bitmap"):
+            await run_db(_mark_open_run, now)
 
 
 # ================== HELP =================
@@ -1405,15 +2954,17 @@ async def setservice_cmd(update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if hours == 0:
-        set_state("service_due_seconds", "")
-        set_state("service_alerted", 0)
+        async with _state_lock:
+            await aset_state("service_due_seconds", "")
+            await aset_state("service_alerted", 0)
         await update.message.reply_text(t("setservice_cleared"))
         return
 
-    total_runtime = get_total_runtime_seconds()
-    due_seconds = total_runtime + int(hours * 3600)
-    set_state("service_due_seconds", due_seconds)
-    set_state("service_alerted", 0)
+    async with _state_lock:
+        total_runtime = await aget_total_runtime_seconds()
+        due_seconds = total_runtime + int(hours * 3600)
+        await aset_state("service_due_seconds", due_seconds)
+        await aset_state("service_alerted", 0)
 
     await update.message.reply_text(
         t("setservice_done", hours=hours)
@@ -1441,22 +2992,23 @@ async def setmhours_cmd(update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(t("setmhours_invalid_value"))
         return
 
-    raw_total = get_total_runtime_seconds(include_offset=False)
-    target_seconds = int(hours * 3600)
-    offset_seconds = target_seconds - raw_total
-    set_state("motohours_offset_seconds", offset_seconds)
+    async with _state_lock:
+        raw_total = await aget_total_runtime_seconds(include_offset=False)
+        target_seconds = int(hours * 3600)
+        offset_seconds = target_seconds - raw_total
+        await aset_state("motohours_offset_seconds", offset_seconds)
 
     await update.message.reply_text(
         t("setmhours_done", hours=hours)
     )
 
 async def month_cmd(update, context: ContextTypes.DEFAULT_TYPE):
-    now = dt.datetime.now()
+    now = clock.now()
     start, end = get_month_range(now)
-    runtime, fuel_used, refuel_added = get_monthly_stats(start, end)
-    total_runtime = get_total_runtime_seconds(now)
+    runtime, fuel_used, refuel_added = await aget_monthly_stats(start, end)
+    total_runtime = await aget_total_runtime_seconds(now)
     total_h, total_m = _hours_minutes_from_seconds(total_runtime)
-    service_line = _build_service_line(total_runtime)
+    service_line = await abuild_service_line(total_runtime)
 
     month_label = start.strftime("%Y-%m")
     msg = t(
@@ -1476,16 +3028,86 @@ async def month_cmd(update, context: ContextTypes.DEFAULT_TYPE):
 
     await update.message.reply_text(msg)
 
+
+def _parse_report_bound(raw: str, is_end: bool) -> dt.datetime:
+    # A bare date covers the whole day: the end bound becomes next midnight.
+    if len(raw) == 10:
+        day = dt.datetime.combine(dt.date.fromisoformat(raw), dt.time())
+        return day + dt.timedelta(days=1) if is_end else day
+    return _local_naive(dt.datetime.fromisoformat(raw))
+
+
+async def report_cmd(update, context: ContextTypes.DEFAULT_TYPE):
+    args = context.args or []
+    try:
+        if not 1 <= len(args) <= 2:
+            raise ValueError
+        start = _parse_report_bound(args[0], False)
+        end = _parse_report_bound(args[1], True) if len(args) > 1 else clock.now()
+        if end <= start:
+            raise ValueError
+    except ValueError:
+        await update.message.reply_text(t("report_usage"))
+        return
+    archived = await aget_archived_until()
+    if archived is not None and start < archived:
+        await update.message.reply_text(t("report_archived", date=archived.strftime("%Y-%m-%d %H:%M")))
+        return
+
+    stats = await aget_period_stats(start, end)
+    with tracing.span("chart.sql"):
+        fuel_times, fuel_levels = await aget_fuel_curve(start, end)
+        fuel_start = await aget_fuel_level_at(start)
+        fuel_end = await aget_fuel_level_at(end)
+    runtime_h, runtime_m = _hours_minutes_from_seconds(stats["runtime_seconds"])
+    longest_h, longest_m = _hours_minutes_from_seconds(stats["longest_seconds"])
+    average_h, average_m = _hours_minutes_from_seconds(stats["average_seconds"])
+    await update.message.reply_text(
+        t(
+            "period_report",
+            generator=GENERATORNAME,
+            start=start.strftime("%Y-%m-%d %H:%M"),
+            end=end.strftime("%Y-%m-%d %H:%M"),
+            runtime_hours=runtime_h,
+            runtime_minutes=runtime_m,
+            utilization=stats["utilization"],
+            starts=stats["starts"],
+            longest_hours=longest_h,
+            longest_minutes=longest_m,
+            average_hours=average_h,
+            average_minutes=average_m,
+            fuel_used=stats["fuel_used"],
+            fuel_added=stats["fuel_added"],
+            fuel_start=fuel_start,
+            fuel_end=fuel_end,
+            fuel_min=fuel_levels.min(),
+        )
+    )
+
+    title = t(
+        "fuel_chart_title",
+        generator=GENERATORNAME,
+        start=start.strftime("%Y-%m-%d %H:%M"),
+        end=end.strftime("%Y-%m-%d %H:%M"),
+    )
+    await _upload_chart(
+        _render_fuel_chart(fuel_times, fuel_levels, title),
+        lambda f: update.message.reply_photo(photo=f),
+        "report",
+    )
+
+@watchdog.timed_job("daily_report", lambda: 24 * 3600)
+@profiling.scoped("daily_report")
 async def daily_report(context: ContextTypes.DEFAULT_TYPE):
     app = context.application
-    now = dt.datetime.now()
+    now = clock.now()
 
-    runtime, fuel_used_24h = get_stats(24)
-    total_runtime = get_total_runtime_seconds(now)
+    runtime, fuel_used_24h = await aget_stats(24)
+    total_runtime = await aget_total_runtime_seconds(now)
     total_h, total_m = _hours_minutes_from_seconds(total_runtime)
-    service_line = _build_service_line(total_runtime)
+    service_line = await abuild_service_line(total_runtime)
 
-    fuel_left = get_effective_fuel_left_now(now)
+    fuel_left = await aget_effective_fuel_left_now(now)
     remaining_time = format_remaining_time(fuel_left)
 
     if runtime > 0:
@@ -1515,33 +3137,26 @@ async def daily_report(context: ContextTypes.DEFAULT_TYPE):
 
     await send(app, msg)
 
-    # Dial image for last 24h runtime
-    img_path = None
-    try:
-        window_end = _get_aligned_window_end(now)
-        intervals = _get_run_intervals_last24h(window_end)
-        bins = _bins_running(intervals, window_end, bin_minutes=5)
-        img_path = _generate_daily_grid_image(bins, 5, window_end)
-        with open(img_path, "rb") as f:
-            await app.bot.send_photo(chat_id=CHANNELID, photo=f)
-    finally:
-        if img_path:
-            try:
-                os.unlink(img_path)
-            except Exception:
-                pass
+    # Dial image for last 24h runtime, then the 7-day heatmap
+    def upload(f):
+        return app.bot.send_photo(chat_id=CHANNELID, photo=f)
+
+    await _upload_chart(_render_last24h_image(now), upload, "daily_report")
+    await _upload_chart(_render_period_heatmap("week", now), upload, "daily_report")
 
 
+@watchdog.timed_job("monthly_report", lambda: 24 * 3600)
+@profiling.scoped("monthly_report")
 async def monthly_report(context: ContextTypes.DEFAULT_TYPE):
-    now = dt.datetime.now()
+    now = clock.now()
     if now.day != 1:
         return
 
     start, end = get_month_range(now)
-    runtime, fuel_used, refuel_added = get_monthly_stats(start, end)
-    total_runtime = get_total_runtime_seconds(now)
+    runtime, fuel_used, refuel_added = await aget_monthly_stats(start, end)
+    total_runtime = await aget_total_runtime_seconds(now)
     total_h, total_m = _hours_minutes_from_seconds(total_runtime)
-    service_line = _build_service_line(total_runtime)
+    service_line = await abuild_service_line(total_runtime)
 
     month_label = start.strftime("%Y-%m")
     msg = t(
@@ -1561,58 +3176,746 @@ async def monthly_report(context: ContextTypes.DEFAULT_TYPE):
 
     await send(context.application, msg)
 
+    _, bin_minutes = HEATMAP_PERIODS["month"]
+    days = (end - start).days
+    await _upload_chart(
+        _render_heatmap_image(
+            start.date(), days, bin_minutes,
+            t("heatmap_title_report_month", generator=GENERATORNAME, month=month_label),
+        ),
+        lambda f: context.application.bot.send_photo(chat_id=CHANNELID, photo=f),
+        "monthly_report",
+    )
+
+
+
+# ================= WATCHDOG ==================
+async def watchdog_alert(app: Application, kind: str, **values):
+    if not ADMIN_USER_ID:
+        return
+    key = "watchdog_lag_alert" if kind == "lag" else "watchdog_job_alert"
+    await app.bot.send_message(chat_id=ADMIN_USER_ID, text=t(key, **values))
+
+
+async def health_cmd(update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+
+    if user.id != ADMIN_USER_ID:
+        await update.message.reply_text(t("admin_only"))
+        return
+
+    lines = [
+        t("health_header"),
+        t(
+            "health_lag_line",
+            last=watchdog.lag_last_ms,
+            p95=watchdog.lag_percentile(0.95),
+            max=watchdog.lag_max_ms,
+        ),
+    ]
+    if not watchdog.jobs:
+        lines.append(t("health_no_jobs"))
+    for timing in watchdog.jobs.values():
+        lines.append(
+            t(
+                "health_job_line",
+                job=timing.name,
+                runs=timing.runs,
+                last=timing.last_duration,
+                max=timing.max_duration,
+                interval=timing.last_interval,
+                overruns=timing.overruns,
+                missed=timing.missed,
+            )
+        )
+
+    last = await aget_state("maintenance_last")
+    if last:
+        done = json.loads(last)
+        lines.append(
+            t(
+                "health_maintenance_line",
+                time=done["time"],
+                sessions=done["sessions"],
+                refuels=done["refuels"],
+                freed=done["freed_bytes"] / 1e6,
+                free=done["free_bytes"] / 1e6,
+            )
+        )
+
+    await update.message.reply_text("\n".join(lines))
+
+
+async def probes_cmd(update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+
+    if user.id != ADMIN_USER_ID:
+        await update.message.reply_text(t("admin_only"))
+        return
+
+    now = clock.now()
+    samples = get_probe_window_samples(now)
+    summaries = await asyncio.to_thread(get_probe_summaries, now, samples)
+    lines = [t("probes_header", capacity=PROBE_RING_SIZE, stored=_probe_samples().count)]
+    for label, summary in summaries:
+        if not summary["samples"]:
+            lines.append(t("probes_window_empty", window=label))
+            continue
+        rtt = "/".join(
+            "-" if summary[key] is None else f"{summary[key]:.1f}"
+            for key in ("rtt_p50_ms", "rtt_p95_ms", "rtt_p99_ms", "rtt_max_ms")
+        )
+        lines.append(
+            t(
+                "probes_window_line",
+                window=label,
+                samples=summary["samples"],
+                lost=summary["lost"],
+                loss=summary["loss"] * 100,
+                isolated=summary["isolated_losses"],
+                flaps=summary["flaps"],
+                rtt=rtt,
+            )
+        )
+
+    await update.message.reply_text("\n".join(lines))
+
+
+# ================= PERF ==================
+async def send_perf_report(app: Application, report: str):
+    if not ADMIN_USER_ID:
+        return
+    await app.bot.send_document(
+        chat_id=ADMIN_USER_ID,
+        document=io.BytesIO(report.encode("utf-8")),
+        filename="perf_profile.txt",
+        caption=t("perf_capture_done"),
+    )
+
+
+async def perf_cmd(update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+
+    if user.id != ADMIN_USER_ID:
+        await update.message.reply_text(t("admin_only"))
+        return
+
+    if context.args:
+        mode = context.args[0].lower()
+        try:
+            ticks = int(context.args[1]) if len(context.args) > 1 else 1
+            if mode not in {"cpu", "mem"} or ticks <= 0:
+                raise ValueError
+        except ValueError:
+            await update.message.reply_text(t("perf_usage"))
+            return
+        tick_profiler.arm(mode, ticks)
+        await update.message.reply_text(
+            t("perf_capture_armed", mode=mode, ticks=tick_profiler.total)
+        )
+        return
+
+    lines = [
+        t("perf_header"),
+        t("perf_rss_line", rss_mb=profiling.rss_bytes() / (1024 * 1024)),
+        "",
+        t("perf_commands_header"),
+    ]
+    recent = sorted(HANDLER_SECONDS.recent().items())
+    for key, samples in recent:
+        lines.append(
+            t(
+                "perf_command_line",
+                command=dict(key).get("command", "?"),
+                p50=metrics.percentile(samples, 0.50) * 1000,
+                p95=metrics.percentile(samples, 0.95) * 1000,
+                p99=metrics.percentile(samples, 0.99) * 1000,
+                count=len(samples),
+            )
+        )
+    if not recent:
+        lines.append(t("perf_none"))
+
+    lines.extend(["", t("perf_ticks_header")])
+    timing = watchdog.jobs.get("monitor")
+    slowest = sorted(timing.recent, key=lambda r: r[1], reverse=True)[:5] if timing else []
+    for ended_at, duration in slowest:
+        lines.append(
+            t(
+                "perf_tick_line",
+                time=dt.datetime.fromtimestamp(ended_at).strftime("%m-%d %H:%M:%S"),
+                duration=duration,
+            )
+        )
+    if not slowest:
+        lines.append(t("perf_none"))
+
+    lines.extend(["", t("perf_db_header")])
+    for scope, count in profiling.db_calls.most_common():
+        lines.append(t("perf_db_line", scope=scope, count=count))
+    if not profiling.db_calls:
+        lines.append(t("perf_none"))
+
+    await update.message.reply_text("\n".join(lines))
+
+
+# ================= MAINTENANCE ==================
+# Daily job. Sessions and refuels from whole months older than RETENTION_DAYS
+# are rolled into archive_monthly (motohours keep their runtime), then free
+# pages are handed back with PRAGMA incremental_vacuum. /report, the API and
+# fuel lookups read single sessions, so they refuse ranges starting before
+# the archived_until state, and the derived rows before it (daily_stats,
+# run_bitmap, quantile_sketches) are pruned with them. Every step is one
+# short DB call followed by a pause, so a monitor tick queued on the DB
+# thread waits for one step at most; what MAINTENANCE_BUDGET leaves undone
+# continues the next day. The one exception is the one-time VACUUM that
+# switches a database created before incremental vacuum.
+
+MAINTENANCE_BATCH = 5000
+MAINTENANCE_BUDGET = 120.0
+MAINTENANCE_PAUSE = 0.05
+VACUUM_STEP_SECONDS = 0.02
+VACUUM_MIN_PAGES, VACUUM_MAX_PAGES = 16, 4096
+
+# Derived tables and their key column. Every reader of these rows either
+# refuses ranges before archived_until (/report) or looks back at most 30 days.
+_PRUNED_TABLES = (("daily_stats", "day"), ("run_bitmap", "day"), ("quantile_sketches", "bucket"))
+
+_ARCHIVE_UPSERT = """
+    INSERT INTO archive_monthly
+        (month, sessions, runtime_seconds, fuel_used, longest_seconds, refuels, fuel_added)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(month) DO UPDATE SET
+        sessions = sessions + excluded.sessions,
+        runtime_seconds = runtime_seconds + excluded.runtime_seconds,
+        fuel_used = fuel_used + excluded.fuel_used,
+        longest_seconds = MAX(longest_seconds, excluded.longest_seconds),
+        refuels = refuels + excluded.refuels,
+        fuel_added = fuel_added + excluded.fuel_added
+"""
+
+
+def _retention_cutoff(now: dt.datetime) -> dt.datetime:
+    """First day of the month holding now - RETENTION_DAYS; rows before it are archived."""
+    edge = now - dt.timedelta(days=RETENTION_DAYS)
+    return dt.datetime(edge.year, edge.month, 1)
+
+
+def _prepare_archive(cutoff: dt.datetime) -> tuple[int, int]:
+    """
+    Folds every row into the derived tables first, then returns the last
+    generator_log and refuel_log ids that may go: sessions that ended and
+    refuels made before cutoff, and only those every watermark has passed.
+    cutoff is moved back to the last fuel checkpoint at or before it, so fuel
+    replays start at or after it, and recorded as archived_until for the
+    per-session paths to refuse earlier ranges.
+    """
+    sync_daily_stats()
+    sync_run_bitmaps()
+    sync_session_sketches()
+    sync_fuel_checkpoints()
+    model = update_consumption_model()
+    _sessions()
+
+    with _connect() as conn:
+        (checkpoint,) = conn.execute(
+            "SELECT MAX(ts) FROM fuel_checkpoints WHERE ts <= ?", (cutoff.isoformat(),)
+        ).fetchone()
+        if checkpoint is None:
+            return 0, 0
+        cutoff = dt.datetime.fromisoformat(checkpoint)
+        (first_gen,) = conn.execute(
+            "SELECT MIN(id) FROM generator_log WHERE COALESCE(stop_time, start_time) >= ?",
+            (cutoff.isoformat(),),
+        ).fetchone()
+        (last_gen,) = conn.execute("SELECT MAX(id) FROM generator_log").fetchone()
+        (first_refuel,) = conn.execute(
+            "SELECT MIN(id) FROM refuel_log WHERE timestamp >= ?", (cutoff.isoformat(),)
+        ).fetchone()
+        (last_refuel,) = conn.execute("SELECT MAX(id) FROM refuel_log").fetchone()
+    gen_bound = min(
+        first_gen - 1 if first_gen else last_gen or 0,
+        *(int(get_state(key, 0)) for key in ("daily_stats_gen_id", "run_bitmap_gen_id", "sketch_gen_id")),
+    )
+    refuel_bound = min(
+        first_refuel - 1 if first_refuel else last_refuel or 0,
+        int(get_state("daily_stats_refuel_id", 0)),
+        model.refuel_id,
+    )
+    with _connect() as conn:
+        (pending,) = conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM generator_log WHERE id <= ?)"
+            " OR EXISTS (SELECT 1 FROM refuel_log WHERE id <= ?)",
+            (gen_bound, refuel_bound),
+        ).fetchone()
+    archived = get_archived_until()
+    if pending and (archived is None or archived < cutoff):
+        set_state("archived_until", cutoff.isoformat())
+    return gen_bound, refuel_bound
+
+
+def _archive_sessions_step(bound: int) -> int:
+    """Rolls up to MAINTENANCE_BATCH of the oldest sessions (id <= bound) into archive_monthly."""
+    store = _sessions()
+    months: dict[str, list] = {}
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT id, start_time, runtime_seconds, fuel_used FROM generator_log "
+            "WHERE id <= ? ORDER BY id LIMIT ?",
+            (bound, MAINTENANCE_BATCH),
+        ).fetchall()
+        if not rows:
+            return 0
+        for _, start_s, runtime, fuel in rows:
+            if not start_s:
+                continue
+            m = months.setdefault(start_s[:7], [0, 0, 0.0, 0, 0, 0.0])
+            m[0] += 1
+            m[1] += runtime or 0
+            m[2] += fuel or 0.0
+            m[3] = max(m[3], runtime or 0)
+        conn.executemany(_ARCHIVE_UPSERT, [(month, *values) for month, values in months.items()])
+        conn.execute("DELETE FROM generator_log WHERE id <= ?", (rows[-1][0],))
+    # The deleted rows are the oldest ones the store holds, in the same order.
+    if _session_store is store:
+        store.drop_first(sum(m[0] for m in months.values()))
+    return len(rows)
+
+
+def _archive_refuels_step(bound: int) -> int:
+    months: dict[str, list] = {}
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT id, timestamp, amount FROM refuel_log WHERE id <= ? ORDER BY id LIMIT ?",
+            (bound, MAINTENANCE_BATCH),
+        ).fetchall()
+        if not rows:
+            return 0
+        for _, ts, amount in rows:
+            if not ts:
+                continue
+            m = months.setdefault(ts[:7], [0, 0, 0.0, 0, 0, 0.0])
+            m[4] += 1
+            if amount and amount > 0:
+                m[5] += amount
+        conn.executemany(_ARCHIVE_UPSERT, [(month, *values) for month, values in months.items()])
+        conn.execute("DELETE FROM refuel_log WHERE id <= ?", (rows[-1][0],))
+    return len(rows)
+
+
+def _prune_derived_step(table: str, column: str) -> int:
+    """Deletes up to MAINTENANCE_BATCH rows of table keyed before archived_until."""
+    archived = get_archived_until()
+    if archived is None:
+        return 0
+    # Day keys are dates; one equal to archived_until's date is partly kept.
+    bound = archived.date().isoformat() if column == "day" else archived.isoformat()
+    with _connect() as conn:
+        return conn.execute(
+            f"DELETE FROM {table} WHERE rowid IN "
+            f"(SELECT rowid FROM {table} WHERE {column} < ? LIMIT ?)",
+            (bound, MAINTENANCE_BATCH),
+        ).rowcount
+
+
+def _needs_full_vacuum() -> bool:
+    return _connect().execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+
+
+def _full_vacuum() -> None:
+    conn = _connect()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def _free_pages() -> tuple[int, int]:
+    conn = _connect()
+    (free,) = conn.execute("PRAGMA freelist_count").fetchone()
+    (page_size,) = conn.execute("PRAGMA page_size").fetchone()
+    return free, page_size
+
+
+def _vacuum_step(pages: int) -> tuple[int, float]:
+    """Frees up to pages pages; returns the free pages left and the seconds it took."""
+    started = time.perf_counter()
+    conn = _connect()
+    # execute() steps this pragma once, which frees a single page;
+    # executescript() runs it to completion.
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+    (free,) = conn.execute("PRAGMA freelist_count").fetchone()
+    return free, time.perf_counter() - started
+
+
+def _checkpoint_wal() -> None:
+    # PASSIVE never waits on readers; the file shrinks once the WAL is copied back.
+    _connect().execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()
+
+
+@watchdog.timed_job("maintenance", lambda: 24 * 3600)
+@profiling.scoped("maintenance")
+async def maintenance_job(context: ContextTypes.DEFAULT_TYPE):
+    deadline = time.monotonic() + MAINTENANCE_BUDGET
+    result = {"time": clock.now().isoformat(timespec="seconds"), "sessions": 0, "refuels": 0}
+
+    if RETENTION_DAYS:
+        with tracing.span("maintenance.archive"):
+            gen_bound, refuel_bound = await run_db(_prepare_archive, _retention_cutoff(clock.now()))
+            for key, step, bound in (
+                ("sessions", _archive_sessions_step, gen_bound),
+                ("refuels", _archive_refuels_step, refuel_bound),
+            ):
+                while time.monotonic() < deadline:
+                    done = await run_db(step, bound)
+                    if not done:
+                        break
+                    result[key] += done
+                    await asyncio.sleep(MAINTENANCE_PAUSE)
+            for table, column in _PRUNED_TABLES:
+                while time.monotonic() < deadline:
+                    if not await run_db(_prune_derived_step, table, column):
+                        break
+                    await asyncio.sleep(MAINTENANCE_PAUSE)
+
+    with tracing.span("maintenance.vacuum"):
+        if await run_db(_needs_full_vacuum):
+            log.warning(
+                "Switching %s to auto_vacuum=INCREMENTAL with a full VACUUM; "
+                "the database is busy until it finishes", DB_FILE
+            )
+            await run_db(_full_vacuum)
+        free, page_size = await run_db(_free_pages)
+        start_free, pages = free, VACUUM_MIN_PAGES
+        while free and time.monotonic() < deadline:
+            free, elapsed = await run_db(_vacuum_step, pages)
+            # Size the next step so it takes about VACUUM_STEP_SECONDS.
+            if elapsed < VACUUM_STEP_SECONDS / 2:
+                pages = min(VACUUM_MAX_PAGES, pages * 2)
+            elif elapsed > VACUUM_STEP_SECONDS:
+                pages = max(VACUUM_MIN_PAGES, pages // 2)
+            await asyncio.sleep(MAINTENANCE_PAUSE)
+        await run_db(_checkpoint_wal)
+
+    result["freed_bytes"] = (start_free - free) * page_size
+    result["free_bytes"] = free * page_size
+    await aset_state("maintenance_last", json.dumps(result))
+
+
+# ================= METRICS ==================
+async def metrics_endpoint(query: dict, headers: dict):
+    sketch_lines = await run_db(_sketch_metric_lines, clock.now())
+    body = (metrics.render() + "\n".join(sketch_lines) + "\n").encode("utf-8")
+    return 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}, body
+
+
+# ================= READ API ==================
+# JSON for dashboards (e.g. Grafana's JSON/Infinity datasources) on the local
+# HTTP server. Bounds are floored to API_RESOLUTION so polls within the same
+# minute get the same ETag and, with If-None-Match, a bodiless 304.
+
+API_RESOLUTION = 60
+API_DEFAULT_POINTS = 500
+API_MAX_POINTS = 5000
+API_STATE_KEYS = ("fuel_left", "fuel_start", "motohours_offset_seconds", "running", "start_time")
+
+
+def _api_time(raw: str | None, default: dt.datetime) -> dt.datetime:
+    """ISO date/time or Unix epoch milliseconds (Grafana's ${__from})."""
+    if not raw:
+        return default
+    if raw.isdigit():
+        return dt.datetime.fromtimestamp(int(raw) / 1000)
+    return _local_naive(dt.datetime.fromisoformat(raw))
+
+
+def _api_floor(when: dt.datetime) -> dt.datetime:
+    return when - dt.timedelta(
+        seconds=(when.minute * 60 + when.second) % API_RESOLUTION,
+        microseconds=when.microsecond,
+    )
+
+
+def _api_data_version() -> str:
+    with _connect() as conn:
+        (gen_id,) = conn.execute("SELECT MAX(id) FROM generator_log").fetchone()
+        (refuel_id,) = conn.execute("SELECT MAX(id) FROM refuel_log").fetchone()
+        archived = conn.execute(
+            "SELECT COALESCE(SUM(sessions), 0), COALESCE(SUM(refuels), 0) FROM archive_monthly"
+        ).fetchone()
+        state = conn.execute(
+            f"SELECT key, value FROM state WHERE key IN ({', '.join('?' * len(API_STATE_KEYS))}) "
+            "ORDER BY key",
+            API_STATE_KEYS,
+        ).fetchall()
+    # Series are derived with the current rate, so a settings change or a
+    # refit of the learned model must invalidate cached responses too.
+    settings = (FUEL_CONSUMPTION, FUEL_MODEL, TANK_CAPACITY, fuel_rate())
+    return repr((gen_id, refuel_id, archived, state, settings))
+
+
+def _api_series(name: str, start: dt.datetime, end: dt.datetime, points: int) -> list:
+    now_dt = clock.now()
+    now = to_epoch(now_dt)
+    a, b = to_epoch(start), min(to_epoch(end), now)
+    if b <= a:
+        return []
+    _check_not_archived(start)
+
+    store = _sessions()
+    if name == "fuel":
+        times, levels = get_fuel_curve(start, end)
+        keep = lttb(times, levels, points)
+        times, values = times[keep], levels[keep]
+    elif name == "running":
+        # Bucket averages: share of every bucket the generator ran.
+        edges = np.linspace(a, b, points + 1)
+        cover = store.coverage(edges) + np.diff(_open_run_until(edges, now))
+        times, values = edges[:-1], np.clip(cover / np.diff(edges), 0, 1)
+    else:
+        times = np.linspace(a, b, points)
+        values = (
+            get_motohours_offset_seconds()
+            + get_archived_runtime_seconds()
+            + store.accrued(times, "runtime")
+            + _open_run_until(times, now)
+        ) / 3600.0
+
+    return [
+        [int(from_epoch(x).timestamp() * 1000), round(float(y), 3)]
+        for x, y in zip(times, values)
+    ]
+
+
+def _api_status() -> dict:
+    now = clock.now()
+    fuel_left = get_effective_fuel_left_now(now)
+    return {
+        "generator": GENERATORNAME,
+        "time": now.isoformat(timespec="seconds"),
+        "running": get_state("running", "0") == "1",
+        "fuel_left": round(fuel_left, 2),
+        "remaining_hours": round(remaining_hours_from_fuel(fuel_left), 2),
+        "motohours": round(get_total_runtime_seconds(now) / 3600.0, 3),
+    }
+
+
+def _api_json(status: int, payload, etag: str | None = None):
+    headers = {"Content-Type": "application/json", "Cache-Control": "no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    return status, headers, json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def _api_not_modified(headers: dict, etag: str) -> bool:
+    tags = headers.get("if-none-match", "")
+    return any(tag.strip().removeprefix("W/") == etag for tag in tags.split(",")) or tags == "*"
+
+
+async def _api_cached(headers: dict, key: str, build):
+    etag = '"' + hashlib.sha1(
+        (await run_db(_api_data_version) + key).encode("utf-8")
+    ).hexdigest()[:20] + '"'
+    if _api_not_modified(headers, etag):
+        return 304, {"ETag": etag, "Cache-Control": "no-cache"}, b""
+    return _api_json(200, await build(), etag)
+
+
+async def api_series_endpoint(query: dict, headers: dict):
+    name = query.get("name", "")
+    if name not in {"fuel", "running", "motohours"}:
+        return _api_json(400, {"error": "name must be fuel, running or motohours"})
+    now = _api_floor(clock.now())
+    try:
+        end = _api_floor(_api_time(query.get("to"), now))
+        start = _api_floor(_api_time(query.get("from"), end - dt.timedelta(hours=24)))
+        points = int(query.get("points", API_DEFAULT_POINTS))
+    except (ValueError, OverflowError, OSError):
+        return _api_json(400, {"error": "from/to must be ISO dates or epoch ms, points an integer"})
+    end = min(end, now)
+    if not 2 <= points <= API_MAX_POINTS or start >= end:
+        return _api_json(400, {"error": f"need from < to <= now and 2 <= points <= {API_MAX_POINTS}"})
+    archived = await run_db(get_archived_until)
+    if archived is not None and start < archived:
+        return _api_json(400, {"error": f"from must not be before {archived.isoformat()}, older rows are archived"})
+
+    async def build():
+        return {
+            "name": name,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "points": await run_db(_api_series, name, start, end, points),
+        }
+
+    return await _api_cached(headers, f"series|{name}|{start}|{end}|{points}", build)
+
+
+async def api_status_endpoint(query: dict, headers: dict):
+    now = _api_floor(clock.now())
+    return await _api_cached(headers, f"status|{now}", lambda: run_db(_api_status))
+
+
+API_ROUTES = {
+    "/api/v1/series": api_series_endpoint,
+    "/api/v1/status": api_status_endpoint,
+}
 
 
 # ================= MAIN ==================
-async def post_init(app: Application):
-    await startup_message(app)
-    # monitor loop
-    app.job_queue.run_repeating(
+def command(name: str, callback) -> CommandHandler:
+    callback = profiling.scoped(name)(callback)
+
+    async def traced(update, context: ContextTypes.DEFAULT_TYPE):
+        with tracing.span(f"command.{name}"):
+            return await callback(update, context)
+
+    return CommandHandler(name, HANDLER_SECONDS.timed(command=name)(traced))
+
+
+def schedule_monitor(job_queue):
+    for job in job_queue.get_jobs_by_name("monitor"):
+        job.schedule_removal()
+    job_queue.run_repeating(
         monitor_job,
         interval=INTERVAL,
         first=0,
         name="monitor"
     )
 
-    # daily report
-    app.job_queue.run_daily(
-        daily_report,
-        time=dt.time(hour=REPORTH, minute=REPORTM),
-        name="daily_report"
+
+def schedule_reports(job_queue):
+    for name, callback in (("daily_report", daily_report), ("monthly_report", monthly_report)):
+        for job in job_queue.get_jobs_by_name(name):
+            job.schedule_removal()
+        job_queue.run_daily(
+            callback,
+            time=dt.time(hour=REPORTH, minute=REPORTM),
+            name=name
+        )
+
+
+def schedule_maintenance(job_queue):
+    for job in job_queue.get_jobs_by_name("maintenance"):
+        job.schedule_removal()
+    job_queue.run_daily(
+        maintenance_job,
+        time=dt.time(hour=MAINTENANCE_HOUR),
+        name="maintenance"
     )
-    # monthly report
-    app.job_queue.run_daily(
-        monthly_report,
-        time=dt.time(hour=REPORTH, minute=REPORTM),
-        name="monthly_report"
+
+
+async def post_init(app: Application):
+    # Backfills /report aggregates and run bitmaps once after an upgrade or an
+    # external import, and loads the session columns before the first command
+    # needs them.
+    await run_db(sync_daily_stats)
+    await run_db(sync_run_bitmaps)
+    await run_db(sync_session_sketches)
+    await run_db(sync_fuel_checkpoints)
+    await run_db(update_consumption_model)
+    await run_db(_sessions)
+    watchdog.start(functools.partial(watchdog_alert, app))
+    servers: dict[tuple[str, int], dict] = {}
+    if METRICS_PORT:
+        servers.setdefault((METRICS_LISTEN, METRICS_PORT), {})["/metrics"] = metrics_endpoint
+    if API_PORT:
+        servers.setdefault((API_LISTEN, API_PORT), {}).update(API_ROUTES)
+    for (host, port), routes in servers.items():
+        _http_servers.append(await local_http.start(host, port, routes))
+    await startup_message(app)
+    schedule_monitor(app.job_queue)
+    schedule_reports(app.job_queue)
+    schedule_maintenance(app.job_queue)
+
+
+async def post_shutdown(app: Application):
+    await watchdog.stop()
+    await run_db(flush_sketches)
+    for server in _http_servers:
+        server.close()
+        await server.wait_closed()
+    _http_servers.clear()
+    tracing.shutdown()
+
+
+def _webhook_options() -> dict:
+    """Arguments shared by Application.run_webhook and Updater.start_webhook."""
+    # Telegram echoes the secret in X-Telegram-Bot-Api-Secret-Token; requests
+    # without it are rejected with 403 by the built-in webhook server.
+    return {
+        "listen": WEBHOOK_LISTEN,
+        "port": WEBHOOK_PORT,
+        "url_path": WEBHOOK_PATH,
+        "webhook_url": f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+        "secret_token": WEBHOOK_SECRET or secrets.token_urlsafe(32),
+        "allowed_updates": Update.ALL_TYPES,
+        "drop_pending_updates": False,
+    }
+
+
+def run_webhook(app: Application):
+    # On SIGINT/SIGTERM the server stops accepting, then queued updates and
+    # running jobs are drained before shutdown.
+    app.run_webhook(**_webhook_options())
+
+
+def setup_tracing():
+    if TRACE_EXPORT == "file":
+        tracing.configure(tracing.JsonlFileExporter(TRACE_FILE, TRACE_MAX_BYTES))
+    elif TRACE_EXPORT == "otlp":
+        tracing.configure(tracing.OtlpHttpExporter(TRACE_OTLP_ENDPOINT))
+
+
+def build_application(builder=None) -> Application:
+    """Builds the bot Application; loadtest.py passes a builder with a fake transport."""
+    if builder is None:
+        builder = Application.builder().token(TOKEN)
+    if TELEGRAM_API_URL:
+        builder = builder.base_url(f"{TELEGRAM_API_URL}/bot").base_file_url(
+            f"{TELEGRAM_API_URL}/file/bot"
+        )
+    app = builder.concurrent_updates(True).build()
+
+    app.add_handler(command("start", start_cmd))
+    app.add_handler(command("help", help_cmd))
+    app.add_handler(command("status", status_cmd))
+    app.add_handler(command("refuel", refuel_cmd))
+    app.add_handler(command("rhistory", refuel_history_cmd))
+    app.add_handler(command("history", history_cmd))
+    app.add_handler(command("export", export_cmd))
+    app.add_handler(command("reset_fuel", reset_fuel_cmd))
+    app.add_handler(command("allow", allow_cmd))
+    app.add_handler(command("deny", deny_cmd))
+    app.add_handler(command("whoami", whoami_cmd))
+    app.add_handler(command("users", users_cmd))
+    app.add_handler(command("settings", settings_cmd))
+    app.add_handler(command("set", set_setting_cmd))
+    app.add_handler(command("setservice", setservice_cmd))
+    app.add_handler(command("setmhours", setmhours_cmd))
+    app.add_handler(command("month", month_cmd))
+    app.add_handler(command("report", report_cmd))
+    app.add_handler(command("health", health_cmd))
+    app.add_handler(command("perf", perf_cmd))
+    app.add_handler(command("probes", probes_cmd))
+    app.add_handler(
+        CallbackQueryHandler(
+            HANDLER_SECONDS.timed(command="page")(profiling.scoped("page")(page_callback)),
+            pattern=r"^page:",
+        )
     )
 
+    app.post_init = post_init
+    app.post_shutdown = post_shutdown
+    return app
+
 
 def main():
     init_db()
+    setup_tracing()
 
-    app = Application.builder().token(TOKEN).build()
-
-    app.add_handler(CommandHandler("start", start_cmd))
-    app.add_handler(CommandHandler("help", help_cmd))
-    app.add_handler(CommandHandler("status", status_cmd))
-    app.add_handler(CommandHandler("refuel", refuel_cmd))
-    app.add_handler(CommandHandler("rhistory", refuel_history_cmd))
-    app.add_handler(CommandHandler("history", history_cmd))
-    app.add_handler(CommandHandler("reset_fuel", reset_fuel_cmd))
-    app.add_handler(CommandHandler("allow", allow_cmd))
-    app.add_handler(CommandHandler("deny", deny_cmd))
-    app.add_handler(CommandHandler("whoami", whoami_cmd))
-    app.add_handler(CommandHandler("users", users_cmd))
-    app.add_handler(CommandHandler("settings", settings_cmd))
-    app.add_handler(CommandHandler("set", set_setting_cmd))
-    app.add_handler(CommandHandler("setservice", setservice_cmd))
-    app.add_handler(CommandHandler("setmhours", setmhours_cmd))
-    app.add_handler(CommandHandler("month", month_cmd))
-
-
-    app.post_init = post_init
-    app.run_polling()
+    app = build_application()
+    if UPDATE_MODE == "webhook":
+        run_webhook(app)
+    else:
+        app.run_polling()
 
 
 
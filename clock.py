@@ -0,0 +1,122 @@
+import datetime as dt
+import itertools
+import types
+
+
+class SystemClock:
+    def now(self) -> dt.datetime:
+        return dt.datetime.now()
+
+
+class SimulatedClock:
+    """Clock that only moves when advanced; used for replays and benchmarks."""
+
+    def __init__(self, start: dt.datetime):
+        self._now = start
+
+    def now(self) -> dt.datetime:
+        return self._now
+
+    def set(self, when: dt.datetime) -> None:
+        if when < self._now:
+            raise ValueError("Simulated clock cannot move backwards")
+        self._now = when
+
+    def advance(self, seconds: float) -> dt.datetime:
+        self._now += dt.timedelta(seconds=seconds)
+        return self._now
+
+
+class SimulatedJob:
+    def __init__(self, callback, name, next_t, interval=None, daily=False, data=None):
+        self.callback = callback
+        self.name = name
+        self.next_t = next_t
+        self.interval = interval
+        self.daily = daily
+        self.data = data
+        self.removed = False
+
+    def schedule_removal(self) -> None:
+        self.removed = True
+
+
+class SimulatedJobQueue:
+    """
+    Drop-in for the subset of telegram.ext.JobQueue the bot uses. Jobs run
+    in due order as run_until() advances the simulated clock, so months of
+    scheduling complete as fast as the callbacks themselves.
+    """
+
+    def __init__(self, clock: SimulatedClock, application=None):
+        self.clock = clock
+        self.application = application
+        self._jobs: list[SimulatedJob] = []
+        self._seq = itertools.count()
+        self._order: dict[int, int] = {}
+
+    def _add(self, job: SimulatedJob) -> SimulatedJob:
+        self._order[id(job)] = next(self._seq)
+        self._jobs.append(job)
+        return job
+
+    def run_repeating(self, callback, interval, first=None, name=None, data=None, **_):
+        seconds = interval.total_seconds() if isinstance(interval, dt.timedelta) else interval
+        delay = first or 0
+        next_t = self.clock.now() + dt.timedelta(seconds=delay)
+        return self._add(SimulatedJob(callback, name, next_t, interval=seconds, data=data))
+
+    def run_daily(self, callback, time, name=None, data=None, **_):
+        now = self.clock.now()
+        next_t = dt.datetime.combine(now.date(), time.replace(tzinfo=None))
+        if next_t <= now:
+            next_t += dt.timedelta(days=1)
+        return self._add(SimulatedJob(callback, name, next_t, daily=True, data=data))
+
+    def run_once(self, callback, when, name=None, data=None, **_):
+        if isinstance(when, dt.datetime):
+            next_t = when
+        else:
+            seconds = when.total_seconds() if isinstance(when, dt.timedelta) else when
+            next_t = self.clock.now() + dt.timedelta(seconds=seconds)
+        return self._add(SimulatedJob(callback, name, next_t, data=data))
+
+    def jobs(self) -> tuple[SimulatedJob, ...]:
+        return tuple(j for j in self._jobs if not j.removed)
+
+    def get_jobs_by_name(self, name: str) -> tuple[SimulatedJob, ...]:
+        return tuple(j for j in self.jobs() if j.name == name)
+
+    def _context(self, job: SimulatedJob):
+        app = self.application
+        return types.SimpleNamespace(
+            application=app,
+            bot=getattr(app, "bot", None),
+            bot_data=getattr(app, "bot_data", {}),
+            job=job,
+            job_queue=self,
+        )
+
+    async def run_until(self, end: dt.datetime) -> int:
+        """Runs every job due up to end; returns the number of callbacks run."""
+        runs = 0
+        while True:
+            self._jobs = [j for j in self._jobs if not j.removed]
+            if not self._jobs:
+                break
+            job = min(self._jobs, key=lambda j: (j.next_t, self._order[id(j)]))
+            if job.next_t > end:
+                break
+            if job.next_t > self.clock.now():
+                self.clock.set(job.next_t)
+            if job.interval:
+                job.next_t += dt.timedelta(seconds=job.interval)
+            elif job.daily:
+                job.next_t += dt.timedelta(days=1)
+            else:
+                job.removed = True
+            await job.callback(self._context(job))
+            runs += 1
+        if end > self.clock.now():
+            self.clock.set(end)
+        return runs
@@ -0,0 +1,103 @@
+import math
+
+# Fuel consumption fitted from refuel history. The bot only knows the real
+# tank level at a reset (amount 0: the user read the gauge). A refuel that
+# tops the tank up is no anchor: capacity minus what was poured is only an
+# upper bound on the level before, and using it would bias the fit. Between
+# two resets,
+#
+#     litres burned = level read at the first + poured in between
+#                     - level read at the second
+#
+# is one observation against the running hours in between, and litres per
+# hour is the least-squares slope through the origin. Only the sums are
+# kept, so each refuel updates the fit in O(1).
+
+MIN_HOURS = 1.0  # shorter intervals are dominated by gauge reading error
+MIN_SAMPLES = 3
+# Observations implying a rate this far from the configured one are typos.
+MAX_RATIO = 4.0
+
+
+class ConsumptionModel:
+    """Sums of the regression plus the open interval since the last known level."""
+
+    FIELDS = ("refuel_id", "known_ts", "known_fuel", "added", "dry", "n", "sum_hh", "sum_hy", "sum_yy")
+
+    def __init__(self):
+        self.refuel_id = 0
+        self.known_ts: str | None = None
+        self.known_fuel = 0.0
+        self.added = 0.0
+        self.dry = False
+        self.n = 0
+        self.sum_hh = 0.0
+        self.sum_hy = 0.0
+        self.sum_yy = 0.0
+
+    @classmethod
+    def from_row(cls, row) -> "ConsumptionModel":
+        model = cls()
+        for name, value in zip(cls.FIELDS, row):
+            setattr(model, name, value)
+        model.dry = bool(model.dry)
+        return model
+
+    def to_row(self) -> tuple:
+        return tuple(int(self.dry) if f == "dry" else getattr(self, f) for f in self.FIELDS)
+
+    def add(self, hours: float, litres: float) -> None:
+        self.n += 1
+        self.sum_hh += hours * hours
+        self.sum_hy += hours * litres
+        self.sum_yy += litres * litres
+
+    def observe(
+        self,
+        refuel_id: int,
+        ts: str,
+        amount: float,
+        fuel_before: float,
+        fuel_after: float,
+        hours_since_known,
+        nominal: float,
+    ) -> bool:
+        """
+        Folds one refuel_log row in. hours_since_known(ts_from, ts_to) gives
+        the running hours between two timestamps; it is only called when the
+        row closes an interval. Returns True when an observation was added.
+        """
+        self.refuel_id = refuel_id
+        # fuel_before is the bot's estimate; at 0 the tank may really have run
+        # dry, and the litres burned in that interval are unknown.
+        dry = self.dry or fuel_before <= 0
+        if amount > 0:
+            self.added += amount
+            self.dry = dry
+            return False
+
+        added = False
+        if self.known_ts is not None and not dry:
+            litres = self.known_fuel + self.added - fuel_after
+            hours = hours_since_known(self.known_ts, ts)
+            if hours >= MIN_HOURS and nominal / MAX_RATIO <= litres / hours <= nominal * MAX_RATIO:
+                self.add(hours, litres)
+                added = True
+        self.known_ts, self.known_fuel = ts, fuel_after
+        self.added, self.dry = 0.0, False
+        return added
+
+    @property
+    def rate(self) -> float | None:
+        """Litres per running hour, None until MIN_SAMPLES observations."""
+        if self.n < MIN_SAMPLES or self.sum_hh <= 0:
+            return None
+        return self.sum_hy / self.sum_hh
+
+    @property
+    def stderr(self) -> float | None:
+        rate = self.rate
+        if rate is None:
+            return None
+        residual = max(0.0, self.sum_yy - rate * self.sum_hy)
+        return math.sqrt(residual / (self.n - 1) / self.sum_hh)
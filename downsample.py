@@ -0,0 +1,32 @@
+import numpy as np
+
+# Largest-Triangle-Three-Buckets (Steinarsson, 2013): keeps the first and
+# last point and, from each of n - 2 equal buckets in between, the point
+# spanning the largest triangle with the previous pick and the next bucket's
+# average. Peaks and refuel jumps survive, which plain averaging smears.
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the n points to keep (all of them when there are no more than n)."""
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return np.array([0, size - 1][:max(n, 0)])
+
+    every = (size - 2) / (n - 2)
+    picked = np.empty(n, dtype=np.int64)
+    picked[0] = a = 0
+    for i in range(n - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        next_hi = min(int((i + 2) * every) + 1, size)
+        avg_x = x[hi:next_hi].mean() if next_hi > hi else x[-1]
+        avg_y = y[hi:next_hi].mean() if next_hi > hi else y[-1]
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    picked[-1] = size - 1
+    return picked
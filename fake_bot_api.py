@@ -0,0 +1,254 @@
+"""
+Local stand-in for the subset of the Telegram Bot API the bot uses.
+
+Serves /bot<token>/<method> for getMe, getUpdates, sendMessage, sendPhoto,
+sendDocument, editMessageText, pinChatMessage and the webhook calls made on
+startup. Every call is recorded; responses can be delayed and a share of
+them answered with 429 so retry paths are exercised. Point the bot at it
+with TELEGRAM_API_URL=http://127.0.0.1:8081.
+
+    python fake_bot_api.py --port 8081 --latency 50 --jitter 20 --rate-429 0.05
+    python fake_bot_api.py --record calls.jsonl
+
+Control endpoints: GET /_calls returns the recorded calls, GET
+/_push?user_id=1&text=/status queues an update for getUpdates.
+"""
+import argparse
+import asyncio
+import email.parser
+import email.policy
+import json
+import random
+import time
+import urllib.parse
+
+from local_http import _read_request, _response
+
+READ_TIMEOUT = 30
+MAX_BODY_BYTES = 60 * 1024 * 1024
+BOT_INFO = {"id": 1, "is_bot": True, "first_name": "Stand-in", "username": "standin_bot"}
+THROTTLED = {"sendMessage", "sendPhoto", "sendDocument", "editMessageText", "pinChatMessage"}
+
+
+def _parse_body(headers: dict, body: bytes) -> dict:
+    ctype = headers.get("content-type", "")
+    if not body:
+        return {}
+    if ctype.startswith("application/json"):
+        return json.loads(body)
+    if ctype.startswith("multipart/form-data"):
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {ctype}\r\n\r\n".encode("latin-1") + body
+        )
+        params = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            payload = part.get_payload(decode=True) or b""
+            if part.get_filename():
+                params[name] = {"filename": part.get_filename(), "size": len(payload)}
+            else:
+                params[name] = payload.decode("utf-8")
+        return params
+    return dict(urllib.parse.parse_qsl(body.decode("utf-8")))
+
+
+class FakeBotApi:
+    def __init__(
+        self,
+        *,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_429: float = 0.0,
+        retry_after: int = 1,
+        seed: int = 0,
+        record_path: str | None = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.record_path = record_path
+        self.calls: list[dict] = []
+        self._rng = random.Random(seed)
+        self._message_id = 0
+        self._update_id = 0
+        self._updates: list[dict] = []
+        self._new_update = asyncio.Event()
+
+    # ----- control -----
+
+    def push_update(self, user_id: int, text: str) -> dict:
+        self._update_id += 1
+        command = text.split(" ", 1)[0]
+        update = {
+            "update_id": self._update_id,
+            "message": {
+                "message_id": self._update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"},
+                "text": text,
+            },
+        }
+        if command.startswith("/"):
+            update["message"]["entities"] = [
+                {"type": "bot_command", "offset": 0, "length": len(command)}
+            ]
+        self._updates.append(update)
+        self._new_update.set()
+        return update
+
+    def counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for call in self.calls:
+            counts[call["method"]] = counts.get(call["method"], 0) + 1
+        return counts
+
+    # ----- Bot API -----
+
+    def _message(self, params: dict, **extra) -> dict:
+        self._message_id += 1
+        chat_id = params.get("chat_id", 0)
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id) if str(chat_id).lstrip("-").isdigit() else 0,
+                     "type": "private"},
+            **extra,
+        }
+
+    async def _get_updates(self, params: dict) -> list[dict]:
+        offset = int(params.get("offset", 0) or 0)
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates:
+            self._new_update.clear()
+            try:
+                await asyncio.wait_for(
+                    self._new_update.wait(), float(params.get("timeout", 0) or 0)
+                )
+            except asyncio.TimeoutError:
+                pass
+        limit = int(params.get("limit", 100) or 100)
+        return self._updates[:limit]
+
+    async def call(self, method: str, params: dict) -> tuple[int, dict]:
+        record = {"at": time.time(), "method": method, "params": params}
+        self.calls.append(record)
+        if self.record_path:
+            with open(self.record_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+        if method != "getUpdates":
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        if method in THROTTLED and self.rate_429 and self._rng.random() < self.rate_429:
+            record["status"] = 429
+            return 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+
+        if method == "getMe":
+            result = BOT_INFO
+        elif method == "getUpdates":
+            result = await self._get_updates(params)
+        elif method == "sendMessage" or method == "editMessageText":
+            result = self._message(params, text=params.get("text", ""))
+        elif method == "sendPhoto":
+            result = self._message(params, photo=[
+                {"file_id": "p", "file_unique_id": "p", "width": 1, "height": 1}
+            ])
+        elif method == "sendDocument":
+            result = self._message(params, document={"file_id": "d", "file_unique_id": "d"})
+        elif method in {"pinChatMessage", "deleteWebhook", "setWebhook", "setMyCommands", "close"}:
+            result = True
+        elif method == "getWebhookInfo":
+            result = {"url": "", "has_custom_certificate": False, "pending_update_count": 0}
+        else:
+            record["status"] = 404
+            return 404, {"ok": False, "error_code": 404, "description": "Not Found: method not found"}
+        record["status"] = 200
+        return 200, {"ok": True, "result": result}
+
+    # ----- HTTP -----
+
+    async def _handle(self, reader, writer) -> None:
+        try:
+            try:
+                request = await asyncio.wait_for(_read_request(reader), READ_TIMEOUT)
+            except (asyncio.TimeoutError, ConnectionError):
+                return
+            if request is None:
+                writer.write(_response(400, {}, b""))
+                return
+            method, target, headers = request
+            length = int(headers.get("content-length", 0) or 0)
+            if length > MAX_BODY_BYTES:
+                writer.write(_response(400, {}, b""))
+                return
+            body = await reader.readexactly(length) if length else b""
+
+            url = urllib.parse.urlsplit(target)
+            params = dict(urllib.parse.parse_qsl(url.query))
+            parts = url.path.strip("/").split("/")
+            if url.path == "/_calls":
+                status, payload = 200, {"calls": self.calls, "counts": self.counts()}
+            elif url.path == "/_push":
+                status, payload = 200, self.push_update(int(params["user_id"]), params["text"])
+            elif len(parts) == 2 and parts[0].startswith("bot"):
+                params.update(_parse_body(headers, body))
+                status, payload = await self.call(parts[1], params)
+            else:
+                status, payload = 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+            data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            writer.write(_response(status, {"Content-Type": "application/json"}, data))
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self._handle, host=host, port=port)
+
+
+async def _serve(args) -> None:
+    api = FakeBotApi(
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        record_path=args.record,
+    )
+    server = await api.start(args.host, args.port)
+    print(f"Bot API stand-in on http://{args.host}:{server.sockets[0].getsockname()[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="added delay per call, ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay, ms")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of 429 answers")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after in 429s")
+    parser.add_argument("--record", metavar="PATH", help="append every call as JSONL")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import numpy as np
+
+# Tank level as a piecewise-linear curve. From every known level (a stored
+# checkpoint or the fuel_after of a refuel/reset) the level falls by what the
+# sessions burned since, each session's fuel spread evenly over its run, and
+# never drops below 0, the same floor the live estimate applies. Refuels are
+# jumps. Times are session_store epoch seconds.
+
+
+def levels(
+    times: np.ndarray,
+    burned: np.ndarray,
+    anchor_ts: np.ndarray,
+    anchor_level: np.ndarray,
+    anchor_burned: np.ndarray,
+    side: str = "right",
+    floor: bool = True,
+) -> np.ndarray:
+    """
+    Level at each time from the last anchor at or before it. burned and
+    anchor_burned are cumulative burn at times and anchors from any common
+    origin. side="left" gives the level just before an anchor at the same
+    time, i.e. before a refuel's jump.
+    """
+    i = np.maximum(np.searchsorted(anchor_ts, times, side=side) - 1, 0)
+    raw = anchor_level[i] - (burned - anchor_burned[i])
+    return np.maximum(raw, 0.0) if floor else raw
+
+
+def curve(
+    a: float,
+    b: float,
+    base_level: float,
+    burned_until,
+    refuel_ts: np.ndarray,
+    refuel_after: np.ndarray,
+    edges: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vertices of the level curve over [a, b] starting at base_level, given
+    the refuels in (a, b] and the session starts/stops (edges) inside, between
+    which burn is linear. burned_until(times) is the cumulative burn. Adds the
+    points where the tank runs dry and, for every refuel, a vertex holding the
+    level just before it, so a repeated time marks a jump.
+    """
+    anchor_ts = np.concatenate(([a], refuel_ts))
+    anchor_level = np.concatenate(([base_level], refuel_after))
+    anchor_burned = burned_until(anchor_ts)
+    anchors = (anchor_ts, anchor_level, anchor_burned)
+
+    times = np.unique(np.concatenate(([a, b], edges[(edges > a) & (edges < b)], refuel_ts)))
+    burned = burned_until(times)
+    after = levels(times, burned, *anchors, floor=False)
+    before = levels(times, burned, *anchors, side="left", floor=False)
+    dry = np.flatnonzero((after[:-1] > 0) & (before[1:] < 0))
+    crossings = times[dry] + (times[dry + 1] - times[dry]) * after[dry] / (after[dry] - before[dry + 1])
+
+    times = np.unique(np.concatenate((times, crossings)))
+    burned = burned_until(times)
+    after = levels(times, burned, *anchors)
+    before = levels(times, burned, *anchors, side="left")
+    jump = np.flatnonzero(np.isin(times, refuel_ts) & (before != after))
+    out_times = np.concatenate((times, times[jump]))
+    out_levels = np.concatenate((after, before[jump]))
+    is_after = np.concatenate((np.ones(len(times)), np.zeros(len(jump))))
+    order = np.lexsort((is_after, out_times))
+    return out_times[order], out_levels[order]
@@ -0,0 +1,344 @@
+"""
+Drives thousands of concurrent commands through the real Application.
+
+The Application comes from bot.build_application() with an in-process fake
+Bot API transport, so updates travel the normal path (update queue ->
+concurrent dispatcher -> handlers -> DB thread -> outbound requests) without
+touching Telegram. Reports throughput, per-command tail latency, event-loop
+lag and DB thread contention.
+
+    python loadtest.py --updates 5000 --users 200
+    python loadtest.py --updates 20000 --rate 500 --mix status=5,refuel=1 --json load.json
+"""
+import argparse
+import asyncio
+import collections
+import datetime as dt
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from telegram.request import BaseRequest
+
+DEFAULT_MIX = "status=4,history=2,refuel=1,month=2"
+LAG_SAMPLE_SECONDS = 0.05
+
+
+class FakeTransport(BaseRequest):
+    """Answers Bot API calls in-process, optionally after a fixed latency."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: collections.Counter = collections.Counter()
+        self._message_id = 0
+
+    @property
+    def read_timeout(self):
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _message(self, chat_id, text=None) -> dict:
+        self._message_id += 1
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": int(chat_id or 0), "type": "private"},
+            "text": text,
+        }
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        name = url.rsplit("/", 1)[-1]
+        self.calls[name] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        params = request_data.parameters if request_data else {}
+        if name == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Load", "username": "load_bot"}
+        elif name.startswith("send") or name == "editMessageText":
+            result = self._message(params.get("chat_id"), params.get("text"))
+        else:
+            result = True
+        return 200, json.dumps({"ok": True, "result": result}).encode("utf-8")
+
+
+def parse_mix(raw: str) -> list[tuple[str, int]]:
+    mix = []
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        mix.append((name.strip(), int(weight or 1)))
+    return mix
+
+
+def _command_text(name: str, rng: random.Random) -> str:
+    if name == "refuel":
+        return f"/refuel {rng.randint(1, 20)}"
+    if name == "history":
+        return f"/history {rng.choice((7, 30))}"
+    return f"/{name}"
+
+
+def _update_data(update_id: int, user_id: int, text: str) -> dict:
+    command = text.split(" ", 1)[0]
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {
+                "id": user_id,
+                "is_bot": False,
+                "first_name": "Load",
+                "username": f"load{user_id}",
+            },
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        },
+    }
+
+
+async def _sample_lag(samples: list[float], stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(LAG_SAMPLE_SECONDS)
+        samples.append(max(0.0, (loop.time() - start - LAG_SAMPLE_SECONDS) * 1000))
+
+
+def _totals(histogram) -> tuple[int, float, list[int]]:
+    count = total = 0
+    buckets = [0] * len(histogram.bounds)
+    for series_buckets, n, s in histogram.snapshot().values():
+        count += n
+        total += s
+        buckets = [a + b for a, b in zip(buckets, series_buckets)]
+    return count, total, buckets
+
+
+def _bucket_quantile(bounds, before, after, q: float) -> float:
+    """Upper bucket bound holding the q-quantile of observations between two snapshots."""
+    counts = [a - b for a, b in zip(after[2], before[2])]
+    target = q * sum(counts)
+    cumulative = 0
+    for bound, n in zip(bounds, counts):
+        cumulative += n
+        if n and cumulative >= target:
+            return bound
+    return float("inf") if after[0] - before[0] > sum(counts) else 0.0
+
+
+async def run(
+    bot, *, updates: int, users: int, rate: float, mix, latency: float, seed: int,
+    http: bool = False, rate_429: float = 0.0,
+) -> dict:
+    from telegram import Update
+    from telegram.ext import Application, TypeHandler
+    import metrics
+
+    builder = Application.builder().token(bot.TOKEN)
+    server = None
+    if http:
+        # Real HTTP round trips through the local Bot API stand-in.
+        from fake_bot_api import FakeBotApi
+
+        transport = FakeBotApi(latency=latency, rate_429=rate_429, seed=seed)
+        server = await transport.start()
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        builder = builder.base_url(f"{url}/bot").base_file_url(f"{url}/file/bot")
+    else:
+        transport = FakeTransport(latency)
+        builder = builder.request(transport).get_updates_request(FakeTransport())
+    app = bot.build_application(builder)
+
+    started_at: dict[int, float] = {}
+    latencies: dict[str, list[float]] = collections.defaultdict(list)
+    commands: dict[int, str] = {}
+    done = asyncio.Event()
+    finished = 0
+
+    async def completed(update, context):
+        nonlocal finished
+        uid = update.update_id
+        if uid in started_at:
+            latencies[commands[uid]].append(time.perf_counter() - started_at.pop(uid))
+            finished += 1
+            if finished == updates:
+                done.set()
+
+    # Handler groups run in order, so this fires after the command handler.
+    app.add_handler(TypeHandler(Update, completed), group=99)
+
+    errors: collections.Counter = collections.Counter()
+
+    async def on_error(update, context):
+        errors[type(context.error).__name__] += 1
+
+    app.add_error_handler(on_error)
+
+    async def alive() -> bool:
+        return True
+
+    bot.set_probe(alive)
+    for user_id in range(1, users + 1):
+        bot.add_user_to_whitelist(user_id, f"load{user_id}")
+
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+
+    await app.initialize()
+    await app.post_init(app)
+    await app.start()
+
+    lag_samples: list[float] = []
+    stop_lag = asyncio.Event()
+    lag_task = asyncio.create_task(_sample_lag(lag_samples, stop_lag))
+    db_before = _totals(bot.DB_SECONDS)
+    wait_before = _totals(bot.DB_WAIT_SECONDS)
+
+    began = time.perf_counter()
+    for update_id in range(1, updates + 1):
+        name = rng.choices(names, weights)[0]
+        user_id = rng.randint(1, users)
+        update = Update.de_json(_update_data(update_id, user_id, _command_text(name, rng)), app.bot)
+        commands[update_id] = name
+        started_at[update_id] = time.perf_counter()
+        await app.update_queue.put(update)
+        if rate:
+            await asyncio.sleep(1 / rate)
+    await done.wait()
+    elapsed = time.perf_counter() - began
+
+    stop_lag.set()
+    await lag_task
+    db_after = _totals(bot.DB_SECONDS)
+    wait_after = _totals(bot.DB_WAIT_SECONDS)
+
+    await app.stop()
+    await app.shutdown()
+    await app.post_shutdown(app)
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+
+    db_calls = db_after[0] - db_before[0]
+    db_busy = db_after[1] - db_before[1]
+    all_latencies = [v for values in latencies.values() for v in values]
+
+    def pct(values, q):
+        return round(metrics.percentile(values, q) * 1000, 2)
+
+    return {
+        "updates": updates,
+        "users": users,
+        "rate": rate or None,
+        "api_latency_ms": latency * 1000,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput": round(updates / elapsed, 1) if elapsed > 0 else None,
+        "latency_ms": {
+            name: {
+                "count": len(values),
+                "p50": pct(values, 0.50),
+                "p95": pct(values, 0.95),
+                "p99": pct(values, 0.99),
+                "max": pct(values, 1.0),
+            }
+            for name, values in sorted(latencies.items()) + [("all", all_latencies)]
+        },
+        "loop_lag_ms": {
+            "p50": round(metrics.percentile(lag_samples, 0.50), 2),
+            "p99": round(metrics.percentile(lag_samples, 0.99), 2),
+            "max": round(max(lag_samples, default=0.0), 2),
+        },
+        "db": {
+            "calls": db_calls,
+            "busy_ratio": round(db_busy / elapsed, 3) if elapsed > 0 else None,
+            "wait_mean_ms": round(
+                (wait_after[1] - wait_before[1]) / max(1, wait_after[0] - wait_before[0]) * 1000, 3
+            ),
+            "wait_p99_ms_le": _bucket_quantile(
+                bot.DB_WAIT_SECONDS.bounds, wait_before, wait_after, 0.99
+            ) * 1000,
+        },
+        "errors": dict(errors),
+        "api_calls": transport.counts() if http else dict(transport.calls),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=100, help="distinct whitelisted senders")
+    parser.add_argument("--rate", type=float, default=0, help="updates per second (0: all at once)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="command=weight list")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="fake Bot API latency, ms")
+    parser.add_argument("--http", action="store_true", help="go through fake_bot_api.py over HTTP")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="with --http: share of 429s")
+    parser.add_argument("--history", type=int, default=0, help="seed this many sessions first")
+    parser.add_argument("--db", help="SQLite file to use (default: fresh temp file)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="write the result as JSON")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("TOKEN", "0:loadtest")
+    os.environ.setdefault("GENERATORNAME", "Load")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import bot
+
+    # Reports must not reach telegra.ph from a load test.
+    bot._telegraph_call = lambda *a, **kw: None
+    bot.DB_FILE = args.db or os.path.join(tempfile.mkdtemp(prefix="genbot-load-"), "load.db")
+    bot.init_db()
+    if args.history:
+        import seed_history
+
+        seed_history.seed(
+            bot.DB_FILE,
+            sessions=args.history,
+            end=dt.datetime.now(),
+            consumption=bot.FUEL_CONSUMPTION,
+            capacity=bot.TANK_CAPACITY,
+            seed_value=args.seed,
+        )
+
+    result = asyncio.run(run(
+        bot,
+        updates=args.updates,
+        users=args.users,
+        rate=args.rate,
+        mix=parse_mix(args.mix),
+        latency=args.api_latency / 1000,
+        seed=args.seed,
+        http=args.http,
+        rate_429=args.rate_429,
+    ))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    print(f"db:          {bot.DB_FILE}")
+    print(f"updates:     {result['updates']} in {result['elapsed_seconds']}s "
+          f"({result['throughput']} updates/s)")
+    for name, lat in result["latency_ms"].items():
+        print(f"  {name:<10} n={lat['count']:<6} p50={lat['p50']:>8.2f}  p95={lat['p95']:>8.2f}  "
+              f"p99={lat['p99']:>8.2f}  max={lat['max']:>8.2f} ms")
+    lag = result["loop_lag_ms"]
+    print(f"loop lag:    p50={lag['p50']} p99={lag['p99']} max={lag['max']} ms")
+    db = result["db"]
+    print(f"db thread:   {db['calls']} calls, busy {db['busy_ratio']:.0%}, "
+          f"wait mean {db['wait_mean_ms']} ms, p99 <= {db['wait_p99_ms_le']} ms")
+    if result["errors"]:
+        print("errors:      " + ", ".join(f"{k}={v}" for k, v in result["errors"].items()))
+
+
+if __name__ == "__main__":
+    main()
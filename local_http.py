@@ -0,0 +1,86 @@
+import asyncio
+import urllib.parse
+
+# Minimal read-only HTTP/1.1 server for local endpoints (metrics, dashboards).
+# Each route is an async callable(query, headers) -> (status, headers, body).
+
+READ_TIMEOUT = 10
+MAX_HEADER_LINES = 100
+
+_REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    request_line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+    parts = request_line.decode("latin-1").split()
+    if len(parts) != 3:
+        return None
+    method, target, _version = parts
+
+    headers: dict[str, str] = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return method, target, headers
+
+
+def _response(status: int, headers: dict[str, str], body: bytes) -> bytes:
+    head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}"]
+    headers = {"Content-Length": str(len(body)), **headers, "Connection": "close"}
+    head.extend(f"{k}: {v}" for k, v in headers.items())
+    return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def _handle(reader, writer, routes):
+    try:
+        try:
+            request = await _read_request(reader)
+        except (asyncio.TimeoutError, ConnectionError):
+            return
+        if request is None:
+            writer.write(_response(400, {}, b""))
+            return
+
+        method, target, headers = request
+        url = urllib.parse.urlsplit(target)
+        route = routes.get(url.path)
+        if route is None:
+            writer.write(_response(404, {}, b""))
+            return
+        if method not in {"GET", "HEAD"}:
+            writer.write(_response(405, {"Allow": "GET, HEAD"}, b""))
+            return
+
+        query = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            status, resp_headers, body = await route(query, headers)
+        except Exception:
+            status, resp_headers, body = 500, {}, b""
+        if method == "HEAD":
+            resp_headers = {**resp_headers, "Content-Length": str(len(body))}
+            body = b""
+        writer.write(_response(status, resp_headers, body))
+    finally:
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+
+async def start(host: str, port: int, routes: dict) -> asyncio.AbstractServer:
+    return await asyncio.start_server(
+        lambda r, w: _handle(r, w, routes), host=host, port=port
+    )
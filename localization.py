@@ -110,10 +110,12 @@ MESSAGES = {
         "help": (
             "Generator monitoring bot\n\n"
             "Available commands:\n\n"
-            "/status\n"
+            "/status [week|month|detail]\n"
             "  Show current generator status\n"
             "  Fuel level and estimated remaining runtime\n"
-            "  Statistics for last 24 hours and last 7 days\n\n"
+            "  Statistics for last 24 hours and last 7 days\n"
+            "  week/month: runtime heatmap for 7/30 days\n"
+            "  detail: probe RTT and run length percentiles, fitted fuel consumption\n\n"
             "/history [days]\n"
             "  Generator start/stop history and fuel usage\n"
             "  Default: 1 day\n"
@@ -131,9 +133,15 @@ MESSAGES = {
             "  Show this help message\n\n"
             "/month\n"
             "  Show monthly report for last month\n\n"
+            "/report <from> [to]\n"
+            "  Runtime, starts, sessions, fuel and a tank level chart for any period\n"
+            "  Example: /report 2025-01-01 2025-03-31\n\n"
             "/setservice <hours>\n"
             "  Set next service after X hours of runtime\n"
             "  Use /setservice 0 to clear the reminder\n\n"
+            "/export [csv|jsonl] [from] [to]\n"
+            "  Full history as a zip, dates as YYYY-MM-DD\n"
+            "  Example: /export csv 2025-01-01 2025-12-31\n\n"
             "Admin only:\n"
             "/allow <user_id>\n"
             "  Add user to whitelist\n"
@@ -149,6 +157,12 @@ MESSAGES = {
             "  Update setting in .env and runtime\n\n"
             "/setmhours <hours>\n"
             "  Adjust total motohours\n"
+            "/health\n"
+            "  Event loop lag and job timings\n"
+            "/perf [cpu|mem <ticks>]\n"
+            "  Latency percentiles, RSS and tick profiling\n"
+            "/probes\n"
+            "  Probe loss and RTT for the last 1h/24h/7d\n"
         ),
         "daily_report_running": (
             "📊DAILY REPORT: {generator}\n\n"
@@ -173,6 +187,93 @@ MESSAGES = {
             "⛽️🔽 Fuel used: {fuel_used:.1f} L\n"
             "⛽️➕ Refueled: {refuel_added:.1f} L"
         ),
+        "health_header": "Watchdog:",
+        "health_lag_line": "Loop lag: last {last:.0f} ms, p95 {p95:.0f} ms, max {max:.0f} ms",
+        "health_job_line": (
+            "{job}: {runs} runs, last {last:.2f}s, max {max:.2f}s / {interval:.0f}s, "
+            "overruns {overruns}, missed {missed}"
+        ),
+        "health_no_jobs": "No job runs recorded yet.",
+        "health_maintenance_line": (
+            "Maintenance {time}: archived {sessions} sessions, {refuels} refuels; "
+            "freed {freed:.1f} MB, {free:.1f} MB still free"
+        ),
+        "watchdog_lag_alert": "⚠️Event loop lag: {lag_ms:.0f} ms (threshold {threshold_ms:.0f} ms)",
+        "watchdog_job_alert": (
+            "⚠️Job {job} took {duration:.1f}s (interval {interval:.0f}s)\n"
+            "Overruns: {overruns}, missed ticks: {missed}"
+        ),
+        "perf_usage": "Usage: /perf [cpu|mem <ticks>]",
+        "perf_header": "Performance:",
+        "perf_rss_line": "RSS: {rss_mb:.1f} MB",
+        "perf_commands_header": "Commands p50/p95/p99 (ms):",
+        "perf_command_line": "/{command}: {p50:.0f}/{p95:.0f}/{p99:.0f} (n={count})",
+        "perf_ticks_header": "Slowest recent monitor ticks:",
+        "perf_tick_line": "{time}  {duration:.2f}s",
+        "perf_db_header": "DB calls by handler:",
+        "perf_db_line": "{scope}: {count}",
+        "perf_none": "  none yet",
+        "perf_capture_armed": "Capturing {mode} profile over the next {ticks} monitor tick(s).",
+        "perf_capture_done": "Profile capture finished.",
+        "export_usage": (
+            "❕Usage: /export [csv|jsonl] [from] [to]\n"
+            "Example: /export csv 2025-01-01 2025-12-31"
+        ),
+        "export_empty": "No records for this period.",
+        "export_too_large": "❗Export is {size_mb:.0f} MB, over the upload limit. Use a shorter period.",
+        "export_caption": "📦Export: {rows} rows, {format}",
+        "telegraph_nav_prev": "← Previous",
+        "telegraph_nav_next": "Next →",
+        "telegraph_nav_page": "Page {page} of {pages}",
+        "telegraph_failed": "❗Telegraph report could not be published, try again later.",
+        "report_truncated": "❕The report shows the latest {pages} pages only.",
+        "page_older": "Older »",
+        "page_newer": "« Newer",
+        "page_expired": "This list has expired, run the command again.",
+        "page_no_more": "No more records.",
+        "report_usage": (
+            "❕Usage: /report <from> [to]\n"
+            "Dates as YYYY-MM-DD (whole days) or YYYY-MM-DDTHH:MM\n"
+            "Example: /report 2025-01-01 2025-03-31"
+        ),
+        "report_archived": "❕Sessions before {date} are archived into monthly totals; pick a later start.",
+        "period_report": (
+            "📈REPORT: {generator}\n\n"
+            "Period: {start} — {end}\n\n"
+            "⏱️Runtime: {runtime_hours}h {runtime_minutes}m ({utilization:.1f}%)\n"
+            "🔁Starts: {starts}\n"
+            "⏳Longest run: {longest_hours}h {longest_minutes}m, "
+            "average: {average_hours}h {average_minutes}m\n"
+            "⛽️🔽 Fuel used: {fuel_used:.1f} L\n"
+            "⛽️➕ Refueled: {fuel_added:.1f} L\n"
+            "⛽️ Tank: {fuel_start:.1f} → {fuel_end:.1f} L (min {fuel_min:.1f} L)"
+        ),
+        "status_usage": "❕Usage: /status [week|month|detail]",
+        "heatmap_title_week": "{generator}: runtime, last 7 days",
+        "heatmap_title_month": "{generator}: runtime, last 30 days",
+        "heatmap_title_report_month": "{generator}: runtime, {month}",
+        "fuel_chart_title": "{generator}: fuel level, {start} — {end}",
+        "probes_header": "Probe samples ({stored} of {capacity} kept):",
+        "probes_window_line": (
+            "{window}: {samples} probes, lost {lost} ({loss:.1f}%), "
+            "single misses {isolated}, flaps {flaps}\n"
+            "  RTT p50/p95/p99/max: {rtt} ms"
+        ),
+        "probes_window_empty": "{window}: no probes",
+        "status_detail_header": "📈Percentiles p50/p95/p99:",
+        "status_detail_rtt_line": "📶Probe RTT {window}: {p50}/{p95}/{p99} ms (n={count})",
+        "status_detail_session_line": "⏱️Run length {window}: {p50}/{p95}/{p99} min (n={count})",
+        "status_detail_consumption_learned": (
+            "⛽️Consumption: {rate:.1f} ±{stderr:.1f} L/h from {count} gauge readings, "
+            "used for estimates (configured {configured:.1f} L/h)"
+        ),
+        "status_detail_consumption_fixed": (
+            "⛽️Consumption: {rate:.1f} ±{stderr:.1f} L/h from {count} gauge readings; "
+            "estimates use the configured {configured:.1f} L/h (FUEL_MODEL=learned to switch)"
+        ),
+        "status_detail_consumption_pending": (
+            "⛽️Consumption: {count} of {needed} gauge readings (/reset_fuel) needed to fit a rate"
+        ),
     },
     "ru": {
         "access_denied": "❗️Доступ запрещен.\nУ вас нет прав для использования этого бота.",
@@ -281,10 +382,12 @@ MESSAGES = {
         "help": (
             "Бот мониторинга генератора\n\n"
             "Доступные команды:\n\n"
-            "/status\n"
+            "/status [week|month|detail]\n"
             "  Текущий статус генератора\n"
             "  Уровень топлива и оставшееся время работы\n"
-            "  Статистика за 24 часа и 7 дней\n\n"
+            "  Статистика за 24 часа и 7 дней\n"
+            "  week/month: тепловая карта работы за 7/30 дней\n"
+            "  detail: перцентили RTT проб и длительности запусков, оценка расхода\n\n"
             "/history [days]\n"
             "  История запусков/остановок и расхода топлива\n"
             "  По умолчанию: 1 день\n"
@@ -302,9 +405,15 @@ MESSAGES = {
             "  Показать это сообщение\n\n"
             "/month\n"
             "  Показать отчет за прошлый месяц\n\n"
+            "/report <с> [по]\n"
+            "  Работа, запуски, сессии, топливо и график уровня в баке за любой период\n"
+            "  Пример: /report 2025-01-01 2025-03-31\n\n"
             "/setservice <часы>\n"
             "  Задать следующее обслуживание через X часов работы\n"
             "  /setservice 0 для сброса напоминания\n\n"
+            "/export [csv|jsonl] [с] [по]\n"
+            "  Вся история в zip, даты в формате YYYY-MM-DD\n"
+            "  Пример: /export csv 2025-01-01 2025-12-31\n\n"
             "Только для админа:\n"
             "/allow <user_id>\n"
             "  Добавить в белый список\n"
@@ -320,6 +429,12 @@ MESSAGES = {
             "  Изменить настройку в .env и в памяти\n"
             "/setmhours <часы>\n"
             "  Корректировка общих моточасов\n"
+            "/health\n"
+            "  Задержка цикла событий и время задач\n"
+            "/perf [cpu|mem <тики>]\n"
+            "  Перцентили задержек, RSS и профилирование тиков\n"
+            "/probes\n"
+            "  Потери и RTT проб за 1ч/24ч/7д\n"
         ),
         "daily_report_running": (
             "📊ЕЖЕДНЕВНЫЙ ОТЧЕТ: {generator}\n\n"
@@ -344,6 +459,93 @@ MESSAGES = {
             "⛽️🔽 Расход: {fuel_used:.1f} л\n"
             "⛽️➕ Заправлено: {refuel_added:.1f} л"
         ),
+        "health_header": "Watchdog:",
+        "health_lag_line": "Задержка цикла: сейчас {last:.0f} мс, p95 {p95:.0f} мс, макс {max:.0f} мс",
+        "health_job_line": (
+            "{job}: запусков {runs}, последний {last:.2f}с, макс {max:.2f}с / {interval:.0f}с, "
+            "превышений {overruns}, пропущено {missed}"
+        ),
+        "health_no_jobs": "Запусков задач пока нет.",
+        "health_maintenance_line": (
+            "Обслуживание БД {time}: в архив {sessions} запусков, {refuels} заправок; "
+            "освобождено {freed:.1f} МБ, еще свободно {free:.1f} МБ"
+        ),
+        "watchdog_lag_alert": "⚠️Задержка цикла событий: {lag_ms:.0f} мс (порог {threshold_ms:.0f} мс)",
+        "watchdog_job_alert": (
+            "⚠️Задача {job} выполнялась {duration:.1f}с (интервал {interval:.0f}с)\n"
+            "Превышений: {overruns}, пропущено тиков: {missed}"
+        ),
+        "perf_usage": "Использование: /perf [cpu|mem <тики>]",
+        "perf_header": "Производительность:",
+        "perf_rss_line": "RSS: {rss_mb:.1f} МБ",
+        "perf_commands_header": "Команды p50/p95/p99 (мс):",
+        "perf_command_line": "/{command}: {p50:.0f}/{p95:.0f}/{p99:.0f} (n={count})",
+        "perf_ticks_header": "Самые медленные тики мониторинга:",
+        "perf_tick_line": "{time}  {duration:.2f}с",
+        "perf_db_header": "Запросы к БД по обработчикам:",
+        "perf_db_line": "{scope}: {count}",
+        "perf_none": "  пока нет",
+        "perf_capture_armed": "Профилирование {mode} на следующих {ticks} тиках мониторинга.",
+        "perf_capture_done": "Профилирование завершено.",
+        "export_usage": (
+            "❕Использование: /export [csv|jsonl] [с] [по]\n"
+            "Пример: /export csv 2025-01-01 2025-12-31"
+        ),
+        "export_empty": "Нет записей за этот период.",
+        "export_too_large": "❗Экспорт занимает {size_mb:.0f} МБ, больше лимита загрузки. Укажите период короче.",
+        "export_caption": "📦Экспорт: {rows} строк, {format}",
+        "telegraph_nav_prev": "← Назад",
+        "telegraph_nav_next": "Далее →",
+        "telegraph_nav_page": "Страница {page} из {pages}",
+        "telegraph_failed": "❗Не удалось опубликовать отчет в Telegraph, попробуйте позже.",
+        "report_truncated": "❕В отчете только последние {pages} страниц.",
+        "page_older": "Старее »",
+        "page_newer": "« Новее",
+        "page_expired": "Список устарел, повторите команду.",
+        "page_no_more": "Больше записей нет.",
+        "report_usage": (
+            "❕Использование: /report <с> [по]\n"
+            "Даты в формате YYYY-MM-DD (целые дни) или YYYY-MM-DDTHH:MM\n"
+            "Пример: /report 2025-01-01 2025-03-31"
+        ),
+        "report_archived": "❕Запуски до {date} свернуты в помесячные итоги; выберите более позднее начало.",
+        "period_report": (
+            "📈ОТЧЕТ: {generator}\n\n"
+            "Период: {start} — {end}\n\n"
+            "⏱️Время работы: {runtime_hours}ч {runtime_minutes}м ({utilization:.1f}%)\n"
+            "🔁Запусков: {starts}\n"
+            "⏳Самый долгий запуск: {longest_hours}ч {longest_minutes}м, "
+            "в среднем: {average_hours}ч {average_minutes}м\n"
+            "⛽️🔽 Расход: {fuel_used:.1f} л\n"
+            "⛽️➕ Заправлено: {fuel_added:.1f} л\n"
+            "⛽️ В баке: {fuel_start:.1f} → {fuel_end:.1f} л (мин. {fuel_min:.1f} л)"
+        ),
+        "status_usage": "❕Использование: /status [week|month|detail]",
+        "heatmap_title_week": "{generator}: работа за 7 дней",
+        "heatmap_title_month": "{generator}: работа за 30 дней",
+        "heatmap_title_report_month": "{generator}: работа, {month}",
+        "fuel_chart_title": "{generator}: уровень топлива, {start} — {end}",
+        "probes_header": "Пробы связи (хранится {stored} из {capacity}):",
+        "probes_window_line": (
+            "{window}: {samples} проб, потеряно {lost} ({loss:.1f}%), "
+            "одиночных пропусков {isolated}, переключений {flaps}\n"
+            "  RTT p50/p95/p99/max: {rtt} мс"
+        ),
+        "probes_window_empty": "{window}: проб нет",
+        "status_detail_header": "📈Перцентили p50/p95/p99:",
+        "status_detail_rtt_line": "📶RTT проб {window}: {p50}/{p95}/{p99} мс (n={count})",
+        "status_detail_session_line": "⏱️Длительность запуска {window}: {p50}/{p95}/{p99} мин (n={count})",
+        "status_detail_consumption_learned": (
+            "⛽️Расход: {rate:.1f} ±{stderr:.1f} л/ч по {count} показаниям, "
+            "используется в расчетах (в настройках {configured:.1f} л/ч)"
+        ),
+        "status_detail_consumption_fixed": (
+            "⛽️Расход: {rate:.1f} ±{stderr:.1f} л/ч по {count} показаниям; "
+            "в расчетах {configured:.1f} л/ч из настроек (FUEL_MODEL=learned для замены)"
+        ),
+        "status_detail_consumption_pending": (
+            "⛽️Расход: для оценки нужно {needed} показаний (/reset_fuel), есть {count}"
+        ),
     },
 }
 
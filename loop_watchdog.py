@@ -0,0 +1,139 @@
+import asyncio
+import collections
+import functools
+import time
+
+from metrics import percentile
+
+# Minimum pause between two alerts of the same kind.
+ALERT_COOLDOWN_SECONDS = 1800
+LAG_SAMPLE_SECONDS = 0.5
+LAG_WINDOW = 600  # samples kept for percentiles (~5 min)
+RECENT_RUNS = 200
+
+
+class JobTiming:
+    def __init__(self, name: str):
+        self.name = name
+        self.runs = 0
+        self.overruns = 0
+        self.missed = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.last_interval = 0.0
+        # (wall clock end time, duration) of the latest runs
+        self.recent: collections.deque[tuple[float, float]] = collections.deque(maxlen=RECENT_RUNS)
+        self._last_start: float | None = None
+
+    def record(self, started: float, duration: float, interval: float) -> int:
+        """Stores one run; returns the number of ticks skipped before it."""
+        missed = 0
+        if self._last_start is not None and interval > 0:
+            gap = started - self._last_start
+            missed = max(0, int(round(gap / interval)) - 1)
+        self._last_start = started
+        self.runs += 1
+        self.missed += missed
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+        self.last_interval = interval
+        self.recent.append((time.time(), duration))
+        if interval > 0 and duration > interval:
+            self.overruns += 1
+        return missed
+
+
+class Watchdog:
+    """
+    Measures event-loop lag with a sleeping sampler task and tracks how long
+    scheduled jobs take compared with their interval. Threshold breaches are
+    reported through an async on_alert(kind, **values) callback.
+    """
+
+    def __init__(self, lag_threshold_ms: float, tick_ratio: float):
+        self.lag_threshold_ms = lag_threshold_ms
+        self.tick_ratio = tick_ratio
+        self.lag_last_ms = 0.0
+        self.lag_max_ms = 0.0
+        self.lag_samples: collections.deque[float] = collections.deque(maxlen=LAG_WINDOW)
+        self.jobs: dict[str, JobTiming] = {}
+        self._on_alert = None
+        self._task: asyncio.Task | None = None
+        self._last_alert: dict[str, float] = {}
+
+    def start(self, on_alert) -> None:
+        self._on_alert = on_alert
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._sample_loop())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def lag_percentile(self, q: float) -> float:
+        return percentile(list(self.lag_samples), q)
+
+    async def _alert(self, kind: str, **values) -> None:
+        if self._on_alert is None:
+            return
+        now = time.monotonic()
+        last = self._last_alert.get(kind)
+        if last is not None and now - last < ALERT_COOLDOWN_SECONDS:
+            return
+        self._last_alert[kind] = now
+        try:
+            await self._on_alert(kind, **values)
+        except Exception:
+            pass
+
+    async def _sample_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_SAMPLE_SECONDS)
+            lag_ms = max(0.0, (loop.time() - start - LAG_SAMPLE_SECONDS) * 1000)
+            self.lag_last_ms = lag_ms
+            self.lag_max_ms = max(self.lag_max_ms, lag_ms)
+            self.lag_samples.append(lag_ms)
+            if self.lag_threshold_ms > 0 and lag_ms > self.lag_threshold_ms:
+                await self._alert("lag", lag_ms=lag_ms, threshold_ms=self.lag_threshold_ms)
+
+    async def job_finished(self, name: str, started: float, duration: float, interval: float) -> None:
+        timing = self.jobs.setdefault(name, JobTiming(name))
+        missed = timing.record(started, duration, interval)
+        if self.tick_ratio <= 0:
+            return
+        limit = interval * self.tick_ratio
+        if (limit > 0 and duration > limit) or missed:
+            await self._alert(
+                f"job:{name}",
+                job=name,
+                duration=duration,
+                interval=interval,
+                missed=timing.missed,
+                overruns=timing.overruns,
+            )
+
+    def timed_job(self, name: str, interval):
+        """Decorator for job callbacks; interval is a callable returning seconds."""
+
+        def decorator(job):
+            @functools.wraps(job)
+            async def wrapper(*args, **kwargs):
+                started = time.monotonic()
+                try:
+                    return await job(*args, **kwargs)
+                finally:
+                    await self.job_finished(
+                        name, started, time.monotonic() - started, float(interval())
+                    )
+
+            return wrapper
+
+        return decorator
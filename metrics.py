@@ -0,0 +1,158 @@
+import collections
+import contextlib
+import functools
+import inspect
+import threading
+import time
+
+# Prometheus client defaults, in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Raw observations kept per series for exact recent percentiles.
+RECENT_SAMPLES = 512
+
+_registry: dict[str, "Histogram"] = {}
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Series:
+    __slots__ = ("buckets", "count", "total", "recent")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.count = 0
+        self.total = 0.0
+        self.recent = collections.deque(maxlen=RECENT_SAMPLES)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram keyed by label set. Observations may come from
+    the event loop, the DB thread or probe threads, so updates take a lock.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.bounds = tuple(buckets)
+        self._series: dict[tuple, _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.bounds))
+            for i, bound in enumerate(self.bounds):
+                if value <= bound:
+                    series.buckets[i] += 1
+                    break
+            series.count += 1
+            series.total += value
+            series.recent.append(value)
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """Decorator timing a sync or async callable."""
+
+        def decorator(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.time(**labels):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self) -> dict[tuple, tuple[list[int], int, float]]:
+        with self._lock:
+            return {
+                key: (list(s.buckets), s.count, s.total)
+                for key, s in self._series.items()
+            }
+
+    def recent(self) -> dict[tuple, list[float]]:
+        with self._lock:
+            return {key: list(s.recent) for key, s in self._series.items()}
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for key, (buckets, count, total) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, n in zip(self.bounds, buckets):
+                cumulative += n
+                labels = _format_labels(key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+def histogram(name: str, help_text: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+    hist = _registry.get(name)
+    if hist is None:
+        hist = _registry[name] = Histogram(name, help_text, buckets)
+    return hist
+
+
+def render_summary(name: str, help_text: str, series) -> list[str]:
+    """
+    Summary family from precomputed quantiles; series yields
+    (labels dict, {quantile: value or None}, count, sum).
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+    for labels, quantiles, count, total in series:
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        for q, value in quantiles.items():
+            quantile = f'quantile="{q}"'
+            lines.append(f"{name}{_format_labels(key, quantile)} {'NaN' if value is None else value}")
+        lines.append(f"{name}_sum{_format_labels(key)} {total}")
+        lines.append(f"{name}_count{_format_labels(key)} {count}")
+    return lines
+
+
+def render() -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines: list[str] = []
+    for name in sorted(_registry):
+        lines.extend(_registry[name].render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,99 @@
+import mmap
+import os
+import struct
+
+import numpy as np
+
+# Fixed-size ring of probe samples in a memory-mapped file. A 32-byte header
+# (magic, version, record size, capacity, next slot, count) is followed by
+# capacity 16-byte records, so disk usage is bounded and an append is two
+# in-place writes regardless of how much history the file holds.
+
+MAGIC = b"GPRB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIQQ")
+HEADER_SIZE = 32
+RECORD = np.dtype(
+    {
+        "names": ["ts", "rtt", "ok"],
+        "formats": ["<f8", "<f4", "u1"],
+        "offsets": [0, 8, 12],
+        "itemsize": 16,
+    }
+)
+
+
+class ProbeRing:
+    """
+    ts is in session_store epoch seconds, rtt in seconds (NaN when the probe
+    gave none), ok is 1 when the generator answered.
+    """
+
+    def __init__(self, path: str, capacity: int):
+        self.path = path
+        self.capacity = capacity
+        size = HEADER_SIZE + capacity * RECORD.itemsize
+        fresh = not os.path.exists(path) or os.path.getsize(path) != size
+        if not fresh:
+            with open(path, "rb") as f:
+                magic, version, itemsize, stored, _, _ = HEADER.unpack(f.read(HEADER.size))
+            fresh = (magic, version, itemsize, stored) != (MAGIC, VERSION, RECORD.itemsize, capacity)
+        if fresh:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # Unknown layout or a new capacity: start over rather than misread.
+            with open(path, "wb") as f:
+                f.truncate(size)
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        if fresh:
+            HEADER.pack_into(self._mm, 0, MAGIC, VERSION, RECORD.itemsize, capacity, 0, 0)
+        self._records = np.frombuffer(self._mm, dtype=RECORD, count=capacity, offset=HEADER_SIZE)
+        _, _, _, _, self.head, self.count = HEADER.unpack_from(self._mm, 0)
+
+    def append(self, ts: float, ok: bool, rtt: float | None) -> None:
+        self._records[self.head] = (ts, np.nan if rtt is None else rtt, 1 if ok else 0)
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        HEADER.pack_into(
+            self._mm, 0, MAGIC, VERSION, RECORD.itemsize, self.capacity, self.head, self.count
+        )
+
+    def samples(self, since: float | None = None) -> np.ndarray:
+        """Copy of the stored records, oldest first, optionally from since on."""
+        if self.count < self.capacity:
+            ordered = self._records[: self.count].copy()
+        else:
+            ordered = np.concatenate((self._records[self.head:], self._records[: self.head]))
+        if since is not None:
+            ordered = ordered[ordered["ts"] >= since]
+        return ordered
+
+    def close(self) -> None:
+        del self._records
+        self._mm.close()
+        self._file.close()
+
+
+def summarize(samples: np.ndarray) -> dict:
+    """Loss, RTT percentiles and flap counts for a slice of samples."""
+    ok = samples["ok"].astype(bool)
+    rtt = samples["rtt"][ok]
+    rtt = rtt[~np.isnan(rtt)] * 1000
+    lost = int((~ok).sum())
+    # A single missed probe between two answers looks like the network, not a stop.
+    isolated = int((~ok[1:-1] & ok[:-2] & ok[2:]).sum()) if len(ok) > 2 else 0
+
+    def pct(q: float) -> float | None:
+        return float(np.quantile(rtt, q)) if len(rtt) else None
+
+    return {
+        "samples": len(samples),
+        "lost": lost,
+        "loss": lost / len(samples) if len(samples) else 0.0,
+        "isolated_losses": isolated,
+        "flaps": int((ok[1:] != ok[:-1]).sum()),
+        "rtt_p50_ms": pct(0.50),
+        "rtt_p95_ms": pct(0.95),
+        "rtt_p99_ms": pct(0.99),
+        "rtt_max_ms": float(rtt.max()) if len(rtt) else None,
+    }
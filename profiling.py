@@ -0,0 +1,260 @@
+import collections
+import contextlib
+import contextvars
+import functools
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+# Name of the handler or job on whose behalf the current task is running.
+current_scope: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "current_scope", default="other"
+)
+db_calls: collections.Counter[str] = collections.Counter()
+
+MAX_CAPTURE_TICKS = 100
+REPORT_LINES = 40
+SAMPLE_INTERVAL = 0.005
+
+
+def scoped(name: str):
+    """Decorator tagging an async callback so DB calls are attributed to it."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = current_scope.set(name)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                current_scope.reset(token)
+
+        return wrapper
+
+    return decorator
+
+
+def count_db_call() -> None:
+    db_calls[current_scope.get()] += 1
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # Peak RSS where /proc is unavailable (kB on Linux).
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _Capture:
+    """One armed capture; the ticks that belong to it hold it as their handle."""
+
+    def __init__(self, mode: str, ticks: int):
+        self.mode = mode
+        self.remaining = self.total = ticks
+        self.seconds = 0.0
+        self.began = 0.0
+        self.snapshot = None
+        self.started_tracemalloc = False
+        # thread id -> nesting depth of tick work it is doing right now
+        self.working: collections.Counter[int] = collections.Counter()
+        self.names: dict[int, str] = {}
+        self.stacks: collections.Counter[tuple] = collections.Counter()
+        self.threads: collections.Counter[str] = collections.Counter()
+        self._sampler: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start_sampling(self) -> None:
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name="genbot-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop_sampling(self) -> None:
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            busy = [ident for ident, depth in tuple(self.working.items()) if depth > 0]
+            if not busy:
+                continue
+            frames = sys._current_frames()
+            for ident in busy:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[tuple(stack)] += 1
+                    self.threads[self.names.get(ident, str(ident))] += 1
+
+    def close(self) -> None:
+        self.stop_sampling()
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+    def cpu_report(self) -> str:
+        count = sum(self.threads.values())
+        lines = [
+            f"Sampled profile over {self.total} monitor tick(s), {self.seconds:.3f} s: "
+            f"{count} wall-clock samples every {SAMPLE_INTERVAL * 1000:g} ms",
+            "",
+            "Samples by thread:",
+        ]
+        lines.extend(f"{n:>8}  {name}" for name, n in self.threads.most_common())
+
+        innermost: collections.Counter[tuple] = collections.Counter()
+        on_stack: collections.Counter[tuple] = collections.Counter()
+        for stack, n in self.stacks.items():
+            innermost[stack[0]] += n
+            for location in set(stack):
+                on_stack[location] += n
+
+        def section(title: str, counter: collections.Counter) -> None:
+            lines.extend(["", title])
+            for (filename, lineno, name), n in counter.most_common(REPORT_LINES // 2):
+                where = os.path.join(os.path.basename(os.path.dirname(filename)), os.path.basename(filename))
+                lines.append(f"{n:>8}  {n / count:>6.1%}  {name} ({where}:{lineno})")
+
+        if count:
+            section("Innermost function:", innermost)
+            section("On the stack (cumulative):", on_stack)
+        return "\n".join(lines) + "\n"
+
+    def mem_report(self) -> str:
+        after = tracemalloc.take_snapshot()
+        self.close()
+        lines = [f"tracemalloc diff over {self.total} monitor tick(s)", ""]
+        for stat in after.compare_to(self.snapshot, "lineno")[:REPORT_LINES]:
+            lines.append(str(stat))
+        return "\n".join(lines) + "\n"
+
+
+# Capture the current task's tick belongs to; set by TickProfiler.run().
+active_tick: contextvars.ContextVar[_Capture | None] = contextvars.ContextVar(
+    "active_tick", default=None
+)
+
+
+class _Stepped:
+    """Awaits coro, counting the loop thread toward tick only while coro itself runs."""
+
+    def __init__(self, profiler: "TickProfiler", tick: _Capture, coro):
+        self.profiler = profiler
+        self.tick = tick
+        self.coro = coro
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            with self.profiler.attribute(self.tick):
+                try:
+                    yielded = self.coro.send(value) if error is None else self.coro.throw(error)
+                except StopIteration as stop:
+                    return stop.value
+            try:
+                value, error = (yield yielded), None
+            except GeneratorExit:
+                self.coro.close()
+                raise
+            except BaseException as exc:
+                value, error = None, exc
+
+
+class TickProfiler:
+    """
+    Captures a sampled profile ("cpu") or a tracemalloc diff ("mem") over the
+    next N monitor ticks. In cpu mode a sampler thread records the stacks of
+    the threads doing the tick's work: the event loop while the tick
+    coroutine runs (other handlers interleaved with it are not counted), and
+    the DB and probe threads inside attribute(). begin() returns the tick's
+    handle and end() closes it, returning the text summary after the last
+    armed tick; a tick that began before /perf armed the capture is ignored.
+    """
+
+    def __init__(self):
+        self._capture: _Capture | None = None
+
+    @property
+    def active(self) -> bool:
+        return self._capture is not None
+
+    @property
+    def total(self) -> int:
+        return self._capture.total if self._capture is not None else 0
+
+    def arm(self, mode: str, ticks: int) -> None:
+        if self._capture is not None:
+            self._capture.close()
+        self._capture = _Capture(mode, max(1, min(ticks, MAX_CAPTURE_TICKS)))
+
+    def begin(self) -> _Capture | None:
+        capture = self._capture
+        if capture is None:
+            return None
+        if capture.mode == "cpu":
+            capture.start_sampling()
+        elif capture.snapshot is None:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                capture.started_tracemalloc = True
+            capture.snapshot = tracemalloc.take_snapshot()
+        capture.began = time.perf_counter()
+        return capture
+
+    def end(self, tick: _Capture | None) -> str | None:
+        if tick is None or tick is not self._capture:
+            return None
+        tick.seconds += time.perf_counter() - tick.began
+        tick.stop_sampling()
+        tick.remaining -= 1
+        if tick.remaining > 0:
+            return None
+        self._capture = None
+        return tick.cpu_report() if tick.mode == "cpu" else tick.mem_report()
+
+    async def run(self, coro) -> str | None:
+        """Awaits coro as one tick; returns the report when it was the last armed one."""
+        tick = self.begin()
+        token = active_tick.set(tick)
+        try:
+            if tick is not None and tick.mode == "cpu":
+                await _Stepped(self, tick, coro)
+            else:
+                await coro
+        finally:
+            active_tick.reset(token)
+            report = self.end(tick)
+        return report
+
+    @contextlib.contextmanager
+    def attribute(self, tick: _Capture | None = None):
+        """
+        Counts the calling thread's samples toward tick while inside; tick
+        defaults to the one of the calling context (asyncio.to_thread copies
+        it, run_in_executor does not, so run_db passes it explicitly).
+        """
+        if tick is None:
+            tick = active_tick.get()
+        if tick is None or tick.mode != "cpu":
+            yield
+            return
+        ident = threading.get_ident()
+        tick.names.setdefault(ident, threading.current_thread().name)
+        tick.working[ident] += 1
+        try:
+            yield
+        finally:
+            tick.working[ident] -= 1
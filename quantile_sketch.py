@@ -0,0 +1,149 @@
+import math
+import struct
+
+import numpy as np
+
+# Merging t-digest (Dunning & Ertl). Values are buffered and folded into a
+# sorted list of centroids whose size is bounded by the k1 scale function,
+# so tails stay accurate and a digest never holds more than ~compression
+# centroids. Two digests merge by pooling their centroids, which is what
+# makes hourly buckets and several generators combinable.
+
+DEFAULT_COMPRESSION = 200
+_HEADER = struct.Struct("<HIddd")
+
+
+class TDigest:
+    def __init__(self, compression: int = DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: list[float] = []
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum()) + len(self._buffer)
+
+    def add(self, value: float) -> None:
+        self._buffer.append(value)
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def add_many(self, values) -> None:
+        values = np.asarray(values, dtype=float)
+        if not len(values):
+            return
+        self._buffer.extend(values.tolist())
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress()
+
+    def merge(self, other: "TDigest") -> None:
+        other._compress()
+        self._compress()
+        self.means = np.concatenate((self.means, other.means))
+        self.weights = np.concatenate((self.weights, other.weights))
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(force=True)
+
+    def _q_limit(self, q: float) -> float:
+        """Largest quantile a centroid starting at q may reach: k1(limit) = k1(q) + 1."""
+        angle = math.asin(2 * min(max(q, 0.0), 1.0) - 1) + 2 * math.pi / self.compression
+        return 1.0 if angle >= math.pi / 2 else (math.sin(angle) + 1) / 2
+
+    def _compress(self, force: bool = False) -> None:
+        if not self._buffer and not force:
+            return
+        means = np.concatenate((self.means, self._buffer))
+        weights = np.concatenate((self.weights, np.ones(len(self._buffer))))
+        self._buffer = []
+        if not len(means):
+            return
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order].tolist(), weights[order].tolist()
+        n = sum(weights)
+
+        out_means: list[float] = []
+        out_weights: list[float] = []
+        cur_mean, cur_weight = means[0], weights[0]
+        done = 0.0
+        limit = self._q_limit(0.0) * n
+        for mean, weight in zip(means[1:], weights[1:]):
+            if done + cur_weight + weight <= limit:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                out_means.append(cur_mean)
+                out_weights.append(cur_weight)
+                done += cur_weight
+                limit = self._q_limit(done / n) * n
+                cur_mean, cur_weight = mean, weight
+        out_means.append(cur_mean)
+        out_weights.append(cur_weight)
+        self.means = np.array(out_means)
+        self.weights = np.array(out_weights)
+
+    def quantile(self, q: float) -> float | None:
+        self._compress()
+        n = self.weights.sum()
+        if not n:
+            return None
+        if len(self.means) == 1:
+            return float(self.means[0])
+        target = q * n
+        # Each centroid's weight sits around its mean; interpolate between the
+        # midpoints, and towards min/max in the outer half-centroids.
+        centers = np.cumsum(self.weights) - self.weights / 2
+        if target <= centers[0]:
+            lo_w = self.weights[0] / 2
+            return float(self.min + (self.means[0] - self.min) * (target / lo_w if lo_w else 1))
+        if target >= centers[-1]:
+            hi_w = self.weights[-1] / 2
+            frac = (target - centers[-1]) / hi_w if hi_w else 1
+            return float(self.means[-1] + (self.max - self.means[-1]) * frac)
+        i = int(np.searchsorted(centers, target, side="right")) - 1
+        frac = (target - centers[i]) / (centers[i + 1] - centers[i])
+        return float(self.means[i] + (self.means[i + 1] - self.means[i]) * frac)
+
+    def to_bytes(self) -> bytes:
+        self._compress()
+        header = _HEADER.pack(self.compression, len(self.means), self.total, self.min, self.max)
+        return header + self.means.astype("<f8").tobytes() + self.weights.astype("<f8").tobytes()
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "TDigest":
+        compression, size, total, low, high = _HEADER.unpack_from(blob)
+        digest = cls(compression)
+        body = np.frombuffer(blob, dtype="<f8", offset=_HEADER.size, count=2 * size)
+        digest.means = body[:size].copy()
+        digest.weights = body[size:].copy()
+        digest.total, digest.min, digest.max = total, low, high
+        return digest
+
+
+def merge_all(digests) -> TDigest:
+    """One digest from many, pooling every centroid into a single compression pass."""
+    merged = TDigest()
+    means, weights = [], []
+    for digest in digests:
+        digest._compress()
+        merged.compression = max(merged.compression, digest.compression)
+        means.append(digest.means)
+        weights.append(digest.weights)
+        merged.total += digest.total
+        merged.min = min(merged.min, digest.min)
+        merged.max = max(merged.max, digest.max)
+    if means:
+        merged.means = np.concatenate(means)
+        merged.weights = np.concatenate(weights)
+        merged._compress(force=True)
+    return merged
@@ -0,0 +1,274 @@
+"""
+Replays a probe trace through the real monitor logic at full speed.
+
+Each (timestamp, reachable) sample sets the simulated clock and runs one
+monitor_job tick against a fresh (or given) SQLite file, with a fake bot
+that records outbound messages instead of calling Telegram.
+
+    python replay.py trace.csv [--reports] [--json result.json]
+    python replay.py --synthetic 90 --interval 60 --flap 0.01 --seed 7
+
+Trace files are CSV (timestamp,reachable) or JSONL ({"ts": ..., "reachable": ...})
+with ISO timestamps in ascending order.
+"""
+import argparse
+import asyncio
+import csv
+import datetime as dt
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import types
+
+
+def _parse_bool(raw) -> bool:
+    if isinstance(raw, bool):
+        return raw
+    return str(raw).strip().lower() in {"1", "true", "yes", "up", "alive"}
+
+
+def read_trace(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    yield dt.datetime.fromisoformat(row["ts"]), _parse_bool(row["reachable"])
+            return
+        for row in csv.reader(f):
+            if len(row) < 2:
+                continue
+            try:
+                ts = dt.datetime.fromisoformat(row[0].strip())
+            except ValueError:
+                continue  # header
+            yield ts, _parse_bool(row[1])
+
+
+def synthetic_trace(
+    start: dt.datetime,
+    days: float,
+    interval: int,
+    *,
+    flap: float = 0.0,
+    seed: int = 0,
+):
+    """Alternating off/run periods (2-12h / 1-6h) with optional single-sample flaps."""
+    rng = random.Random(seed)
+    end = start + dt.timedelta(days=days)
+    step = dt.timedelta(seconds=interval)
+    running = False
+    ts = start
+    next_change = ts + dt.timedelta(hours=rng.uniform(2, 12))
+    while ts < end:
+        if ts >= next_change:
+            running = not running
+            hours = rng.uniform(1, 6) if running else rng.uniform(2, 12)
+            next_change = ts + dt.timedelta(hours=hours)
+        reachable = running
+        if flap and rng.random() < flap:
+            reachable = not reachable
+        yield ts, reachable
+        ts += step
+
+
+class RecordingBot:
+    """Collects what the bot would have sent, stamped with simulated time."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.messages: list[dict] = []
+
+    def _record(self, method: str, chat_id, **fields):
+        self.messages.append(
+            {"at": self.clock.now().isoformat(), "method": method, "chat_id": chat_id, **fields}
+        )
+
+    async def send_message(self, chat_id=None, text=None, **kwargs):
+        self._record("sendMessage", chat_id, text=text)
+
+    async def send_photo(self, chat_id=None, photo=None, **kwargs):
+        self._record("sendPhoto", chat_id)
+
+    async def send_document(self, chat_id=None, document=None, **kwargs):
+        self._record("sendDocument", chat_id, filename=kwargs.get("filename"))
+
+
+ALERT_KEYS = (
+    "generator_started",
+    "generator_stopped",
+    "low_fuel_alert",
+    "service_due_alert",
+    "daily_report_running",
+    "daily_report_idle",
+    "monthly_report",
+)
+
+
+def _alert_patterns(t) -> list[tuple[str, re.Pattern]]:
+    patterns = []
+    for key in ALERT_KEYS:
+        first_line = t(key).split("\n", 1)[0]
+        regex = re.sub(r"\\\{[^}]*\\\}", ".*", re.escape(first_line))
+        patterns.append((key, re.compile(f"^{regex}$")))
+    return patterns
+
+
+async def replay(bot, samples, *, with_reports: bool = False) -> dict:
+    from clock import SimulatedClock, SimulatedJobQueue
+
+    samples = iter(samples)
+    try:
+        first = next(samples)
+    except StopIteration:
+        raise SystemExit("Trace is empty")
+
+    clock = SimulatedClock(first[0])
+    bot.set_clock(clock)
+    bot.use_inline_db(True)
+
+    current = {"alive": False}
+
+    async def probe() -> bool:
+        return current["alive"]
+
+    bot.set_probe(probe)
+
+    app = types.SimpleNamespace(bot=RecordingBot(clock), bot_data={}, job_queue=None)
+    job_queue = SimulatedJobQueue(clock, app)
+    app.job_queue = job_queue
+    if with_reports:
+        bot.schedule_reports(job_queue)
+    context = types.SimpleNamespace(
+        application=app, bot=app.bot, bot_data=app.bot_data, job=None, job_queue=job_queue
+    )
+
+    ticks = 0
+    first_ts = last_ts = first[0]
+    started = time.perf_counter()
+    for ts, reachable in _chain(first, samples):
+        await job_queue.run_until(ts)
+        current["alive"] = reachable
+        await bot.monitor_job(context)
+        ticks += 1
+        last_ts = ts
+    elapsed = time.perf_counter() - started
+
+    return _summary(bot, app.bot.messages, ticks, elapsed, first_ts, last_ts)
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def _summary(bot, messages, ticks, elapsed, first_ts, last_ts) -> dict:
+    with bot._connect() as conn:
+        log = conn.execute("""
+            SELECT start_time, stop_time, runtime_seconds, fuel_used
+            FROM generator_log
+            ORDER BY id
+        """).fetchall()
+
+    alerts = {key: 0 for key in ALERT_KEYS}
+    patterns = _alert_patterns(bot.t)
+    for msg in messages:
+        first_line = (msg.get("text") or "").split("\n", 1)[0]
+        for key, pattern in patterns:
+            if pattern.match(first_line):
+                alerts[key] += 1
+                break
+
+    now = bot.clock.now()
+    return {
+        "trace_start": first_ts.isoformat(),
+        "trace_end": last_ts.isoformat(),
+        "ticks": ticks,
+        "elapsed_seconds": round(elapsed, 3),
+        "ticks_per_second": round(ticks / elapsed, 1) if elapsed > 0 else None,
+        "sessions": len(log),
+        "runtime_seconds": sum(row[2] for row in log),
+        "fuel_used": round(sum(row[3] for row in log), 3),
+        "running": bot.get_state("running", "0") == "1",
+        "fuel_left": round(bot.get_effective_fuel_left_now(now), 3),
+        "alerts": alerts,
+        "messages": messages,
+        "generator_log": [
+            {"start_time": s, "stop_time": e, "runtime_seconds": r, "fuel_used": f}
+            for s, e, r, f in log
+        ],
+    }
+
+
+def _configure_env(args) -> None:
+    os.environ.setdefault("TOKEN", "0:replay")
+    os.environ.setdefault("GENERATORNAME", "Replay")
+    os.environ.setdefault("GENERATORADDR", "127.0.0.1")
+    overrides = {
+        "INTERVAL": args.interval,
+        "FUEL_CONSUMPTION": args.consumption,
+        "INITIAL_FUEL": args.initial_fuel,
+        "TANK_CAPACITY": args.tank,
+        "LOW_FUEL_HOURS": args.low_fuel_hours,
+    }
+    for key, value in overrides.items():
+        if value is not None:
+            os.environ[key] = str(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("trace", nargs="?", help="CSV or JSONL trace file")
+    parser.add_argument("--synthetic", type=float, metavar="DAYS", help="generate a trace instead")
+    parser.add_argument("--start", default="2025-01-01T00:00:00", help="synthetic trace start")
+    parser.add_argument("--flap", type=float, default=0.0, help="per-sample flip probability")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--interval", type=int, default=60, help="seconds between samples")
+    parser.add_argument("--consumption", type=float)
+    parser.add_argument("--initial-fuel", type=float)
+    parser.add_argument("--tank", type=int)
+    parser.add_argument("--low-fuel-hours", type=float)
+    parser.add_argument("--db", help="SQLite file to use (default: fresh temp file)")
+    parser.add_argument("--reports", action="store_true", help="also run daily/monthly reports")
+    parser.add_argument("--json", metavar="PATH", help="write the full result as JSON")
+    args = parser.parse_args(argv)
+
+    if not args.trace and args.synthetic is None:
+        parser.error("give a trace file or --synthetic DAYS")
+
+    _configure_env(args)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import bot
+
+    bot.DB_FILE = args.db or os.path.join(tempfile.mkdtemp(prefix="genbot-replay-"), "replay.db")
+    bot.init_db()
+
+    if args.trace:
+        samples = read_trace(args.trace)
+    else:
+        start = dt.datetime.fromisoformat(args.start)
+        samples = synthetic_trace(start, args.synthetic, args.interval, flap=args.flap, seed=args.seed)
+
+    result = asyncio.run(replay(bot, samples, with_reports=args.reports))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(f"db:        {bot.DB_FILE}")
+    print(f"trace:     {result['trace_start']} .. {result['trace_end']}")
+    print(f"ticks:     {result['ticks']} in {result['elapsed_seconds']}s "
+          f"({result['ticks_per_second']} ticks/s)")
+    print(f"sessions:  {result['sessions']}, runtime {result['runtime_seconds'] / 3600:.1f}h, "
+          f"fuel used {result['fuel_used']:.1f} L")
+    print(f"state:     {'RUNNING' if result['running'] else 'STOPPED'}, "
+          f"fuel left {result['fuel_left']:.1f} L")
+    print("alerts:    " + ", ".join(f"{k}={v}" for k, v in result["alerts"].items() if v))
+
+
+if __name__ == "__main__":
+    main()
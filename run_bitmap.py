@@ -0,0 +1,76 @@
+import datetime as dt
+
+import numpy as np
+
+from session_store import EPOCH, to_epoch
+
+# Running state at minute resolution: one bit per minute of a local day,
+# packed MSB first into a 180-byte blob. A minute is set when the generator
+# ran during any part of it, the same rule the 24h dial uses for its bins.
+
+MINUTES_PER_DAY = 24 * 60
+DAY_BYTES = MINUTES_PER_DAY // 8
+
+
+def empty_day() -> np.ndarray:
+    return np.zeros(MINUTES_PER_DAY, dtype=bool)
+
+
+def pack(minutes: np.ndarray) -> bytes:
+    return np.packbits(minutes).tobytes()
+
+
+def unpack(blob: bytes | None) -> np.ndarray:
+    if not blob:
+        return empty_day()
+    return np.unpackbits(np.frombuffer(blob, dtype=np.uint8), count=MINUTES_PER_DAY).astype(bool)
+
+
+def mark_many(days: dict[str, np.ndarray], starts: np.ndarray, stops: np.ndarray) -> None:
+    """
+    Sets the minutes touched by each [start, stop) in days (keyed by ISO
+    date). Times are session_store epoch seconds; a difference array marks
+    all intervals in one pass.
+    """
+    # julianday() round trips carry ~1e-5 s of noise; keep it off minute edges.
+    starts = np.round(np.asarray(starts, dtype=float), 3)
+    stops = np.round(np.asarray(stops, dtype=float), 3)
+    keep = stops > starts
+    if not keep.any():
+        return
+    lo = np.floor(starts[keep] / 60).astype(np.int64)
+    hi = np.ceil(stops[keep] / 60).astype(np.int64)
+    first = lo.min() // MINUTES_PER_DAY * MINUTES_PER_DAY
+    span = -(-(hi.max() - first) // MINUTES_PER_DAY) * MINUTES_PER_DAY
+    delta = np.zeros(span + 1, dtype=np.int32)
+    np.add.at(delta, lo - first, 1)
+    np.add.at(delta, hi - first, -1)
+    running = (np.cumsum(delta[:-1]) > 0).reshape(-1, MINUTES_PER_DAY)
+    first_day = EPOCH.date() + dt.timedelta(days=int(first // MINUTES_PER_DAY))
+    for i in np.flatnonzero(running.any(axis=1)):
+        key = (first_day + dt.timedelta(days=int(i))).isoformat()
+        if key in days:
+            days[key] |= running[i]
+        else:
+            days[key] = running[i].copy()
+
+
+def mark(days: dict[str, np.ndarray], start: dt.datetime, stop: dt.datetime) -> None:
+    mark_many(days, np.array([to_epoch(start)]), np.array([to_epoch(stop)]))
+
+
+def set_range(minutes: np.ndarray, origin: dt.datetime, start: dt.datetime, stop: dt.datetime):
+    """Sets the minutes touched by [start, stop) in a slice beginning at origin."""
+    lo = max(0, int(np.floor((start - origin).total_seconds() / 60)))
+    hi = min(len(minutes), int(np.ceil((stop - origin).total_seconds() / 60)))
+    if hi > lo:
+        minutes[lo:hi] = True
+
+
+def intervals(minutes: np.ndarray, origin: dt.datetime) -> list[tuple[dt.datetime, dt.datetime]]:
+    """Runs of set minutes as (start, stop) pairs, minute 0 being origin."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], minutes.astype(np.int8), [0]))))
+    return [
+        (origin + dt.timedelta(minutes=int(a)), origin + dt.timedelta(minutes=int(b)))
+        for a, b in zip(edges[::2], edges[1::2])
+    ]
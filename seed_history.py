@@ -0,0 +1,181 @@
+"""
+Seeds a SQLite file with realistic generator_log and refuel_log history.
+
+Sessions follow an outage-like pattern (a few runs per day of 1-6 hours,
+packed tighter when --years asks for a dense history),
+with a share of "flappy" days made of many 1-3 minute sessions. Refuels are
+logged whenever the simulated tank drops below a quarter, with occasional
+resets, so the fuel columns stay consistent with the runtime.
+
+    python seed_history.py generator.db --sessions 100000 --end 2025-12-31
+    python seed_history.py big.db --sessions 1000000 --years 5
+"""
+import argparse
+import datetime as dt
+import os
+import random
+import sqlite3
+import sys
+
+CHUNK = 10000
+
+
+def _sessions(rng: random.Random, start: dt.datetime, count: int, per_day: float, flappy: float):
+    """Yields (start, stop) pairs in time order."""
+    day = start
+    produced = 0
+    while produced < count:
+        if rng.random() < flappy:
+            runs = rng.randint(10, 30)
+            cursor = day + dt.timedelta(hours=rng.uniform(0, 12))
+            for _ in range(runs):
+                length = dt.timedelta(seconds=rng.randint(60, 180))
+                yield cursor, cursor + length
+                cursor += length + dt.timedelta(seconds=rng.randint(60, 600))
+                produced += 1
+                if produced >= count:
+                    return
+        else:
+            runs = max(0, round(rng.gauss(per_day, per_day ** 0.5)))
+            # One run per slot so dense histories still fit into the day.
+            slot = 24.0 / max(runs, 1)
+            for i in range(runs):
+                begin = day + dt.timedelta(hours=slot * i + rng.uniform(0, slot * 0.3))
+                length = dt.timedelta(hours=min(rng.uniform(1, 6), slot * 0.6))
+                yield begin, begin + length
+                produced += 1
+                if produced >= count:
+                    return
+        day += dt.timedelta(days=1)
+
+
+def per_day_for_years(sessions: int, years: float, flappy: float) -> float:
+    daily = sessions / (years * 365.25)
+    return max(0.5, (daily - flappy * 20) / (1 - flappy))
+
+
+def _days_needed(seed_value: int, sessions: int, per_day: float, flappy: float) -> int:
+    # Dry run with the same RNG stream so the history ends on the requested day.
+    origin = dt.datetime(2000, 1, 1)
+    last = origin
+    for _, stop in _sessions(random.Random(seed_value), origin, sessions, per_day, flappy):
+        last = stop
+    return (last.date() - origin.date()).days
+
+
+def seed(
+    db_path: str,
+    *,
+    sessions: int,
+    end: dt.datetime,
+    per_day: float = 3.0,
+    flappy: float = 0.05,
+    consumption: float = 16.0,
+    capacity: float = 240.0,
+    seed_value: int = 0,
+) -> dict:
+    rng = random.Random(seed_value)
+    refuel_rng = random.Random(seed_value + 1)
+    start = end - dt.timedelta(days=_days_needed(seed_value, sessions, per_day, flappy))
+    start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    gen_rows: list[tuple] = []
+    refuel_rows: list[tuple] = []
+    fuel = capacity
+    total_gen = total_refuel = 0
+
+    def flush():
+        conn.executemany(
+            "INSERT INTO generator_log (start_time, stop_time, runtime_seconds, fuel_used) "
+            "VALUES (?, ?, ?, ?)",
+            gen_rows,
+        )
+        conn.executemany(
+            "INSERT INTO refuel_log (timestamp, amount, fuel_before, fuel_after, user_id, username) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            refuel_rows,
+        )
+        conn.commit()
+        gen_rows.clear()
+        refuel_rows.clear()
+
+    last_stop = start
+    for begin, stop in _sessions(rng, start, sessions, per_day, flappy):
+        seconds = int((stop - begin).total_seconds())
+        used = min(fuel, seconds / 3600.0 * consumption)
+        fuel -= used
+        gen_rows.append((begin.isoformat(), stop.isoformat(), seconds, used))
+        total_gen += 1
+        last_stop = stop
+
+        if fuel < capacity / 4:
+            when = stop + dt.timedelta(minutes=refuel_rng.randint(5, 90))
+            if refuel_rng.random() < 0.02:
+                after = round(refuel_rng.uniform(capacity / 2, capacity), 1)
+                refuel_rows.append((when.isoformat(), 0.0, fuel, after, 1, "seed (reset)"))
+            else:
+                after = capacity
+                refuel_rows.append((when.isoformat(), after - fuel, fuel, after, 1, "seed"))
+            fuel = after
+            total_refuel += 1
+
+        if len(gen_rows) >= CHUNK:
+            flush()
+    flush()
+
+    conn.executemany(
+        "INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+        [("running", "0"), ("fuel_left", str(fuel)), ("low_fuel_alerted", "0")],
+    )
+    conn.commit()
+    conn.close()
+    return {
+        "generator_log": total_gen,
+        "refuel_log": total_refuel,
+        "start": start.isoformat(),
+        "end": last_stop.isoformat(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("db", help="SQLite file (schema is created if missing)")
+    parser.add_argument("--sessions", type=int, default=10000, help="generator_log rows")
+    parser.add_argument("--end", default=None, help="last day of history (default: today)")
+    parser.add_argument("--per-day", type=float, default=3.0, help="runs on a normal day")
+    parser.add_argument("--years", type=float, help="fit the sessions into this many years")
+    parser.add_argument("--flappy", type=float, default=0.05, help="share of flappy days")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("TOKEN", "0:seed")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import bot
+
+    bot.DB_FILE = args.db
+    bot.init_db()
+    end = dt.datetime.fromisoformat(args.end) if args.end else dt.datetime.now()
+    per_day = args.per_day
+    if args.years:
+        per_day = per_day_for_years(args.sessions, args.years, args.flappy)
+    result = seed(
+        args.db,
+        sessions=args.sessions,
+        end=end,
+        per_day=per_day,
+        flappy=args.flappy,
+        consumption=bot.FUEL_CONSUMPTION,
+        capacity=bot.TANK_CAPACITY,
+        seed_value=args.seed,
+    )
+    print(
+        f"{args.db}: {result['generator_log']} sessions, {result['refuel_log']} refuels, "
+        f"{result['start'][:10]} .. {result['end'][:10]}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import datetime as dt
+
+import numpy as np
+
+# Completed generator sessions held column-wise for the reporting paths.
+# Times are float seconds since 1970-01-01 of the naive local timestamps the
+# bot stores, which is what SQLite's julianday() yields for them, so rows can
+# be loaded without parsing ISO strings in Python.
+
+EPOCH = dt.datetime(1970, 1, 1)
+LOAD_BATCH = 50000
+
+# SELECT list producing (id, start, stop, runtime_seconds, fuel_used) as numbers.
+SQL_COLUMNS = (
+    "id, "
+    "(julianday(start_time) - 2440587.5) * 86400.0, "
+    "(julianday(COALESCE(stop_time, start_time)) - 2440587.5) * 86400.0, "
+    "COALESCE(runtime_seconds, 0), "
+    "COALESCE(fuel_used, 0.0)"
+)
+
+
+def to_epoch(when: dt.datetime) -> float:
+    return (when - EPOCH).total_seconds()
+
+
+def from_epoch(seconds: float) -> dt.datetime:
+    return EPOCH + dt.timedelta(seconds=float(seconds))
+
+
+class SessionStore:
+    """
+    Parallel arrays of sessions in start order. stop_max is the running
+    maximum of stop, so "every session before i ended by t" is a binary
+    search even if the log ever holds overlapping rows.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.last_id = 0
+        self.total_runtime = 0
+        self.start = np.empty(capacity)
+        self.stop = np.empty(capacity)
+        self.stop_max = np.empty(capacity)
+        self.runtime = np.empty(capacity, dtype=np.int64)
+        self.fuel = np.empty(capacity)
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        capacity = len(self.start)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ("start", "stop", "stop_max", "runtime", "fuel"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+
+    def extend(self, rows: np.ndarray) -> None:
+        """Appends an (n, 5) array of SQL_COLUMNS rows."""
+        if not len(rows):
+            return
+        n = len(rows)
+        self._reserve(n)
+        lo, hi = self.size, self.size + n
+        self.start[lo:hi] = rows[:, 1]
+        self.stop[lo:hi] = np.maximum(rows[:, 2], rows[:, 1])
+        self.runtime[lo:hi] = rows[:, 3]
+        self.fuel[lo:hi] = rows[:, 4]
+        running = np.maximum.accumulate(self.stop[lo:hi])
+        if lo:
+            running = np.maximum(running, self.stop_max[lo - 1])
+        self.stop_max[lo:hi] = running
+        self.size = hi
+        self.last_id = int(rows[-1, 0])
+        self.total_runtime += int(self.runtime[lo:hi].sum())
+
+    def append(self, row_id: int, start: dt.datetime, stop: dt.datetime, runtime: int, fuel: float):
+        self.extend(np.array([[row_id, to_epoch(start), to_epoch(stop), runtime, fuel]]))
+
+    def load(self, conn, after_id: int = 0) -> None:
+        cur = conn.execute(
+            f"SELECT {SQL_COLUMNS} FROM generator_log "
+            "WHERE id > ? AND start_time IS NOT NULL ORDER BY id",
+            (after_id,),
+        )
+        while True:
+            batch = cur.fetchmany(LOAD_BATCH)
+            if not batch:
+                return
+            self.extend(np.array(batch, dtype=float))
+
+    def drop_first(self, n: int) -> None:
+        """Forgets the n oldest sessions (rows archived out of generator_log)."""
+        n = min(n, self.size)
+        if not n:
+            return
+        self.total_runtime -= int(self.runtime[:n].sum())
+        # Views, not copies; the next _reserve() reallocates as usual.
+        for name in ("start", "stop", "stop_max", "runtime", "fuel"):
+            setattr(self, name, getattr(self, name)[n:])
+        self.size -= n
+        if self.size:
+            self.stop_max[: self.size] = np.maximum.accumulate(self.stop[: self.size])
+
+    def _overlapping(self, a: float, b: float) -> slice:
+        lo = int(np.searchsorted(self.stop_max[: self.size], a, side="right"))
+        hi = int(np.searchsorted(self.start[: self.size], b, side="left"))
+        return slice(lo, max(lo, hi))
+
+    def window(self, a: float, b: float) -> dict:
+        """
+        Sessions clipped to [a, b): runtime and fuel pro rata to the overlap;
+        starts, started_seconds and longest_seconds for sessions starting inside.
+        """
+        s = self._overlapping(a, b)
+        start, stop = self.start[s], self.stop[s]
+        runtime, fuel = self.runtime[s], self.fuel[s]
+        span = stop - start
+        overlap = np.clip(np.minimum(stop, b) - np.maximum(start, a), 0, None)
+        inside = (start >= a) & (start < b)
+        share = np.where(span > 0, overlap / np.where(span > 0, span, 1), inside)
+        started = runtime[inside]
+        return {
+            "runtime_seconds": float((runtime * share).sum()),
+            "fuel_used": float((fuel * share).sum()),
+            "starts": int(inside.sum()),
+            "started_seconds": int(started.sum()),
+            "longest_seconds": int(started.max()) if len(started) else 0,
+        }
+
+    def intervals(self, a: float, b: float) -> tuple[np.ndarray, np.ndarray]:
+        """(starts, stops) of sessions clipped to [a, b), empty ones dropped."""
+        s = self._overlapping(a, b)
+        starts = np.maximum(self.start[s], a)
+        stops = np.minimum(self.stop[s], b)
+        keep = stops > starts
+        return starts[keep], stops[keep]
+
+    def coverage(self, edges: np.ndarray) -> np.ndarray:
+        """Seconds of running time inside each [edges[i], edges[i+1]) bin."""
+        if len(edges) < 2:
+            return np.zeros(0)
+        starts, stops = self.intervals(float(edges[0]), float(edges[-1]))
+        # Running time up to t, as the difference of two cumulative counts.
+        before = np.concatenate(([0.0], np.cumsum(stops - starts)))
+
+        def running_until(t: np.ndarray) -> np.ndarray:
+            ended = np.searchsorted(stops, t, side="right")
+            begun = np.searchsorted(starts, t, side="right")
+            partial = np.where(begun > ended, t - starts[np.maximum(begun - 1, 0)], 0.0)
+            return before[ended] + partial
+
+        return np.diff(running_until(np.asarray(edges, dtype=float)))
+
+    def accrued(self, times: np.ndarray, column: str, since: float | None = None) -> np.ndarray:
+        """
+        Running total of a per-session amount ("runtime" or "fuel") at each
+        time, every session's amount spread evenly over [start, stop). With
+        since, only what accrued after it, from the sessions in between.
+        """
+        times = np.asarray(times, dtype=float)
+        if not self.size or not len(times):
+            return np.zeros(len(times))
+        if since is None:
+            s = slice(0, self.size)
+        else:
+            s = self._overlapping(since, max(since, float(times.max())))
+            if s.start == s.stop:
+                return np.zeros(len(times))
+        start, stop, stop_max = self.start[s], self.stop[s], self.stop_max[s]
+        amount = getattr(self, column)[s].astype(float)
+        before = np.concatenate(([0.0], np.cumsum(amount)))
+
+        def total(t: np.ndarray) -> np.ndarray:
+            ended = np.searchsorted(stop_max, t, side="right")
+            begun = np.searchsorted(start, t, side="right")
+            last = np.maximum(begun - 1, 0)
+            span = stop[last] - start[last]
+            share = np.where(span > 0, (t - start[last]) / np.where(span > 0, span, 1), 1.0)
+            partial = np.where(begun > ended, amount[last] * np.clip(share, 0, 1), 0.0)
+            return before[ended] + partial
+
+        if since is None:
+            return total(times)
+        return total(times) - total(np.array([since]))[0]
@@ -8,6 +8,7 @@ CHANNELID = os.getenv("CHANNELID")
 BOTURL = os.getenv("BOTURL")
 TELEGRAPH_TOKEN = os.getenv("TELEGRAPH_TOKEN")
 TELEGRAPH_AUTHOR = os.getenv("TELEGRAPH_AUTHOR")
+TELEGRAPH_MAX_PAGES = int(os.getenv("TELEGRAPH_MAX_PAGES", 20))
 if TOKEN is None:
     raise Exception("Please setup the .env variable TELEGRAM_TOKEN.")
 
@@ -17,12 +18,65 @@ INTERVAL = int(os.getenv("INTERVAL",60))
 REPORTH = int(os.getenv("REPORTH",7))
 REPORTM = int(os.getenv("REPORTM",0))
 
+# Update delivery: "polling" (default) or "webhook"
+UPDATE_MODE = os.getenv("UPDATE_MODE", "polling").lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8443))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram").strip("/")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+if UPDATE_MODE not in {"polling", "webhook"}:
+    raise Exception("UPDATE_MODE must be either 'polling' or 'webhook'.")
+if UPDATE_MODE == "webhook" and not WEBHOOK_URL:
+    raise Exception("Please setup the .env variable WEBHOOK_URL for webhook mode.")
+
 
 # Generator parameters (fuel logic)
 TANK_CAPACITY = int(os.getenv("TANK_CAPACITY", 240))
 FUEL_CONSUMPTION = float(os.getenv("FUEL_CONSUMPTION", 16))
 INITIAL_FUEL = float(os.getenv("INITIAL_FUEL", 190))
 LOW_FUEL_HOURS = float(os.getenv("LOW_FUEL_HOURS", 4))
+# "fixed" estimates fuel with FUEL_CONSUMPTION, "learned" with the rate
+# fitted from refuel history once there is enough of it
+FUEL_MODEL = os.getenv("FUEL_MODEL", "fixed").lower()
+if FUEL_MODEL not in {"fixed", "learned"}:
+    raise Exception("FUEL_MODEL must be either 'fixed' or 'learned'.")
+
+# Watchdog: alert the admin when event-loop lag exceeds WATCHDOG_LAG_MS or a
+# job runs longer than WATCHDOG_TICK_RATIO x its interval (0 disables)
+WATCHDOG_LAG_MS = float(os.getenv("WATCHDOG_LAG_MS", 1000))
+WATCHDOG_TICK_RATIO = float(os.getenv("WATCHDOG_TICK_RATIO", 1.0))
+
+# Prometheus /metrics endpoint (METRICS_PORT=0 disables)
+METRICS_LISTEN = os.getenv("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+
+# Read-only JSON API for dashboards (API_PORT=0 disables); may share the
+# metrics port
+API_LISTEN = os.getenv("API_LISTEN", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", 0))
+
+# Tracing spans: TRACE_EXPORT is "" (off), "file" (rotating JSONL) or "otlp"
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", 5 * 1024 * 1024))
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces")
+
+# Bot API base URL override, e.g. a local Bot API server or fake_bot_api.py
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "").rstrip("/")
+
+# Probe sample ring buffer: file (default: probes.ring next to the database)
+# and number of samples kept; 16 bytes per sample
+PROBE_RING_FILE = os.getenv("PROBE_RING_FILE", "")
+PROBE_RING_SIZE = int(os.getenv("PROBE_RING_SIZE", 100000))
+
+# Maintenance job, daily at MAINTENANCE_HOUR:00. Sessions and refuels older
+# than RETENTION_DAYS (whole months) are rolled into monthly summary rows;
+# 0 keeps everything. Free pages are returned to the filesystem either way.
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", 0))
+MAINTENANCE_HOUR = int(os.getenv("MAINTENANCE_HOUR", 4))
+if 0 < RETENTION_DAYS < 62:
+    raise Exception("RETENTION_DAYS must be 0 (keep everything) or at least 62.")
 
 
 # Database file
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# settings.py refuses to import without a token; nothing here talks to Telegram.
+os.environ.setdefault("TOKEN", "0:test")
+os.environ.setdefault("GENERATORNAME", "Test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update  # noqa: E402
+from telegram.ext import Application  # noqa: E402
+
+from loadtest import FakeTransport, _update_data  # noqa: E402
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    """The bot module on a fresh database, SQL inline on the calling thread."""
+    import bot as bot_module
+
+    # /set rewrites ./.env; keep it away from the checkout's real one.
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(bot_module, "DB_FILE", str(tmp_path / "generator.db"))
+    monkeypatch.setattr(bot_module, "_telegraph_call", lambda *a, **kw: None)
+    bot_module.reset_caches()
+    bot_module.use_inline_db(True)
+    bot_module.init_db()
+    yield bot_module
+    bot_module.use_inline_db(False)
+
+
+class Replies(FakeTransport):
+    """Fake Bot API that keeps every sent text and whether the state lock was held."""
+
+    def __init__(self, bot):
+        super().__init__()
+        self.bot = bot
+        self.texts: list[str] = []
+        self.locked: list[bool] = []
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        if url.endswith("/sendMessage"):
+            self.texts.append(request_data.parameters["text"])
+            self.locked.append(self.bot._state_lock.locked())
+        return await super().do_request(url, method, request_data, **kwargs)
+
+
+class Harness:
+    """The real Application from build_application() on a Replies transport."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.transport = Replies(bot)
+
+    def build(self) -> Application:
+        return self.bot.build_application(
+            Application.builder()
+            .token(self.bot.TOKEN)
+            .request(self.transport)
+            .get_updates_request(FakeTransport())
+        )
+
+    def run(self, scenario):
+        """Runs scenario(app) between initialize() and shutdown()."""
+
+        async def main():
+            app = self.build()
+            await app.initialize()
+            try:
+                return await scenario(app)
+            finally:
+                await app.shutdown()
+
+        return asyncio.run(main())
+
+    def commands(self, user_id: int, *texts: str) -> list[str]:
+        """Sends texts as user_id one after another; returns the replies."""
+
+        async def scenario(app):
+            for update_id, text in enumerate(texts, 1):
+                await app.process_update(Update.de_json(_update_data(update_id, user_id, text), app.bot))
+
+        self.run(scenario)
+        return self.transport.texts
+
+
+@pytest.fixture
+def harness(bot):
+    return Harness(bot)
@@ -0,0 +1,30 @@
+import asyncio
+import datetime as dt
+import json
+
+
+def _series(bot, **query):
+    status, _, body = asyncio.run(bot.api_series_endpoint({"name": "fuel", **query}, {}))
+    return status, json.loads(body) if body else None
+
+
+def test_series_accepts_bounds_with_offset(bot):
+    now = bot._api_floor(bot.clock.now())
+    start = (now - dt.timedelta(hours=6)).astimezone(dt.timezone.utc)
+    status, body = _series(bot, **{"from": start.isoformat(), "to": now.astimezone().isoformat()})
+    assert status == 200
+    assert body["from"] == (now - dt.timedelta(hours=6)).isoformat()
+    assert body["to"] == now.isoformat()
+
+
+def test_series_rejects_out_of_range_epoch(bot):
+    status, body = _series(bot, **{"from": "9" * 30})
+    assert status == 400 and "error" in body
+
+
+def test_data_version_follows_fuel_settings(bot, monkeypatch):
+    before = bot._api_data_version()
+    monkeypatch.setattr(bot, "FUEL_CONSUMPTION", bot.FUEL_CONSUMPTION + 1)
+    changed = bot._api_data_version()
+    monkeypatch.setattr(bot, "FUEL_MODEL", "learned" if bot.FUEL_MODEL != "learned" else "fixed")
+    assert len({before, changed, bot._api_data_version()}) == 3
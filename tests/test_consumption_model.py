@@ -0,0 +1,44 @@
+import pytest
+
+from consumption_model import ConsumptionModel
+
+NOMINAL = 5.0
+
+
+def _hours(ts_from: str, ts_to: str) -> float:
+    return float(ts_to) - float(ts_from)
+
+
+def _fold(model: ConsumptionModel, rows) -> list[bool]:
+    return [
+        model.observe(i, ts, amount, before, after, _hours, NOMINAL)
+        for i, (ts, amount, before, after) in enumerate(rows, 1)
+    ]
+
+
+def test_fill_up_is_not_an_anchor():
+    model = ConsumptionModel()
+    # Reset at 100 L, 10 h at 4 L/h, then a 30 L top-up that hits capacity
+    # (the bot's estimate said 80 L left, the tank really held 60 L).
+    added = _fold(model, [("0", 0.0, 100.0, 100.0), ("10", 30.0, 80.0, 100.0)])
+    assert added == [False, False]
+    assert model.n == 0 and model.added == 30.0
+
+    # Another 10 h at 4 L/h, then the gauge reads 50 L.
+    assert _fold(model, [("20", 0.0, 60.0, 50.0)]) == [True]
+    assert model.n == 1
+    assert model.sum_hy / model.sum_hh == pytest.approx(4.0)
+
+
+def test_rate_needs_min_samples_of_resets():
+    model = ConsumptionModel()
+    rows = [("0", 0.0, 100.0, 100.0)]
+    level = 100.0
+    for i in range(1, 4):
+        level -= 40.0
+        rows.append((str(i * 10), 0.0, level, level))
+        level = 100.0
+        rows.append((str(i * 10), 40.0, 60.0, level))
+    _fold(model, rows)
+    assert model.n == 3
+    assert model.rate == pytest.approx(4.0)
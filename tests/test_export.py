@@ -0,0 +1,24 @@
+USER = 42
+
+
+def _seed(bot):
+    bot.add_user_to_whitelist(USER, "user")
+    with bot._connect() as conn:
+        conn.executemany(
+            "INSERT INTO generator_log (start_time, stop_time, runtime_seconds, fuel_used) VALUES (?, ?, ?, ?)",
+            [(f"2025-05-{day:02d}T10:00:00", f"2025-05-{day:02d}T12:00:00", 7200, 10.0) for day in range(1, 29)],
+        )
+
+
+def test_export_uploads_the_zip(bot, harness):
+    _seed(bot)
+    assert harness.commands(USER, "/export jsonl") == []
+    assert harness.transport.calls["sendDocument"] == 1
+
+
+def test_export_over_the_cap_is_not_read_for_upload(bot, harness, monkeypatch):
+    _seed(bot)
+    monkeypatch.setattr(bot, "EXPORT_MAX_BYTES", 10)
+    replies = harness.commands(USER, "/export")
+    assert harness.transport.calls["sendDocument"] == 0
+    assert len(replies) == 1
@@ -0,0 +1,133 @@
+import asyncio
+import datetime as dt
+import json
+import math
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from clock import SimulatedClock
+
+NOW = dt.datetime(2025, 9, 15, 12, 0)
+RATE = 5.0
+
+
+@pytest.fixture
+def history(bot, monkeypatch):
+    monkeypatch.setattr(bot, "clock", SimulatedClock(NOW))
+    monkeypatch.setattr(bot, "FUEL_CONSUMPTION", RATE)
+    monkeypatch.setattr(bot, "TANK_CAPACITY", 200)
+    monkeypatch.setattr(bot, "RETENTION_DAYS", 62)
+    day, level = dt.datetime(2025, 3, 1), 150.0
+    sessions, refuels = [], []
+    while day < NOW.replace(hour=0):
+        start = day + dt.timedelta(hours=10)
+        # One run a day crosses midnight, so day edges split sessions.
+        hours = 3 if day.day % 5 else 16
+        stop = start + dt.timedelta(hours=hours)
+        sessions.append((start.isoformat(), stop.isoformat(), hours * 3600, hours * RATE))
+        level -= hours * RATE
+        if level < 60:
+            refuels.append(((stop + dt.timedelta(hours=1)).isoformat(), 100.0, level, level + 100.0))
+            level += 100.0
+        day += dt.timedelta(days=1)
+    with bot._connect() as conn:
+        conn.executemany(
+            "INSERT INTO generator_log (start_time, stop_time, runtime_seconds, fuel_used) VALUES (?, ?, ?, ?)",
+            sessions,
+        )
+        conn.executemany(
+            "INSERT INTO refuel_log (timestamp, amount, fuel_before, fuel_after, user_id, username)"
+            " VALUES (?, ?, ?, ?, 1, 'test')",
+            refuels,
+        )
+    bot.set_state("fuel_left", level)
+    return bot
+
+
+def _snapshot(bot):
+    start = dt.datetime(2025, 8, 3, 6, 30)
+    return {
+        "status": bot._api_status()["motohours"],
+        "series": bot._api_series("motohours", NOW - dt.timedelta(days=2), NOW, 10)[-1][1],
+        "fuel": bot.get_fuel_level_at(dt.datetime(2025, 8, 10, 15, 0)),
+        "curve": bot.get_fuel_curve(start, NOW)[1][0],
+        "period": bot.get_period_stats(start, dt.datetime(2025, 8, 20, 18, 0)),
+        "hours": bot._running_hours("2025-08-01T00:00:00", "2025-09-01T00:00:00"),
+    }
+
+
+def test_archiving_keeps_per_session_paths(history):
+    bot = history
+    before = _snapshot(bot)
+    assert before["status"] == pytest.approx(before["series"])
+
+    asyncio.run(bot.maintenance_job(SimpleNamespace(application=None, job=None)))
+    result = json.loads(bot.get_state("maintenance_last"))
+    assert result["sessions"] > 0 and result["refuels"] > 0
+
+    archived = bot.get_archived_until()
+    assert archived is not None and archived <= dt.datetime(2025, 7, 1)
+    with bot._connect() as conn:
+        (oldest,) = conn.execute("SELECT MIN(start_time) FROM generator_log").fetchone()
+    assert dt.datetime.fromisoformat(oldest) < archived  # the run across the cutoff stays
+
+    after = _snapshot(bot)
+    for key in ("status", "series", "fuel", "curve", "hours"):
+        assert after[key] == pytest.approx(before[key]), key
+    assert after["period"] == pytest.approx(before["period"])
+
+
+def test_ranges_before_the_archive_are_refused(history):
+    bot = history
+    asyncio.run(bot.maintenance_job(SimpleNamespace(application=None, job=None)))
+    early = dt.datetime(2025, 4, 1)
+    with pytest.raises(ValueError):
+        bot.get_period_stats(early, NOW)
+    with pytest.raises(ValueError):
+        bot.get_fuel_level_at(early)
+    with pytest.raises(ValueError):
+        bot.get_fuel_curve(early, NOW)
+    assert math.isnan(bot._running_hours(early.isoformat(), NOW.isoformat()))
+
+    status, _, body = asyncio.run(
+        bot.api_series_endpoint({"name": "fuel", "from": early.isoformat()}, {})
+    )
+    assert status == 400 and "archived" in json.loads(body)["error"]
+
+
+def test_report_before_the_archive_says_so(history, harness):
+    bot = history
+    asyncio.run(bot.maintenance_job(SimpleNamespace(application=None, job=None)))
+    bot.add_user_to_whitelist(42, "user")
+
+    archived = bot.get_archived_until()
+    assert harness.commands(42, "/report 2025-04-01") == [
+        bot.t("report_archived", date=archived.strftime("%Y-%m-%d %H:%M"))
+    ]
+
+
+def test_derived_rows_go_with_the_archived_months(history):
+    bot = history
+    bot.add_sketch_sample("probe_rtt", dt.datetime(2025, 3, 10, 12, 0), 0.02)
+    bot.add_sketch_sample("probe_rtt", NOW - dt.timedelta(hours=1), 0.03)
+    asyncio.run(bot.maintenance_job(SimpleNamespace(application=None, job=None)))
+
+    archived = bot.get_archived_until()
+    with bot._connect() as conn:
+        for table, column in bot._PRUNED_TABLES:
+            (oldest,) = conn.execute(f"SELECT MIN({column}) FROM {table}").fetchone()
+            assert oldest >= archived.date().isoformat(), table
+    assert bot.get_sketch("probe_rtt", NOW - dt.timedelta(days=7), NOW).count == 1
+
+
+def test_an_old_database_switches_to_incremental_vacuum_in_maintenance(bot, tmp_path, monkeypatch):
+    path = tmp_path / "old.db"
+    sqlite3.connect(path).execute("CREATE TABLE legacy (x)").connection.close()
+    monkeypatch.setattr(bot, "DB_FILE", str(path))
+    bot.init_db()
+    assert bot._needs_full_vacuum()
+
+    asyncio.run(bot.maintenance_job(SimpleNamespace(application=None, job=None)))
+    assert not bot._needs_full_vacuum()
@@ -0,0 +1,27 @@
+import datetime as dt
+import threading
+
+from probe_ring import ProbeRing
+
+ADMIN = 42
+
+
+def test_probes_reads_the_ring_on_the_writer_thread(bot, harness, monkeypatch):
+    monkeypatch.setattr(bot, "ADMIN_USER_ID", ADMIN)
+    bot.add_user_to_whitelist(ADMIN, "admin")
+    now = bot.clock.now()
+    for minute in range(5):
+        bot.record_probe(now - dt.timedelta(minutes=minute), minute != 2, 0.01)
+
+    readers = []
+    samples = ProbeRing.samples
+
+    def spy(self, since=None):
+        readers.append(threading.current_thread())
+        return samples(self, since)
+
+    monkeypatch.setattr(ProbeRing, "samples", spy)
+    replies = harness.commands(ADMIN, "/probes")
+    # The monitor appends on the event loop; a copy from a worker could tear.
+    assert readers == [threading.current_thread()]
+    assert len(replies) == 1 and "5" in replies[0]
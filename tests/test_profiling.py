@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import profiling
+
+
+def _spin(seconds: float) -> None:
+    until = time.perf_counter() + seconds
+    while time.perf_counter() < until:
+        pass
+
+
+def db_side_work() -> None:
+    _spin(0.05)
+
+
+def unrelated_handler_work() -> None:
+    _spin(0.05)
+
+
+def test_tick_begun_before_arming_is_ignored():
+    profiler = profiling.TickProfiler()
+    tick = profiler.begin()
+    profiler.arm("mem", 1)
+    assert profiler.end(tick) is None
+    assert profiler.active
+
+    report = asyncio.run(profiler.run(asyncio.sleep(0)))
+    assert report.startswith("tracemalloc diff over 1 monitor tick(s)")
+    assert not profiler.active
+
+
+def test_cpu_capture_follows_the_tick_to_the_db_thread(bot):
+    bot.use_inline_db(False)
+    profiler = bot.tick_profiler
+    profiler.arm("cpu", 1)
+
+    async def tick():
+        await bot.run_db(db_side_work)
+
+    async def other_handler():
+        for _ in range(5):
+            unrelated_handler_work()
+            await asyncio.sleep(0)
+
+    async def scenario():
+        other = asyncio.create_task(other_handler())
+        report = await profiler.run(tick())
+        await other
+        return report
+
+    report = asyncio.run(scenario())
+    assert "genbot-db" in report
+    assert "db_side_work" in report
+    assert "unrelated_handler_work" not in report
+    assert not profiler.active
@@ -0,0 +1,39 @@
+import datetime as dt
+
+import pytest
+
+USER = 42
+
+
+def test_report_bound_with_offset_is_local_naive(bot):
+    aware = dt.datetime(2025, 6, 1, tzinfo=dt.timezone(dt.timedelta(hours=2)))
+    expected = aware.astimezone().replace(tzinfo=None)
+    assert bot._parse_report_bound("2025-06-01T00:00+02:00", False) == expected
+    assert bot._parse_report_bound("2025-05-31T22:00Z", True) == expected
+    assert bot._parse_report_bound("2025-06-01", True) == dt.datetime(2025, 6, 2)
+
+
+def test_report_accepts_aware_bounds(bot, harness):
+    bot.add_user_to_whitelist(USER, "user")
+    replies = harness.commands(USER, "/report 2025-06-01T00:00+02:00 2025-06-02T00:00Z")
+    assert harness.transport.calls["sendPhoto"] == 1
+    assert replies != [bot.t("report_usage")]
+
+
+def test_report_tank_line_uses_point_lookups(bot, harness):
+    bot.add_user_to_whitelist(USER, "user")
+    with bot._connect() as conn:
+        conn.execute(
+            "INSERT INTO refuel_log (timestamp, amount, fuel_before, fuel_after, user_id, username)"
+            " VALUES ('2025-06-01T10:00:00', 0, 120, 150, 1, 'test')"
+        )
+        conn.execute(
+            "INSERT INTO generator_log (start_time, stop_time, runtime_seconds, fuel_used)"
+            " VALUES ('2025-06-01T12:00:00', '2025-06-01T14:00:00', 7200, 10.0)"
+        )
+    start, end = dt.datetime(2025, 6, 1, 13), dt.datetime(2025, 6, 1, 18)
+    assert bot.get_fuel_level_at(start) == pytest.approx(145.0)
+    assert bot.get_fuel_level_at(end) == pytest.approx(140.0)
+
+    (reply,) = harness.commands(USER, "/report 2025-06-01T13:00 2025-06-01T18:00")
+    assert "145.0 → 140.0 L" in reply
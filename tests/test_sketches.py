@@ -0,0 +1,46 @@
+import datetime as dt
+
+WHEN = dt.datetime(2025, 6, 1, 12, 30)
+
+
+def _sources(bot) -> list[str]:
+    with bot._connect() as conn:
+        return [row[0] for row in conn.execute("SELECT DISTINCT source FROM quantile_sketches ORDER BY source")]
+
+
+def test_samples_follow_a_renamed_generator(bot, monkeypatch):
+    monkeypatch.setattr(bot, "GENERATORNAME", "Old")
+    bot.add_sketch_sample("probe_rtt", WHEN, 0.02)
+    monkeypatch.setattr(bot, "GENERATORNAME", "New")
+    bot.add_sketch_sample("probe_rtt", WHEN + dt.timedelta(minutes=1), 0.03)
+    bot.flush_sketches()
+
+    assert _sources(bot) == ["New", "Old"]
+    hour = WHEN.replace(minute=0)
+    assert bot.get_sketch("probe_rtt", hour, hour + dt.timedelta(hours=1), source="New").count == 1
+
+
+def _stored(bot) -> dict[str, float]:
+    with bot._connect() as conn:
+        rows = conn.execute("SELECT bucket, digest FROM quantile_sketches WHERE metric = 'probe_rtt'").fetchall()
+    return {bucket: bot.TDigest.from_bytes(blob).count for bucket, blob in rows}
+
+
+def test_open_hour_is_written_behind(bot, monkeypatch):
+    monkeypatch.setattr(bot, "SKETCH_FLUSH_SAMPLES", 5)
+    hour = WHEN.replace(minute=0).isoformat()
+    for i in range(4):
+        bot.add_sketch_sample("probe_rtt", WHEN + dt.timedelta(seconds=i), 0.01 * (i + 1))
+    assert _stored(bot) == {}
+
+    bot.add_sketch_sample("probe_rtt", WHEN + dt.timedelta(seconds=4), 0.05)
+    assert _stored(bot) == {hour: 5}
+
+    # The next hour's first sample writes what was left of this one.
+    bot.add_sketch_sample("probe_rtt", WHEN + dt.timedelta(seconds=5), 0.06)
+    bot.add_sketch_sample("probe_rtt", WHEN + dt.timedelta(hours=1), 0.07)
+    assert _stored(bot) == {hour: 6}
+
+    # Readers see the unsaved samples too.
+    start = WHEN.replace(minute=0)
+    assert bot.get_sketch("probe_rtt", start, start + dt.timedelta(hours=2)).count == 7
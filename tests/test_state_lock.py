@@ -0,0 +1,61 @@
+import asyncio
+from types import SimpleNamespace
+
+from telegram.error import NetworkError
+
+ADMIN = 42
+
+
+def test_state_writers_reply_outside_the_lock(bot, harness, monkeypatch, tmp_path):
+    monkeypatch.setattr(bot, "ADMIN_USER_ID", ADMIN)
+    monkeypatch.setattr(bot, "LOW_FUEL_HOURS", bot.LOW_FUEL_HOURS)
+    monkeypatch.setenv("LOW_FUEL_HOURS", str(bot.LOW_FUEL_HOURS))
+    (tmp_path / ".env").write_text("LOW_FUEL_HOURS=1\n")
+    bot.add_user_to_whitelist(ADMIN, "admin")
+    commands = ["/refuel 10", "/reset_fuel 100", "/set LOW_FUEL_HOURS 3", "/setservice 50", "/setmhours 10"]
+
+    harness.commands(ADMIN, *commands)
+    assert harness.transport.locked == [False] * len(commands)
+    assert bot.get_state("fuel_left") == "100.0"
+    assert bot.LOW_FUEL_HOURS == 3
+    assert (tmp_path / ".env").read_text() == "LOW_FUEL_HOURS=3.0\n"
+
+
+def test_monitor_alerts_go_out_after_the_lock(bot, harness, monkeypatch):
+    monkeypatch.setattr(bot, "LOW_FUEL_HOURS", 10**6)
+    alive = iter([True, True, False])
+
+    async def probe():
+        return next(alive)
+
+    monkeypatch.setattr(bot, "_probe", probe)
+
+    async def scenario(app):
+        context = SimpleNamespace(application=app)
+        for _ in range(3):
+            await bot._monitor_job(context)
+
+    harness.run(scenario)
+    # START, then the low-fuel alert on the next tick, then STOP.
+    assert harness.transport.locked == [False] * 3
+    assert bot.get_state("running") == "0"
+    assert bot.get_state("low_fuel_alerted") == "1"
+
+
+def test_failed_alert_does_not_drop_the_rest(bot, monkeypatch):
+    sent, failing = [], {"STOP"}
+
+    async def send(app, text):
+        if text in failing:
+            raise NetworkError("down")
+        sent.append(text)
+
+    monkeypatch.setattr(bot, "send", send)
+    asyncio.run(bot.send_alerts(None, ["STOP", "LOW FUEL"]))
+    assert sent == ["LOW FUEL"]
+
+    # The undelivered alert goes out first on the next tick.
+    failing.clear()
+    asyncio.run(bot.send_alerts(None, ["START"]))
+    assert sent == ["LOW FUEL", "STOP", "START"]
+    assert not bot._undelivered
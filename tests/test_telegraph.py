@@ -0,0 +1,71 @@
+import asyncio
+import datetime as dt
+
+
+def _fake_telegraph(fail_on: set[str]):
+    calls = []
+
+    def call(method, params, path=""):
+        calls.append((method, path, params.get("content")))
+        if method == "createPage":
+            title = params["title"]
+            if title in fail_on:
+                return None
+            slug = title.replace(" ", "-")
+            return {"path": slug, "url": f"https://telegra.ph/{slug}"}
+        return {"path": path, "url": f"https://telegra.ph/{path}"}
+
+    return call, calls
+
+
+def test_partial_publish_returns_no_link(bot, monkeypatch):
+    call, calls = _fake_telegraph({"Report (2/3)"})
+    monkeypatch.setattr(bot, "_telegraph_call", call)
+    monkeypatch.setattr(bot, "_telegraph_token", "token")
+
+    url = asyncio.run(bot._publish_telegraph_report("Report", ["a", "b", "c"]))
+
+    assert url is None
+    blanked = sorted(path for method, path, _ in calls if method == "editPage")
+    assert blanked == ["Report-(1/3)", "Report-(3/3)"]
+    assert bot._report_line(["a"], False, url).endswith(bot._mdv2_escape(bot.t("telegraph_failed")))
+
+
+def test_full_publish_links_every_page(bot, monkeypatch):
+    call, calls = _fake_telegraph(set())
+    monkeypatch.setattr(bot, "_telegraph_call", call)
+    monkeypatch.setattr(bot, "_telegraph_token", "token")
+
+    url = asyncio.run(bot._publish_telegraph_report("Report", ["a", "b"]))
+
+    assert url == "https://telegra.ph/Report-(1/2)"
+    assert [method for method, _, _ in calls].count("editPage") == 2
+
+
+def test_report_pages_are_capped(bot, monkeypatch):
+    monkeypatch.setattr(bot, "TELEGRAPH_MAX_PAGES", 2)
+    start = dt.datetime(2025, 1, 1)
+    with bot._connect() as conn:
+        conn.executemany(
+            "INSERT INTO generator_log (start_time, stop_time, runtime_seconds, fuel_used)"
+            " VALUES (?, ?, ?, ?)",
+            [
+                (
+                    (start + dt.timedelta(hours=i)).isoformat(),
+                    (start + dt.timedelta(hours=i, minutes=30)).isoformat(),
+                    1800,
+                    1.0,
+                )
+                for i in range(5000)
+            ],
+        )
+
+    widths = [16, 16, 9, 7]
+    chunks, truncated = bot._report_chunks(
+        bot.HISTORY_REPORT_SQL,
+        (start.isoformat(),),
+        lambda row: bot._history_table_row(row, widths),
+        ["START", "STOP", "RUN", "FUEL(L)"],
+    )
+    assert len(chunks) == 2 and truncated
+    assert chunks[0].splitlines()[1].startswith("2025-07-28")
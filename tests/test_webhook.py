@@ -0,0 +1,67 @@
+import asyncio
+import json
+import socket
+import urllib.error
+import urllib.request
+
+from telegram import Update
+from telegram.ext import TypeHandler
+
+from loadtest import _update_data
+
+SECRET = "test-secret"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _post(url: str, payload: dict, secret: str) -> int:
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json", "X-Telegram-Bot-Api-Secret-Token": secret},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+
+def test_webhook_dispatches_updates_with_secret(bot, harness, monkeypatch):
+    port = _free_port()
+    monkeypatch.setattr(bot, "WEBHOOK_URL", "https://bot.example")
+    monkeypatch.setattr(bot, "WEBHOOK_PORT", port)
+    monkeypatch.setattr(bot, "WEBHOOK_SECRET", SECRET)
+
+    async def scenario(app):
+        handled = asyncio.Queue()
+
+        async def seen(update, context):
+            await handled.put(update.update_id)
+
+        # Handler groups run in order, so this fires after /whoami.
+        app.add_handler(TypeHandler(Update, seen), group=99)
+
+        await app.start()
+        await app.updater.start_webhook(**bot._webhook_options())
+        try:
+            url = f"http://127.0.0.1:{port}/{bot.WEBHOOK_PATH}"
+            rejected = await asyncio.to_thread(_post, url, _update_data(1, 42, "/whoami"), "wrong")
+            accepted = await asyncio.to_thread(_post, url, _update_data(2, 42, "/whoami"), SECRET)
+            update_id = await asyncio.wait_for(handled.get(), 5)
+        finally:
+            await app.updater.stop()
+            await app.stop()
+        return rejected, accepted, update_id, handled.qsize()
+
+    rejected, accepted, update_id, pending = harness.run(scenario)
+    calls = harness.transport.calls
+    assert rejected == 403
+    assert accepted == 200
+    assert update_id == 2 and pending == 0
+    assert calls["setWebhook"] == 1
+    assert calls["sendMessage"] == 1
@@ -0,0 +1,193 @@
+import contextlib
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+
+# (trace_id, span_id) of the innermost open span in the current task.
+_current: contextvars.ContextVar[tuple[str, str] | None] = contextvars.ContextVar(
+    "current_span", default=None
+)
+_exporter = None
+
+BATCH_SIZE = 200
+FLUSH_SECONDS = 1.0
+
+
+def _new_id(nbytes: int) -> str:
+    return f"{random.getrandbits(nbytes * 8):0{nbytes * 2}x}"
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs):
+    """Records a span around the block; a no-op when tracing is not configured."""
+    exporter = _exporter
+    if exporter is None:
+        yield
+        return
+
+    parent = _current.get()
+    trace_id = parent[0] if parent else _new_id(16)
+    span_id = _new_id(8)
+    token = _current.set((trace_id, span_id))
+    start_ns = time.time_ns()
+    t0 = time.perf_counter_ns()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        _current.reset(token)
+        duration_ns = time.perf_counter_ns() - t0
+        exporter.submit({
+            "trace_id": trace_id,
+            "span_id": span_id,
+            "parent_id": parent[1] if parent else None,
+            "name": name,
+            "start_ns": start_ns,
+            "end_ns": start_ns + duration_ns,
+            "duration_ms": duration_ns / 1e6,
+            "attrs": attrs,
+            "error": error,
+        })
+
+
+class _BatchExporter:
+    """Queues finished spans and writes them in batches from a daemon thread."""
+
+    def __init__(self):
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="genbot-trace", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: dict) -> None:
+        self._queue.put(record)
+
+    def _drain(self) -> list[dict]:
+        batch = []
+        while len(batch) < BATCH_SIZE:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._stop.wait(FLUSH_SECONDS)
+            self.flush()
+
+    def flush(self) -> None:
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            try:
+                self.export(batch)
+            except Exception:
+                pass
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def export(self, batch: list[dict]) -> None:
+        raise NotImplementedError
+
+
+class JsonlFileExporter(_BatchExporter):
+    def __init__(self, path: str, max_bytes: int, backups: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        super().__init__()
+
+    def _rotate(self) -> None:
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def export(self, batch: list[dict]) -> None:
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+            self._rotate()
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in batch:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OtlpHttpExporter(_BatchExporter):
+    """Posts spans as OTLP/HTTP JSON (e.g. to a collector on :4318/v1/traces)."""
+
+    def __init__(self, endpoint: str, service_name: str = "genbot"):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        super().__init__()
+
+    def _span(self, record: dict) -> dict:
+        out = {
+            "traceId": record["trace_id"],
+            "spanId": record["span_id"],
+            "name": record["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(record["start_ns"]),
+            "endTimeUnixNano": str(record["end_ns"]),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)} for k, v in record["attrs"].items()
+            ],
+            "status": {"code": 2, "message": record["error"]} if record["error"] else {"code": 1},
+        }
+        if record["parent_id"]:
+            out["parentSpanId"] = record["parent_id"]
+        return out
+
+    def export(self, batch: list[dict]) -> None:
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}}
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "genbot"},
+                    "spans": [self._span(r) for r in batch],
+                }],
+            }]
+        }
+        req = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=5):
+            pass
+
+
+def configure(exporter) -> None:
+    global _exporter
+    _exporter = exporter
+
+
+def shutdown() -> None:
+    global _exporter
+    exporter, _exporter = _exporter, None
+    if exporter is not None:
+        exporter.shutdown()